@@ -0,0 +1,395 @@
+"""
+비동기 챗봇 핵심 로직 모듈
+
+chatbot.py의 핵심 기능을 asyncio용으로 제공합니다.
+하나의 이벤트 루프에서 수백 개의 대화를 동시에 처리할 때 사용합니다.
+모든 비동기 클라이언트는 이벤트 루프마다 하나씩 만들어지는
+공유 HTTP 연결 풀(httpx)을 함께 사용합니다.
+
+세션 관리(create_session, add_message 등)는 chatbot.py의 함수를
+그대로 사용합니다.
+
+사용 예시:
+    import asyncio
+    from chatbot import create_session
+    from async_chatbot import create_async_client, async_send_message
+
+    async def main():
+        client = create_async_client(api_key)
+        session = create_session("gpt")
+        success, response = await async_send_message(client, session, "안녕하세요!")
+
+    asyncio.run(main())
+"""
+
+import asyncio
+import weakref
+
+import httpx
+from openai import AsyncOpenAI, NOT_GIVEN
+
+import coalesce
+import compactor
+import model_catalog
+import retry
+import telemetry
+
+from config import (
+    API_BASE_URL,
+    API_TIMEOUT,
+    COALESCE_ENABLED,
+    COMPACTION_ENABLED,
+    ERROR_MESSAGES
+)
+from chatbot import (
+    add_message,
+    build_payload,
+    create_client,
+    http_client_options,
+    _begin_turn,
+    _flush_archive,
+    _lookup_cached_response,
+    _rollback_user_message,
+    _api_error_message,
+    get_cached_validation,
+    cache_validation
+)
+from rate_limit import get_model_limiter
+
+
+# ============================================================
+# 공유 연결 풀
+# ============================================================
+
+# 이벤트 루프별 공유 httpx 클라이언트
+# (httpx 비동기 연결은 만들어진 이벤트 루프에서만 사용할 수 있음)
+_shared_http_clients = weakref.WeakKeyDictionary()
+
+
+def get_shared_http_client():
+    """
+    현재 이벤트 루프의 공유 httpx 비동기 클라이언트를 반환합니다.
+    처음 호출될 때 연결 수가 제한된 풀을 만들고 이후에는 재사용합니다.
+
+    Returns:
+        httpx.AsyncClient: 공유 HTTP 클라이언트
+
+    사용 예시:
+        http_client = get_shared_http_client()
+    """
+    loop = asyncio.get_running_loop()
+    http_client = _shared_http_clients.get(loop)
+
+    if http_client is None or http_client.is_closed:
+        http_client = httpx.AsyncClient(**http_client_options())
+        _shared_http_clients[loop] = http_client
+
+    return http_client
+
+
+async def close_shared_http_client():
+    """
+    현재 이벤트 루프의 공유 연결 풀을 닫습니다.
+    프로그램(또는 이벤트 루프) 종료 직전에 호출합니다.
+
+    사용 예시:
+        await close_shared_http_client()
+    """
+    loop = asyncio.get_running_loop()
+    http_client = _shared_http_clients.pop(loop, None)
+    if http_client is not None:
+        await http_client.aclose()
+
+
+# ============================================================
+# API 클라이언트 생성
+# ============================================================
+
+def create_async_client(api_key):
+    """
+    OpenRouter 비동기 API 클라이언트를 생성합니다.
+    이벤트 루프 안에서 호출해야 하며, 공유 연결 풀을 사용합니다.
+
+    Args:
+        api_key: OpenRouter API 키
+
+    Returns:
+        AsyncOpenAI: 비동기 API 클라이언트 객체
+
+    사용 예시:
+        client = create_async_client("sk-or-...")
+    """
+    client = AsyncOpenAI(
+        base_url=API_BASE_URL,
+        api_key=api_key,
+        timeout=API_TIMEOUT,
+        # 재시도는 async_send_message가 retry 모듈 정책으로 직접 처리
+        max_retries=0,
+        http_client=get_shared_http_client()
+    )
+    return client
+
+
+async def async_validate_api_key(api_key):
+    """
+    API 키가 유효한지 비동기로 확인합니다.
+    /models 엔드포인트를 호출하여 검증하며,
+    결과는 validate_api_key와 같은 캐시를 공유합니다.
+
+    Args:
+        api_key: 검증할 API 키
+
+    Returns:
+        tuple: (성공 여부, 에러 메시지 또는 None)
+
+    사용 예시:
+        is_valid, error = await async_validate_api_key(api_key)
+    """
+    # API 키가 비어있는지 확인
+    if not api_key or api_key.strip() == "":
+        return False, ERROR_MESSAGES["no_api_key"]
+
+    # 동기 검증과 같은 프로세스 전역 캐시 사용
+    cached = get_cached_validation(api_key)
+    if cached is not None:
+        return cached
+
+    # API 호출로 키 유효성 검증 (모델 카탈로그는 validate_api_key와 같은 방식으로 저장)
+    headers = {"Authorization": f"Bearer {api_key}"}
+    headers.update(model_catalog.request_headers())
+    try:
+        response = await get_shared_http_client().get(
+            f"{API_BASE_URL}/models",
+            headers=headers,
+            timeout=10
+        )
+        model_catalog.update_from_response(response)
+        status_code = 200 if response.status_code == 304 else response.status_code
+        return cache_validation(api_key, status_code)
+
+    except httpx.TimeoutException:
+        return False, ERROR_MESSAGES["timeout"]
+    except httpx.TransportError:
+        return False, ERROR_MESSAGES["network_error"]
+    except Exception as e:
+        return False, ERROR_MESSAGES["unknown_error"].format(error=str(e))
+
+
+# ============================================================
+# 메시지 전송
+# ============================================================
+
+async def async_send_message(client, session, user_input, on_delta=None, use_cache=True, limiter=None):
+    """
+    사용자 메시지를 보내고 AI 응답을 비동기로 받습니다.
+    send_message와 동일하게 동작하며(재시도, 속도 제한, 전체 마감 시간 포함),
+    끝내 실패하면 사용자 메시지를 롤백합니다.
+
+    Args:
+        client: 비동기 API 클라이언트 (create_async_client로 생성)
+        session: 대화 세션
+        user_input: 사용자가 입력한 메시지
+        on_delta: 응답 조각을 받을 콜백 함수 (기본값: None, 스트리밍 안 함)
+        use_cache: 응답 캐시가 켜져 있을 때 캐시를 사용할지 여부
+        limiter: 이 요청에 사용할 속도 제한 버킷 (기본값: None, MODEL_RATE_LIMITS의 모델별 버킷)
+            (일괄 처리의 --rate-limit처럼 설정 파일의 제한을 대신할 때 지정)
+
+    Returns:
+        tuple: (성공 여부, 응답 또는 에러 메시지)
+
+    사용 예시:
+        success, response = await async_send_message(client, session, "안녕!")
+    """
+    # 보관소 기록(SQLite)은 이벤트 루프를 막지 않도록 다른 스레드에서 함
+    model_name, model_info, user_message, error = _begin_turn(session, user_input, flush_archive=False)
+    if error:
+        return False, error
+    await _flush_archive_async(session)
+
+    # 실제로 보낼 메시지 (관련 대화 검색을 쓰면 히스토리와 다르므로 캐시/합치기 키도 이것으로 만듦)
+    # 세션의 deque를 그대로 넘기지 않고 스냅숏으로 복사: 합친 요청은 이 세션이 취소되어
+    # 사용자 메시지를 롤백한 뒤에도 함께 기다리는 요청을 위해 계속 재시도할 수 있음
+    messages = list(build_payload(session, model_info))
+
+    # 응답 캐시 확인 (적중 시 API 호출 없이 바로 반환)
+    cache, cache_key, cached = _lookup_cached_response(messages, model_info, use_cache)
+    if cached is not None:
+        if on_delta is not None:
+            on_delta(cached)
+        add_message(session, "assistant", cached, flush_archive=False)
+        await _flush_archive_async(session)
+        return True, cached
+
+    # API 호출: 같은 요청이 동시에 진행 중이면 그 결과를 함께 받음
+    try:
+        if COALESCE_ENABLED:
+            success, result = await coalesce.run_async(
+                coalesce.make_key(client, model_info, messages),
+                lambda delta_callback: _async_complete_with_retry(
+                    client, model_name, model_info, messages, delta_callback, limiter
+                ),
+                on_delta
+            )
+        else:
+            success, result = await _async_complete_with_retry(
+                client, model_name, model_info, messages, on_delta, limiter
+            )
+    except BaseException:
+        # 작업 취소(asyncio.CancelledError) 시에도 히스토리를 되돌림
+        _rollback_user_message(session, user_message)
+        raise
+
+    if not success:
+        # 포기: 사용자 메시지 롤백 후 에러 메시지 반환
+        _rollback_user_message(session, user_message)
+        return False, result
+    assistant_message = result
+
+    # 다음에 같은 요청이 오면 재사용하도록 캐시에 저장
+    if cache is not None and assistant_message:
+        cache.put(cache_key, assistant_message)
+
+    # AI 응답을 세션에 추가
+    add_message(session, "assistant", assistant_message, flush_archive=False)
+    await _flush_archive_async(session)
+
+    # 히스토리가 길어졌으면 오래된 메시지 요약을 백그라운드 스레드에서 시작
+    # (요약은 같은 API 키의 동기 클라이언트로 요청)
+    if COMPACTION_ENABLED:
+        compactor.maybe_compact(create_client(client.api_key), session)
+
+    return True, assistant_message
+
+
+async def _flush_archive_async(session):
+    """히스토리에서 밀려난 메시지가 있으면 기본 스레드 풀에서 보관소에 기록합니다."""
+    if session.archive is not None and session.archive.has_pending():
+        await asyncio.to_thread(_flush_archive, session)
+
+
+async def _async_complete_with_retry(client, model_name, model_info, messages, on_delta=None, limiter=None):
+    """
+    chatbot._complete_with_retry의 비동기 버전입니다.
+    일시적인 오류는 백오프 후 재시도하며, 실패 시 롤백은 호출한 쪽에서 합니다.
+    limiter를 지정하면 모델별 버킷 대신 그 버킷에서만 토큰을 얻습니다.
+
+    Returns:
+        tuple: (성공 여부, AI 응답 또는 에러 메시지)
+    """
+    deadline = retry.start_deadline()
+    if limiter is None:
+        limiter = get_model_limiter(model_name)
+    attempt = 0
+
+    while True:
+        # 모델별 속도 제한: 429를 받기 전에 미리 요청 간격을 조절
+        if limiter is not None and not await limiter.acquire_async(max_wait=retry.remaining(deadline)):
+            return False, ERROR_MESSAGES["rate_limit"]
+
+        if retry.remaining(deadline) <= 0:
+            return False, ERROR_MESSAGES["timeout"]
+
+        # 시도마다 지연 시간과 토큰 사용량 측정
+        timer = telemetry.start_request(model_info["id"])
+        timer.extra["attempt"] = attempt + 1
+        try:
+            assistant_message, usage = await _async_request_completion(
+                client, model_info, messages, on_delta, timer,
+                timeout=min(API_TIMEOUT, retry.remaining(deadline))
+            )
+            timer.finish(usage=usage)
+            return True, assistant_message
+
+        except Exception as e:
+            timer.finish(error=e)
+
+            # 이미 전달한 스트리밍 조각이 있으면 다시 시도하지 않음
+            delay = None if timer.first_token is not None else retry.next_delay(attempt, e, deadline)
+            if delay is None:
+                return False, _api_error_message(e)
+
+            await asyncio.sleep(delay)
+            attempt += 1
+
+        except BaseException as e:
+            timer.finish(error=e)
+            raise
+
+
+async def _async_request_completion(client, model_info, messages, on_delta=None, timer=None, timeout=None):
+    """
+    API를 한 번 비동기 호출하여 응답을 받습니다. (재시도 없음)
+
+    Args:
+        client: 비동기 API 클라이언트
+        model_info: MODELS의 모델 정보 딕셔너리
+        messages: API에 보낼 메시지 리스트
+        on_delta: 응답 조각을 받을 콜백 함수 (None이면 스트리밍 안 함)
+        timer: 응답 헤더/첫 토큰 시점을 기록할 telemetry.RequestTimer (선택)
+        timeout: 이번 요청의 제한 시간 (초, 기본값: 클라이언트 설정)
+
+    Returns:
+        tuple: (응답 문자열, usage 객체 또는 None)
+    """
+    if on_delta is not None:
+        return await _async_stream_completion(client, model_info, messages, on_delta, timer, timeout)
+
+    response = await client.chat.completions.create(
+        model=model_info["id"],
+        max_tokens=model_info["max_tokens"],
+        messages=messages,
+        timeout=timeout if timeout is not None else NOT_GIVEN
+    )
+
+    # 응답 추출
+    return response.choices[0].message.content, response.usage
+
+
+async def _async_stream_completion(client, model_info, messages, on_delta, timer=None, timeout=None):
+    """
+    스트리밍 방식으로 API를 비동기 호출하고 응답 조각을 콜백으로 전달합니다.
+
+    Args:
+        client: 비동기 API 클라이언트
+        model_info: MODELS의 모델 정보 딕셔너리
+        messages: API에 보낼 메시지 리스트
+        on_delta: 응답 조각을 받을 콜백 함수
+        timer: 응답 헤더/첫 토큰 시점을 기록할 telemetry.RequestTimer (선택)
+        timeout: 이번 요청의 제한 시간 (초, 기본값: 클라이언트 설정)
+
+    Returns:
+        tuple: (조각을 모두 이어 붙인 전체 응답, usage 객체 또는 None)
+    """
+    stream = await client.chat.completions.create(
+        model=model_info["id"],
+        max_tokens=model_info["max_tokens"],
+        messages=messages,
+        stream=True,
+        # 마지막 조각에 토큰 사용량을 포함하도록 요청
+        stream_options={"include_usage": True},
+        timeout=timeout if timeout is not None else NOT_GIVEN
+    )
+    if timer is not None:
+        timer.mark_connected()
+
+    chunks = []
+    usage = None
+    try:
+        async for chunk in stream:
+            if chunk.usage is not None:
+                usage = chunk.usage
+
+            # 사용량 정보 등 choices가 비어있는 조각은 건너뜀
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                if timer is not None and not chunks:
+                    timer.mark_first_token()
+                chunks.append(delta)
+                on_delta(delta)
+    finally:
+        # 중간에 중단되더라도 HTTP 연결을 풀에 반납
+        await stream.close()
+
+    return "".join(chunks), usage
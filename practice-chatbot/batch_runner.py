@@ -0,0 +1,217 @@
+"""
+일괄 처리(batch) 모듈
+
+JSONL 파일의 프롬프트들을 동시에 여러 개씩 AI에게 보내고,
+결과를 JSONL 파일에 하나씩 바로 기록합니다.
+평가 데이터셋 실행이나 대량 답변 생성에 사용합니다.
+
+입력 파일 (한 줄에 하나):
+    {"id": "q1", "prompt": "파이썬이란?", "model": "gpt"}
+    {"prompt": "자바스크립트란?"}          # id가 없으면 줄 번호, model이 없으면 기본 모델
+
+출력 파일 (한 줄에 하나, 끝난 순서대로):
+    {"id": "q1", "model": "gpt", "success": true, "response": "...",
+     "error": null, "error_class": null, "latency_ms": 812.4}
+
+중단 후 같은 출력 파일로 다시 실행하면 이미 성공한 항목은 건너뜁니다.
+
+사용 예시:
+    python console_app.py --batch prompts.jsonl --output answers.jsonl --concurrency 16
+"""
+
+import asyncio
+import json
+import os
+import time
+
+from config import BATCH_CONCURRENCY, DEFAULT_MODEL, ERROR_MESSAGES, MODELS
+from chatbot import create_session
+from async_chatbot import create_async_client, async_send_message, close_shared_http_client
+from rate_limit import TokenBucket
+
+
+def default_output_path(input_path):
+    """
+    입력 파일 이름으로 기본 출력 파일 이름을 만듭니다.
+
+    Args:
+        input_path: 입력 JSONL 파일 경로
+
+    Returns:
+        str: 출력 파일 경로 (예: prompts.jsonl -> prompts.out.jsonl)
+    """
+    root, _ = os.path.splitext(input_path)
+    return root + ".out.jsonl"
+
+
+def load_completed_ids(output_path):
+    """
+    출력 파일에서 이미 성공한 항목의 id를 읽습니다. (이어서 실행용)
+
+    Args:
+        output_path: 출력 JSONL 파일 경로
+
+    Returns:
+        set: 성공한 항목 id 집합
+    """
+    completed = set()
+    if not os.path.exists(output_path):
+        return completed
+
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+            except json.JSONDecodeError:
+                # 중단되면서 마지막 줄이 잘린 경우
+                continue
+            if result.get("success"):
+                completed.add(str(result.get("id")))
+
+    return completed
+
+
+def error_class(message):
+    """
+    send_message의 에러 메시지를 ERROR_MESSAGES의 키로 분류합니다.
+
+    Args:
+        message: 에러 메시지
+
+    Returns:
+        str: 에러 종류 (예: "rate_limit", "timeout", "unknown_error")
+    """
+    for key, template in ERROR_MESSAGES.items():
+        if message == template:
+            return key
+    return "unknown_error"
+
+
+def read_items(input_path, completed_ids, default_model):
+    """
+    입력 파일을 한 줄씩 읽어 처리할 항목을 하나씩 돌려줍니다.
+    파일 전체를 메모리에 올리지 않습니다.
+
+    Args:
+        input_path: 입력 JSONL 파일 경로
+        completed_ids: 건너뛸 (이미 성공한) 항목 id 집합
+        default_model: model이 없는 항목에 사용할 모델 이름
+
+    Yields:
+        dict: {"id", "prompt", "model"} 또는 잘못된 줄이면 {"id", "invalid": 사유}
+    """
+    with open(input_path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+
+            try:
+                item = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield {"id": str(line_number), "invalid": f"JSON 형식 오류: {e}"}
+                continue
+
+            item_id = str(item.get("id", line_number))
+            if item_id in completed_ids:
+                continue
+
+            model = str(item.get("model", default_model)).lower()
+            if model not in MODELS:
+                yield {"id": item_id, "invalid": f"알 수 없는 모델: {model}"}
+                continue
+
+            yield {"id": item_id, "prompt": item.get("prompt", ""), "model": model}
+
+
+async def run_batch(api_key, input_path, output_path=None, concurrency=BATCH_CONCURRENCY,
+                    rate_limits=None, default_model=DEFAULT_MODEL, on_progress=None):
+    """
+    입력 파일의 프롬프트를 동시에 처리하고 결과를 출력 파일에 기록합니다.
+
+    Args:
+        api_key: OpenRouter API 키
+        input_path: 입력 JSONL 파일 경로
+        output_path: 출력 JSONL 파일 경로 (기본값: 입력파일.out.jsonl)
+        concurrency: 동시에 처리할 최대 요청 수
+        rate_limits: 모델별 초당 요청 수 제한 {모델 이름: 초당 요청 수}
+            (지정하지 않은 모델은 config.MODEL_RATE_LIMITS를 따름)
+        default_model: model이 없는 항목에 사용할 모델 이름
+        on_progress: 항목 하나가 끝날 때마다 호출할 함수 (결과 딕셔너리 전달)
+
+    Returns:
+        dict: {"succeeded": 성공 수, "failed": 실패 수, "skipped": 건너뛴 수, "elapsed_s": 걸린 시간}
+
+    사용 예시:
+        summary = asyncio.run(run_batch(api_key, "prompts.jsonl", concurrency=16))
+    """
+    output_path = output_path or default_output_path(input_path)
+    completed_ids = load_completed_ids(output_path)
+
+    # 직접 지정한 제한은 설정 파일의 제한을 대신함 (토큰은 async_send_message에서 한 번만 얻음)
+    limiters = {name: TokenBucket(rate) for name, rate in (rate_limits or {}).items()}
+
+    client = create_async_client(api_key)
+    summary = {"succeeded": 0, "failed": 0, "skipped": len(completed_ids)}
+    started = time.perf_counter()
+
+    # 작업 대기열 크기를 제한하여 큰 파일도 조금씩 읽어 들임
+    queue = asyncio.Queue(maxsize=concurrency * 2)
+
+    with open(output_path, "a", encoding="utf-8") as output:
+
+        def write_result(result):
+            output.write(json.dumps(result, ensure_ascii=False) + "\n")
+            output.flush()
+            summary["succeeded" if result["success"] else "failed"] += 1
+            if on_progress is not None:
+                on_progress(result)
+
+        async def process(item):
+            if "invalid" in item:
+                return {
+                    "id": item["id"], "model": None, "success": False, "response": None,
+                    "error": item["invalid"], "error_class": "invalid_input", "latency_ms": 0.0
+                }
+
+            session = create_session(item["model"])
+            item_started = time.perf_counter()
+            success, response = await async_send_message(
+                client, session, item["prompt"], limiter=limiters.get(item["model"])
+            )
+            latency_ms = (time.perf_counter() - item_started) * 1000
+
+            return {
+                "id": item["id"],
+                "model": item["model"],
+                "success": success,
+                "response": response if success else None,
+                "error": None if success else response,
+                "error_class": None if success else error_class(response),
+                "latency_ms": round(latency_ms, 1)
+            }
+
+        async def worker():
+            while True:
+                item = await queue.get()
+                try:
+                    if item is None:
+                        return
+                    write_result(await process(item))
+                finally:
+                    queue.task_done()
+
+        workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+        try:
+            for item in read_items(input_path, completed_ids, default_model):
+                await queue.put(item)
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+        finally:
+            for task in workers:
+                task.cancel()
+            await close_shared_http_client()
+
+    summary["elapsed_s"] = round(time.perf_counter() - started, 2)
+    return summary
@@ -0,0 +1,114 @@
+"""
+지난 대화 보관소(turn_archive.py) 측정 벤치마크
+
+세션에 한국어/영어가 섞인 메시지를 히스토리 최대 길이보다 훨씬 많이 추가해
+밀려난 메시지가 보관소에 쌓이게 한 뒤 다음을 측정합니다. API는 호출하지 않습니다.
+
+- 메시지 추가 시간: 보관/색인 갱신을 포함한 add_message() 한 번의 시간
+- 저장 크기: 압축 전 본문, 압축 블록, SQLite 파일 (색인 포함)
+- 검색 시간: 보관소에서 한 글자/단어/여러 단어/없는 단어를 검색한 p50, p95
+  (현재 히스토리는 제외하고 보관소만 검색)
+- 메모리: 메시지를 계속 추가해도 파이썬 메모리 사용량이 늘지 않는지 (tracemalloc)
+
+실행 방법:
+    python benchmarks/bench_archive.py
+    python benchmarks/bench_archive.py --messages 50000 --searches 200
+"""
+
+import argparse
+import array
+import os
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+# practice-chatbot 폴더의 모듈을 불러올 수 있도록 경로 추가
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import chatbot
+
+
+TOPICS = ["파이썬", "리스트", "튜플", "딕셔너리", "비동기", "스레드", "데이터베이스", "인덱스",
+          "캐시", "압축", "정렬", "검색", "스트리밍", "토큰", "모델", "세션"]
+WORDS = ["어떻게", "사용하나요", "차이가", "뭔가요", "예제를", "보여줘", "성능이", "중요합니다",
+         "그리고", "때문에", "먼저", "다음으로", "그러면", "좋습니다", "python", "async", "sqlite"]
+
+QUERIES = {
+    "한 글자": "캐",
+    "단어": "딕셔너리",
+    "여러 단어": "비동기 스레드 예제를",
+    "영어": "SQLite",
+    "없는 단어": "블록체인",
+}
+
+
+def make_text(rng, index):
+    """주제어와 일반 단어를 섞은 메시지 본문을 만듭니다."""
+    words = rng.choices(TOPICS, k=3) + rng.choices(WORDS, k=rng.randint(8, 40))
+    rng.shuffle(words)
+    return f"{index}번 " + " ".join(words)
+
+
+def percentile(values, ratio):
+    """정렬한 값에서 비율 위치의 값을 반환합니다."""
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * ratio))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="지난 대화 보관소 측정")
+    parser.add_argument("--messages", type=int, default=20000, help="추가할 메시지 수")
+    parser.add_argument("--searches", type=int, default=100, help="검색어마다 검색 횟수")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    session = chatbot.create_session("gpt", archive=True)
+
+    # 메시지 추가 (앞 절반이 끝난 뒤의 메모리를 기준으로 비교)
+    # 측정값 목록이 메모리 측정에 섞이지 않도록 미리 할당
+    add_times = array.array("d", bytes(8 * args.messages))
+    tracemalloc.start()
+    half = args.messages // 2
+    baseline = None
+    for index in range(args.messages):
+        role = "user" if index % 2 == 0 else "assistant"
+        text = make_text(rng, index)
+        started = time.perf_counter()
+        chatbot.add_message(session, role, text)
+        add_times[index] = (time.perf_counter() - started) * 1000
+        if index == half:
+            baseline = tracemalloc.get_traced_memory()[0]
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    stats = session.archive.stats()
+    per_message = stats["raw_bytes"] and stats["raw_bytes"] / max(1, stats["messages"])
+
+    print(f"메시지 {args.messages:,}개 추가 (히스토리 {len(session)}개 유지, 보관 {stats['messages']:,}개)")
+    print(f"  추가 시간: p50 {statistics.median(add_times):.3f}ms / p95 {percentile(add_times, 0.95):.3f}ms"
+          f" / 최대 {max(add_times):.1f}ms")
+    print(f"  본문: 압축 전 {stats['raw_bytes'] / 1024:,.0f}KB → 압축 {stats['compressed_bytes'] / 1024:,.0f}KB"
+          f" ({stats['raw_bytes'] / max(1, stats['compressed_bytes']):.1f}배, 블록 {stats['blocks']:,}개,"
+          f" 메시지당 {per_message:,.0f}B)")
+    print(f"  파일: {stats['file_bytes'] / 1024:,.0f}KB (색인 포함)")
+    print(f"  파이썬 메모리: 절반 추가 후 {baseline / 1024:,.0f}KB → 전부 추가 후 {current / 1024:,.0f}KB"
+          f" (최대 {peak / 1024:,.0f}KB)")
+
+    print()
+    print(f"{'검색':<12}{'결과':>6}{'p50':>10}{'p95':>10}")
+    for label, query in QUERIES.items():
+        timings = []
+        for _ in range(args.searches):
+            started = time.perf_counter()
+            hits = session.archive.search(query)
+            timings.append((time.perf_counter() - started) * 1000)
+        print(f"{label:<12}{len(hits):>6}{statistics.median(timings):>8.2f}ms{percentile(timings, 0.95):>8.2f}ms")
+
+    chatbot.close_session(session)
+
+
+if __name__ == "__main__":
+    main()
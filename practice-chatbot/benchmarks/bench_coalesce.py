@@ -0,0 +1,218 @@
+"""
+같은 요청 합치기(coalesce.py) 효과 측정 벤치마크
+
+가짜 OpenRouter 서버를 상대로 여러 사용자가 거의 동시에 같은 첫 질문을
+새 세션에서 보내는 상황(공유 링크, 추천 질문 버튼 등)을 만들고,
+요청 합치기를 끈 경우와 켠 경우의 실제 API 호출 수와 응답 시간을 비교합니다.
+실제 openrouter.ai는 사용하지 않습니다.
+
+확인 항목:
+- 가짜 서버가 받은 /chat/completions 요청 수 (합치기 켬이면 1회여야 함)
+- 모든 세션이 각자 assistant 메시지를 받았는지
+- 에러가 나면 모든 세션의 사용자 메시지가 롤백되는지
+- 취소할 수 있는 요청(콘솔/Streamlit처럼 CancelToken 전달)도 합쳐지는지,
+  일부가 취소해도 나머지는 응답을 받는지
+- 먼저 보낸 요청이 첫 시도 중에 취소되어 사용자 메시지를 롤백해도,
+  재시도는 원래 질문을 보내고 함께 기다린 요청이 그 응답을 받는지 (스레드/asyncio)
+
+실행 방법:
+    python benchmarks/bench_coalesce.py
+    python benchmarks/bench_coalesce.py --users 100 --latency 0.5
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+
+# practice-chatbot 폴더의 모듈을 불러올 수 있도록 경로 추가
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from fake_openrouter import FakeOpenRouter, VALID_API_KEY
+
+
+QUESTION = "파이썬에서 리스트와 튜플의 차이를 알려줘"
+
+
+def run_threads(chatbot, client, users, stream, cancels=None):
+    """
+    스레드 users개가 동시에 같은 질문을 보냅니다.
+
+    Args:
+        cancels: 사용자별 CancelToken 목록 (기본값: None, 취소 토큰 없이 보냄)
+
+    Returns:
+        tuple: (세션 목록, 결과 목록, 걸린 시간(초))
+    """
+    sessions = [chatbot.create_session("gpt") for _ in range(users)]
+    results = [None] * users
+    barrier = threading.Barrier(users)
+
+    def worker(index):
+        on_delta = (lambda delta: None) if stream else None
+        cancel = cancels[index] if cancels is not None else None
+        barrier.wait()
+        results[index] = chatbot.send_message(client, sessions[index], QUESTION, on_delta=on_delta, cancel=cancel)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(users)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sessions, results, time.perf_counter() - started
+
+
+def run_tasks(async_chatbot, chatbot, users, stream):
+    """
+    asyncio 작업 users개가 동시에 같은 질문을 보냅니다.
+
+    Returns:
+        tuple: (세션 목록, 결과 목록, 걸린 시간(초))
+    """
+    sessions = [chatbot.create_session("gpt") for _ in range(users)]
+
+    async def main():
+        client = async_chatbot.create_async_client(VALID_API_KEY)
+        on_delta = (lambda delta: None) if stream else None
+        return await asyncio.gather(*(
+            async_chatbot.async_send_message(client, session, QUESTION, on_delta=on_delta)
+            for session in sessions
+        ))
+
+    started = time.perf_counter()
+    results = asyncio.run(main())
+    return sessions, results, time.perf_counter() - started
+
+
+def run_leader_cancel(async_chatbot, chatbot, client, server, latency, use_async):
+    """
+    같은 질문을 보낸 두 세션 중 먼저 보낸 쪽이 첫 시도(429 에러) 도중에 취소되고,
+    뒤에 합류한 쪽은 재시도 결과를 받는 상황을 만듭니다.
+
+    Returns:
+        tuple: (뒤에 합류한 요청의 결과, 취소한 세션의 메시지 수, 재시도 때 보낸 메시지 내용 목록)
+    """
+    leader, follower = chatbot.create_session("gpt"), chatbot.create_session("gpt")
+    server.error_rate, server.error_status, server.retry_after = 1.0, 429, 0.2
+
+    # 첫 시도의 에러 응답이 나간 뒤, 재시도 전에 에러 주입을 끔
+    def stop_errors():
+        server.error_rate, server.retry_after = 0.0, None
+
+    threading.Timer(latency + 0.1, stop_errors).start()
+
+    if use_async:
+        async def main():
+            async_client = async_chatbot.create_async_client(VALID_API_KEY)
+            first = asyncio.create_task(async_chatbot.async_send_message(
+                async_client, leader, QUESTION, use_cache=False))
+            await asyncio.sleep(0.02)
+            second = asyncio.create_task(async_chatbot.async_send_message(
+                async_client, follower, QUESTION, use_cache=False))
+            await asyncio.sleep(latency / 2)
+            first.cancel()
+            return await second
+
+        result = asyncio.run(main())
+    else:
+        cancel = chatbot.CancelToken()
+        first = threading.Thread(target=chatbot.send_message, args=(client, leader, QUESTION),
+                                 kwargs={"use_cache": False, "cancel": cancel})
+        first.start()
+        time.sleep(0.02)
+        threading.Timer(latency / 2, cancel.cancel).start()
+        result = chatbot.send_message(client, follower, QUESTION, use_cache=False, cancel=chatbot.CancelToken())
+        first.join()
+
+    sent = [message.get("content") for message in server.last_request.get("messages", [])]
+    return result, len(leader.messages), sent
+
+
+def summarize(sessions, results):
+    """성공 수, 응답이 추가된 세션 수, 롤백된 세션 수를 셉니다."""
+    succeeded = sum(1 for success, _ in results if success)
+    answered = sum(1 for s in sessions if [m.role for m in s.messages] == ["user", "assistant"])
+    rolled_back = sum(1 for s in sessions if not s.messages)
+    return succeeded, answered, rolled_back
+
+
+def main():
+    parser = argparse.ArgumentParser(description="같은 요청 합치기 효과 측정")
+    parser.add_argument("--users", type=int, default=50, help="동시에 같은 질문을 보내는 사용자 수")
+    parser.add_argument("--latency", type=float, default=0.3, help="가짜 서버 첫 바이트 지연 (초)")
+    parser.add_argument("--token-interval", type=float, default=0.005, help="스트리밍 조각 간격 (초)")
+    parser.add_argument("--response-tokens", type=int, default=40, help="응답 토큰 수")
+    args = parser.parse_args()
+
+    with FakeOpenRouter(latency=args.latency, token_interval=args.token_interval,
+                        response_tokens=args.response_tokens) as server:
+        # chatbot을 불러오기 전에 가짜 서버 주소 설정
+        os.environ["OPENROUTER_BASE_URL"] = server.base_url
+        import async_chatbot
+        import chatbot
+        import coalesce
+
+        client = chatbot.create_client(VALID_API_KEY)
+
+        print(f"사용자 {args.users}명이 동시에 같은 첫 질문 전송 (지연 {args.latency * 1000:.0f}ms)")
+        print(f"{'':<22}{'API 호출':>10}{'성공':>8}{'응답 추가':>10}{'시간':>10}")
+
+        cases = [
+            ("스레드", False, False), ("스레드", False, True),
+            ("스레드+스트리밍", True, False), ("스레드+스트리밍", True, True),
+            ("asyncio+스트리밍", True, True)
+        ]
+        for label, stream, enabled in cases:
+            chatbot.COALESCE_ENABLED = async_chatbot.COALESCE_ENABLED = enabled
+            before = server.stats().get("completions", 0)
+            if label.startswith("asyncio"):
+                sessions, results, elapsed = run_tasks(async_chatbot, chatbot, args.users, stream)
+            else:
+                sessions, results, elapsed = run_threads(chatbot, client, args.users, stream)
+            upstream = server.stats().get("completions", 0) - before
+            succeeded, answered, _ = summarize(sessions, results)
+            name = f"{label} ({'합치기' if enabled else '끔'})"
+            print(f"{name:<22}{upstream:>10}{succeeded:>8}{answered:>10}{elapsed * 1000:>8.0f}ms")
+
+        # 취소할 수 있는 요청: 절반이 중간에 취소해도 API 호출은 1회, 나머지는 응답을 받아야 함
+        cancels = [chatbot.CancelToken() for _ in range(args.users)]
+        for cancel in cancels[::2]:
+            threading.Timer(args.latency / 2, cancel.cancel).start()
+        before = server.stats().get("completions", 0)
+        sessions, results, elapsed = run_threads(chatbot, client, args.users, True, cancels)
+        upstream = server.stats().get("completions", 0) - before
+        succeeded, answered, rolled_back = summarize(sessions, results)
+        print(f"{'취소 토큰 (절반 취소)':<22}{upstream:>10}{succeeded:>8}{answered:>10}{elapsed * 1000:>8.0f}ms"
+              f"  (롤백 {rolled_back})")
+
+        # 먼저 보낸 요청이 취소된 뒤의 재시도: 롤백한 세션이 아니라 원래 질문을 보내야 함
+        print()
+        for label, use_async in (("스레드", False), ("asyncio", True)):
+            (success, response), leader_messages, sent = run_leader_cancel(
+                async_chatbot, chatbot, client, server, args.latency, use_async
+            )
+            status = "정상" if success and sent == [QUESTION] and leader_messages == 0 else "실패"
+            print(f"먼저 보낸 요청 취소 후 재시도 ({label}): {status}"
+                  f" (응답 받음 {success}, 재시도로 보낸 메시지 {sent}, 취소한 세션 메시지 {leader_messages}개)")
+
+        # 실패도 함께 받는지 확인: 모든 세션이 에러를 받고 사용자 메시지가 롤백되어야 함
+        chatbot.COALESCE_ENABLED = True
+        server.error_rate, server.error_status = 1.0, 400
+        sessions, results, _ = run_threads(chatbot, client, args.users, stream=True)
+        server.error_rate = 0.0
+        succeeded, _, rolled_back = summarize(sessions, results)
+
+    stats = coalesce.get_coalesce_stats()
+    print()
+    print(f"에러 전파: 성공 {succeeded} / 롤백된 세션 {rolled_back}/{args.users}")
+    print(f"전체: 요청 {stats['calls']}회 중 {stats['coalesced']}회 합침"
+          f" ({stats['coalesce_ratio']:.0%}), API 호출 {stats['upstream']}회")
+
+
+if __name__ == "__main__":
+    main()
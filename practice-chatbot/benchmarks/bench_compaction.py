@@ -0,0 +1,95 @@
+"""
+히스토리 요약(compaction) 효과 측정 벤치마크
+
+가짜 OpenRouter 서버를 상대로 긴 대화를 두 번 진행하여
+(요약 끔 / 요약 켬) 한 턴당 입력 토큰(prompt_tokens)을 비교합니다.
+실제 openrouter.ai는 사용하지 않습니다.
+
+요약 켬 모드에서는 턴마다 백그라운드 요약이 끝나기를 기다려 결과를 항상 같게 만듭니다.
+(실제 앱에서는 기다리지 않고 다음 요청 때 반영됩니다)
+
+실행 방법:
+    python benchmarks/bench_compaction.py
+    python benchmarks/bench_compaction.py --turns 100 --message-chars 600
+"""
+
+import argparse
+import os
+import statistics
+import sys
+
+# practice-chatbot 폴더의 모듈을 불러올 수 있도록 경로 추가
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from fake_openrouter import FakeOpenRouter, VALID_API_KEY
+
+
+def run_conversation(chatbot, compactor, telemetry, client, turns, message_chars, compaction):
+    """
+    대화를 진행하고 턴별 입력 토큰 수를 반환합니다.
+
+    Returns:
+        list: 턴별 prompt_tokens (요약 요청 제외)
+    """
+    prompt_tokens = []
+
+    def sink(record):
+        if record.get("purpose") is None and record["prompt_tokens"] is not None:
+            prompt_tokens.append(record["prompt_tokens"])
+
+    telemetry.add_sink(sink)
+    try:
+        session = chatbot.create_session("gpt")
+        for turn in range(turns):
+            text = f"{turn}번째 질문입니다. " + "긴 대화 내용 " * (message_chars // 7)
+            chatbot.send_message(client, session, text)
+            if compaction:
+                compactor.wait_for_compaction(session, timeout=10)
+    finally:
+        telemetry.remove_sink(sink)
+
+    return prompt_tokens
+
+
+def main():
+    parser = argparse.ArgumentParser(description="히스토리 요약 효과 측정")
+    parser.add_argument("--turns", type=int, default=60, help="대화 턴 수")
+    parser.add_argument("--message-chars", type=int, default=300, help="사용자 메시지 길이 (글자)")
+    parser.add_argument("--response-tokens", type=int, default=80, help="가짜 응답 토큰 수")
+    args = parser.parse_args()
+
+    with FakeOpenRouter(response_tokens=args.response_tokens) as server:
+        # chatbot을 불러오기 전에 가짜 서버 주소 설정
+        os.environ["OPENROUTER_BASE_URL"] = server.base_url
+        import chatbot
+        import compactor
+        import telemetry
+
+        client = chatbot.create_client(VALID_API_KEY)
+
+        results = {}
+        for compaction in (False, True):
+            compactor.COMPACTION_ENABLED = compaction
+            results[compaction] = run_conversation(
+                chatbot, compactor, telemetry, client,
+                args.turns, args.message_chars, compaction
+            )
+
+    baseline, compacted = results[False], results[True]
+    stats = compactor.get_compaction_stats()
+
+    print(f"{'':<14}{'평균/턴':>10}{'마지막 턴':>10}{'합계':>12}")
+    for label, values in (("요약 끔", baseline), ("요약 켬", compacted)):
+        print(f"{label:<14}{statistics.fmean(values):>10.0f}{values[-1]:>10}{sum(values):>12,}")
+
+    reduction = 1 - sum(compacted) / sum(baseline) if sum(baseline) else 0.0
+    print()
+    print(f"입력 토큰 감소: {reduction:.1%}")
+    print(f"요약 횟수: {stats['compactions']}회 (메시지 {stats['messages_compacted']}개,"
+          f" 추정 {stats['tokens_saved']:,}토큰 절약, 캐시 적중 {stats['cache_hits']}회)")
+
+
+if __name__ == "__main__":
+    main()
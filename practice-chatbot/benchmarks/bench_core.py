@@ -0,0 +1,287 @@
+"""
+챗봇 핵심 함수 마이크로 벤치마크
+
+가짜 OpenRouter 서버(fake_openrouter.py)를 띄워 놓고 chatbot.py의 핵심 함수를
+반복 호출하여 클라이언트 쪽 오버헤드를 측정합니다. 실제 openrouter.ai는 사용하지 않습니다.
+
+측정 항목:
+- 호출당 지연 시간 분포 (평균, p50, p95, p99, 최소, 최대)
+- 초당 처리량
+- 호출당 메모리 할당 (tracemalloc 기준 최대 사용량, 남은 양)
+
+실행 방법:
+    python benchmarks/bench_core.py
+    python benchmarks/bench_core.py --iterations 500 --output results.json
+    python benchmarks/bench_core.py --compare results.json   # 이전 결과와 비교
+
+--compare를 지정하면 p50 지연이 --threshold(기본 20%) 이상 느려진 항목을
+회귀로 표시하고 종료 코드 1을 반환합니다.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+# practice-chatbot 폴더의 모듈을 불러올 수 있도록 경로 추가
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from fake_openrouter import FakeOpenRouter, VALID_API_KEY
+
+
+# ============================================================
+# 측정 도구
+# ============================================================
+
+def percentile(sorted_values, ratio):
+    """정렬된 값 목록에서 백분위수를 구합니다. (최근접 순위 방식)"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(ratio * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies_ns):
+    """
+    지연 시간 목록(나노초)을 통계로 요약합니다.
+
+    Returns:
+        dict: 밀리초 단위 통계와 초당 처리량
+    """
+    values = sorted(latencies_ns)
+    total = sum(values)
+    to_ms = 1e-6
+    return {
+        "calls": len(values),
+        "mean_ms": statistics.fmean(values) * to_ms,
+        "p50_ms": percentile(values, 0.50) * to_ms,
+        "p95_ms": percentile(values, 0.95) * to_ms,
+        "p99_ms": percentile(values, 0.99) * to_ms,
+        "min_ms": values[0] * to_ms,
+        "max_ms": values[-1] * to_ms,
+        "throughput_per_s": len(values) / (total / 1e9) if total else 0.0
+    }
+
+
+def measure(func, iterations, warmup, alloc_iterations):
+    """
+    함수를 반복 호출하여 지연 시간과 메모리 할당을 측정합니다.
+
+    Args:
+        func: 인자 없이 호출할 함수
+        iterations: 지연 시간 측정 횟수
+        warmup: 측정 전 예열 호출 횟수
+        alloc_iterations: 메모리 할당 측정 횟수 (tracemalloc은 느리므로 따로 측정)
+
+    Returns:
+        dict: 지연 시간 통계 + 메모리 할당 통계
+    """
+    for _ in range(warmup):
+        func()
+
+    latencies = []
+    for _ in range(iterations):
+        start = time.perf_counter_ns()
+        func()
+        latencies.append(time.perf_counter_ns() - start)
+
+    result = summarize(latencies)
+
+    # 메모리 할당 측정
+    peaks, nets = [], []
+    tracemalloc.start()
+    try:
+        for _ in range(alloc_iterations):
+            before, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            func()
+            after, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - before)
+            nets.append(after - before)
+    finally:
+        tracemalloc.stop()
+
+    result["alloc_peak_bytes"] = statistics.fmean(peaks) if peaks else 0.0
+    result["alloc_net_bytes"] = statistics.fmean(nets) if nets else 0.0
+    return result
+
+
+# ============================================================
+# 벤치마크 대상
+# ============================================================
+
+def build_benchmarks(server):
+    """
+    측정할 함수 목록을 만듭니다.
+    chatbot 모듈은 가짜 서버 주소를 환경변수로 설정한 뒤에 불러옵니다.
+
+    Returns:
+        list: (이름, 함수) 튜플 목록
+    """
+    import openai
+    import chatbot
+
+    client = chatbot.create_client(VALID_API_KEY)
+    long_text = "안녕하세요, 오늘 날씨가 좋네요. The quick brown fox jumps. " * 20
+
+    # add_message: 가득 찬 세션에 계속 추가 (오래된 메시지 삭제 경로 포함)
+    full_session = chatbot.create_session("gpt")
+    for i in range(200):
+        chatbot.add_message(full_session, "user", long_text)
+
+    def bench_add_message():
+        chatbot.add_message(full_session, "user", long_text)
+
+    def bench_estimate_tokens():
+        chatbot.estimate_tokens(long_text)
+
+    errors = [
+        TimeoutError("Request timed out"),
+        ConnectionError("connection refused"),
+        RuntimeError("Error code: 429 rate limited"),
+        RuntimeError("Error code: 503 service unavailable"),
+        ValueError("something else")
+    ]
+
+    def bench_handle_error():
+        for error in errors:
+            chatbot.handle_error(error)
+
+    def bench_validate_cold():
+        chatbot.clear_validation_cache()
+        chatbot.validate_api_key(VALID_API_KEY)
+
+    def bench_validate_cached():
+        chatbot.validate_api_key(VALID_API_KEY)
+
+    def bench_send_message():
+        session = chatbot.create_session("gpt")
+        chatbot.send_message(client, session, "안녕하세요!")
+
+    def bench_send_message_stream():
+        session = chatbot.create_session("gpt")
+        chatbot.send_message(client, session, "안녕하세요!", on_delta=lambda delta: None)
+
+    # 에러 경로: 재시도(백오프 대기) 없이 롤백과 에러 메시지 변환만 측정
+    import retry
+
+    def bench_send_message_error():
+        server.error_rate = 1.0
+        max_attempts, retry.RETRY_MAX_ATTEMPTS = retry.RETRY_MAX_ATTEMPTS, 1
+        try:
+            session = chatbot.create_session("gpt")
+            chatbot.send_message(client, session, "안녕하세요!")
+        finally:
+            server.error_rate = 0.0
+            retry.RETRY_MAX_ATTEMPTS = max_attempts
+
+    def bench_api_error_mapping():
+        chatbot._api_error_message(openai.APITimeoutError(request=None))
+
+    return [
+        ("estimate_tokens", bench_estimate_tokens),
+        ("add_message", bench_add_message),
+        ("handle_error", bench_handle_error),
+        ("api_error_mapping", bench_api_error_mapping),
+        ("validate_api_key_cold", bench_validate_cold),
+        ("validate_api_key_cached", bench_validate_cached),
+        ("send_message", bench_send_message),
+        ("send_message_stream", bench_send_message_stream),
+        ("send_message_error", bench_send_message_error),
+    ]
+
+
+# ============================================================
+# 결과 비교
+# ============================================================
+
+def compare(results, baseline, threshold):
+    """
+    이전 결과와 p50 지연 시간을 비교합니다.
+
+    Returns:
+        list: 회귀한 항목 이름 목록
+    """
+    regressions = []
+    print()
+    print(f"{'항목':<26}{'이전 p50':>12}{'현재 p50':>12}{'변화':>10}")
+    for name, current in results.items():
+        previous = baseline.get("results", {}).get(name)
+        if not previous or not previous["p50_ms"]:
+            continue
+        change = current["p50_ms"] / previous["p50_ms"] - 1
+        marker = ""
+        if change > threshold:
+            marker = "  <- 회귀"
+            regressions.append(name)
+        print(f"{name:<26}{previous['p50_ms']:>10.3f}ms{current['p50_ms']:>10.3f}ms{change:>+9.1%}{marker}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="챗봇 핵심 함수 마이크로 벤치마크")
+    parser.add_argument("--iterations", type=int, default=200, help="항목별 측정 횟수")
+    parser.add_argument("--warmup", type=int, default=20, help="항목별 예열 횟수")
+    parser.add_argument("--alloc-iterations", type=int, default=20, help="메모리 할당 측정 횟수")
+    parser.add_argument("--latency", type=float, default=0.0, help="가짜 서버 응답 지연 (초)")
+    parser.add_argument("--response-tokens", type=int, default=50, help="가짜 응답 토큰 수")
+    parser.add_argument("--only", nargs="*", help="측정할 항목 이름 (기본값: 전체)")
+    parser.add_argument("--output", help="결과를 저장할 JSON 파일")
+    parser.add_argument("--compare", help="비교할 이전 결과 JSON 파일")
+    parser.add_argument("--threshold", type=float, default=0.2, help="회귀로 판단할 p50 증가율")
+    args = parser.parse_args()
+
+    with FakeOpenRouter(latency=args.latency, response_tokens=args.response_tokens) as server:
+        # chatbot을 불러오기 전에 가짜 서버 주소 설정
+        os.environ["OPENROUTER_BASE_URL"] = server.base_url
+        benchmarks = build_benchmarks(server)
+
+        results = {}
+        print(f"{'항목':<26}{'p50':>10}{'p95':>10}{'p99':>10}{'처리량/s':>12}{'할당(peak)':>14}")
+        for name, func in benchmarks:
+            if args.only and name not in args.only:
+                continue
+            result = measure(func, args.iterations, args.warmup, args.alloc_iterations)
+            results[name] = result
+            print(
+                f"{name:<26}{result['p50_ms']:>8.3f}ms{result['p95_ms']:>8.3f}ms"
+                f"{result['p99_ms']:>8.3f}ms{result['throughput_per_s']:>12.0f}"
+                f"{result['alloc_peak_bytes']:>12.0f}B"
+            )
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "iterations": args.iterations,
+            "latency": args.latency,
+            "response_tokens": args.response_tokens
+        },
+        "results": results
+    }
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print()
+        print(f"결과 저장: {args.output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print()
+            print(f"회귀 발견: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
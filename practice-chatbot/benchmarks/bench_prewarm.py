@@ -0,0 +1,96 @@
+"""
+연결 미리 열기(warm-up) 효과 측정 벤치마크
+
+가짜 OpenRouter 서버에 새 연결마다 핸드셰이크 비용(--connect-latency)을 주고,
+앱 시작 직후 첫 메시지의 응답 시간을 비교합니다. 실제 openrouter.ai는 사용하지 않습니다.
+
+- 미리 열지 않음: 첫 메시지가 연결을 새로 엶
+- 미리 열기: API 키 검증과 동시에 start_warm_up()으로 연결을 열어 둠
+- 평상시: 같은 연결로 보낸 두 번째 메시지 (목표치)
+
+시도마다 연결 풀과 검증 캐시를 비우고, 검증 뒤 사용자가 입력하는 시간(--think-time)을 기다린 다음
+첫 메시지를 보냅니다.
+
+실행 방법:
+    python benchmarks/bench_prewarm.py
+    python benchmarks/bench_prewarm.py --connect-latency 0.3 --trials 20
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+# practice-chatbot 폴더의 모듈을 불러올 수 있도록 경로 추가
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from fake_openrouter import FakeOpenRouter, VALID_API_KEY
+
+
+def run_trial(chatbot, warm_up, think_time):
+    """
+    앱 시작부터 두 번째 메시지까지 진행합니다.
+
+    Returns:
+        tuple: (첫 메시지 응답 시간(ms), 두 번째 메시지 응답 시간(ms))
+    """
+    chatbot.close_clients()
+    chatbot.clear_validation_cache()
+
+    if warm_up:
+        chatbot.start_warm_up()
+    is_valid, error = chatbot.validate_api_key(VALID_API_KEY)
+    if not is_valid:
+        raise RuntimeError(error)
+    client = chatbot.create_client(VALID_API_KEY)
+
+    # 사용자가 첫 메시지를 입력하는 시간
+    time.sleep(think_time)
+
+    session = chatbot.create_session("gpt")
+    timings = []
+    for text in ("첫 질문", "두 번째 질문"):
+        started = time.perf_counter()
+        success, response = chatbot.send_message(client, session, text, use_cache=False)
+        if not success:
+            raise RuntimeError(response)
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings[0], timings[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="연결 미리 열기 효과 측정")
+    parser.add_argument("--trials", type=int, default=10, help="측정 횟수")
+    parser.add_argument("--connect-latency", type=float, default=0.15, help="새 연결 지연 (초)")
+    parser.add_argument("--latency", type=float, default=0.05, help="가짜 서버 첫 바이트 지연 (초)")
+    parser.add_argument("--think-time", type=float, default=0.5, help="검증 후 첫 메시지까지 시간 (초)")
+    args = parser.parse_args()
+
+    with FakeOpenRouter(latency=args.latency, connect_latency=args.connect_latency) as server:
+        # chatbot을 불러오기 전에 가짜 서버 주소 설정
+        os.environ["OPENROUTER_BASE_URL"] = server.base_url
+        import chatbot
+
+        results = {}
+        for warm_up in (False, True):
+            before = server.stats().get("connections", 0)
+            trials = [run_trial(chatbot, warm_up, args.think_time) for _ in range(args.trials)]
+            connections = server.stats().get("connections", 0) - before
+            results[warm_up] = (trials, connections)
+
+    print(f"새 연결 지연 {args.connect_latency * 1000:.0f}ms, 응답 지연 {args.latency * 1000:.0f}ms,"
+          f" {args.trials}회 측정 (중앙값)")
+    print(f"{'':<16}{'첫 메시지':>10}{'평상시':>10}{'차이':>10}{'연결 수/회':>12}")
+    for warm_up, label in ((False, "미리 열지 않음"), (True, "미리 열기")):
+        trials, connections = results[warm_up]
+        first = statistics.median(t[0] for t in trials)
+        steady = statistics.median(t[1] for t in trials)
+        print(f"{label:<16}{first:>8.0f}ms{steady:>8.0f}ms{first - steady:>+8.0f}ms"
+              f"{connections / args.trials:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+히스토리 정리 방식별 프롬프트 캐시 적중률 벤치마크
+
+가짜 OpenRouter 서버(직전 요청과 앞부분이 같은 메시지를 cached_tokens로 보고)를 상대로
+히스토리가 최대 길이를 넘도록 긴 대화를 진행하여,
+"sliding"(하나씩 삭제)과 "chunked"(한 번에 삭제) 방식의 캐시 적중률을 비교합니다.
+실제 openrouter.ai는 사용하지 않습니다.
+
+실행 방법:
+    python benchmarks/bench_prompt_cache.py
+    python benchmarks/bench_prompt_cache.py --turns 400 --model claude
+"""
+
+import argparse
+import os
+import statistics
+import sys
+
+# practice-chatbot 폴더의 모듈을 불러올 수 있도록 경로 추가
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from fake_openrouter import FakeOpenRouter, VALID_API_KEY
+
+
+def run_conversation(chatbot, telemetry, client, model, turns, message_chars):
+    """
+    대화를 진행하고 턴별 (prompt_tokens, cached_tokens)를 반환합니다.
+    """
+    usage = []
+
+    def sink(record):
+        if record["prompt_tokens"] is not None:
+            usage.append((record["prompt_tokens"], record["cached_tokens"] or 0))
+
+    telemetry.add_sink(sink)
+    try:
+        session = chatbot.create_session(model)
+        for turn in range(turns):
+            text = f"{turn}번째 질문입니다. " + "대화 내용 " * (message_chars // 6)
+            chatbot.send_message(client, session, text)
+    finally:
+        telemetry.remove_sink(sink)
+
+    return usage
+
+
+def main():
+    parser = argparse.ArgumentParser(description="히스토리 정리 방식별 프롬프트 캐시 적중률 비교")
+    parser.add_argument("--turns", type=int, default=250, help="대화 턴 수 (최대 히스토리를 넘도록)")
+    parser.add_argument("--message-chars", type=int, default=200, help="사용자 메시지 길이 (글자)")
+    parser.add_argument("--model", default="claude", help="사용할 모델 이름")
+    args = parser.parse_args()
+
+    with FakeOpenRouter(response_tokens=40) as server:
+        # chatbot을 불러오기 전에 가짜 서버 주소 설정
+        os.environ["OPENROUTER_BASE_URL"] = server.base_url
+        import chatbot
+        import telemetry
+
+        client = chatbot.create_client(VALID_API_KEY)
+
+        results = {}
+        for mode in ("sliding", "chunked"):
+            chatbot.HISTORY_TRIM_MODE = mode
+            results[mode] = run_conversation(
+                chatbot, telemetry, client, args.model, args.turns, args.message_chars
+            )
+
+    print(f"{'방식':<10}{'평균 입력':>10}{'평균 캐시':>10}{'캐시 적중률':>12}{'적중 턴':>10}")
+    for mode, usage in results.items():
+        prompt = sum(p for p, _ in usage)
+        cached = sum(c for _, c in usage)
+        hit_turns = sum(1 for _, c in usage if c)
+        print(
+            f"{mode:<10}{statistics.fmean(p for p, _ in usage):>10.0f}"
+            f"{statistics.fmean(c for _, c in usage):>10.0f}"
+            f"{cached / prompt if prompt else 0:>12.1%}{hit_turns:>7}/{len(usage)}"
+        )
+
+
+if __name__ == "__main__":
+    main()
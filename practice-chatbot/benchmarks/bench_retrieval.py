@@ -0,0 +1,141 @@
+"""
+관련 대화 검색(context_builder.py) 효과 측정 벤치마크
+
+여러 주제를 한 번씩 다룬 긴 대화를 만든 뒤, 앞에서 다룬 주제를 다시 묻는 질문마다
+API에 보낼 프롬프트를 세 가지 방식으로 만들어 비교합니다. API는 호출하지 않습니다.
+
+- 히스토리 전체: 지금까지의 기본 동작 (토큰 예산 안의 히스토리를 모두 보냄)
+- 최근 창: 관련 대화 검색과 같은 토큰 수만큼 최근 메시지만 보냄
+- 관련 대화 검색: 최근 메시지 + BM25로 고른 관련 이전 대화
+
+확인 항목:
+- 질문마다 보낸 추정 토큰 수 (히스토리 전체 대비 비율)
+- 그 주제를 다룬 이전 대화가 프롬프트에 들어갔는지 (재현율)
+- 메시지 추가(색인 갱신 포함)와 프롬프트 만들기에 걸린 시간
+
+실행 방법:
+    python benchmarks/bench_retrieval.py
+    python benchmarks/bench_retrieval.py --turns 95 --answer-sentences 12
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+# practice-chatbot 폴더의 모듈을 불러올 수 있도록 경로 추가
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import chatbot
+import context_builder
+
+
+TOPICS = ["데이터베이스 연결 풀", "로그 보관 기간", "배포 스크립트", "캐시 만료 시간", "결제 모듈 재시도",
+          "이미지 썸네일", "검색 색인", "알림 메일 발송", "세션 타임아웃", "백업 주기",
+          "API 속도 제한", "회원 가입 인증", "환율 업데이트", "파일 업로드 용량", "다국어 번역",
+          "주문 취소 정책", "모니터링 대시보드", "쿠폰 중복 사용", "비밀번호 규칙", "서버 지역 설정"]
+
+FILLER = ["이 설정은 운영 환경과 개발 환경에서 다르게 둘 수 있습니다.",
+          "변경한 뒤에는 꼭 테스트를 돌려서 확인해 주세요.",
+          "팀원들과 공유할 문서에도 같은 내용을 적어 두면 좋습니다.",
+          "나중에 트래픽이 늘어나면 다시 검토해야 할 수도 있습니다.",
+          "관련 코드는 설정 파일 한 곳에서 관리하는 것이 안전합니다.",
+          "이전 버전과의 호환성도 함께 고려해야 합니다.",
+          "문제가 생기면 로그를 먼저 확인하는 것이 빠릅니다."]
+
+
+def make_conversation(rng, turns, answer_sentences):
+    """
+    주제를 돌아가며 다루는 대화를 만듭니다. 주제마다 고유한 설정값(코드)을 정합니다.
+
+    Returns:
+        tuple: (메시지 목록 [(role, content)], {주제: 설정값 코드})
+    """
+    messages, facts = [], {}
+    for turn in range(turns):
+        topic = TOPICS[turn % len(TOPICS)]
+        if topic not in facts:
+            facts[topic] = f"CFG-{rng.randint(1000, 9999)}"
+            question = f"{topic} 설정은 어떻게 정하면 좋을까요?"
+            answer = f"{topic} 설정값은 {facts[topic]}(으)로 정하는 것을 추천합니다. "
+        else:
+            question = f"{topic} 말고 다른 부분도 점검할 게 있을까요?"
+            answer = "몇 가지 더 확인해 보면 좋겠습니다. "
+        answer += " ".join(rng.choices(FILLER, k=answer_sentences))
+        messages.append(("user", question))
+        messages.append(("assistant", answer))
+    return messages, facts
+
+
+def contains(messages, text):
+    """메시지 목록에 text가 들어 있는지 확인합니다."""
+    return any(text in message["content"] for message in messages)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="관련 대화 검색 효과 측정")
+    parser.add_argument("--turns", type=int, default=90, help="질문-응답 수")
+    parser.add_argument("--answer-sentences", type=int, default=8, help="응답 하나의 문장 수")
+    parser.add_argument("--model", default="gpt", help="토큰 예산을 따를 모델")
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    conversation, facts = make_conversation(rng, args.turns, args.answer_sentences)
+
+    session = chatbot.create_session(args.model, retrieval=True)
+    add_times = []
+    for role, content in conversation:
+        started = time.perf_counter()
+        chatbot.add_message(session, role, content)
+        add_times.append((time.perf_counter() - started) * 1000)
+
+    full_tokens, window_tokens, retrieval_tokens = [], [], []
+    window_hits = retrieval_hits = 0
+    build_times = []
+    for topic, fact in facts.items():
+        probe = chatbot.add_message(session, "user", f"아까 {topic} 설정값을 뭐로 하기로 했었죠?")
+
+        started = time.perf_counter()
+        messages, tokens = context_builder.build_context(session)
+        build_times.append((time.perf_counter() - started) * 1000)
+
+        # 같은 토큰 수만큼 최근 메시지만 보내는 경우
+        recent, recent_tokens = [], 0
+        for message in reversed(session.payload()):
+            if recent and recent_tokens + message.tokens > tokens:
+                break
+            recent.append(message)
+            recent_tokens += message.tokens
+
+        full_tokens.append(session.history_tokens)
+        window_tokens.append(recent_tokens)
+        retrieval_tokens.append(tokens)
+        window_hits += contains(recent, fact)
+        retrieval_hits += contains(messages, fact)
+
+        session.remove_last(probe)
+
+    full = statistics.mean(full_tokens)
+    print(f"대화 {args.turns}턴 (히스토리 {len(session)}개 메시지, 색인 {len(session.index)}개),"
+          f" 이전 주제 질문 {len(facts)}개")
+    print(f"{'':<16}{'평균 토큰':>10}{'전체 대비':>10}{'관련 대화 포함':>16}")
+    for label, tokens, hits in (
+        ("히스토리 전체", full_tokens, len(facts)),
+        ("최근 창", window_tokens, window_hits),
+        ("관련 대화 검색", retrieval_tokens, retrieval_hits),
+    ):
+        average = statistics.mean(tokens)
+        print(f"{label:<16}{average:>10,.0f}{average / full:>10.0%}{hits:>10}/{len(facts)}")
+
+    print()
+    print(f"메시지 추가 (색인 갱신 포함): p50 {statistics.median(add_times):.3f}ms / 최대 {max(add_times):.2f}ms")
+    print(f"프롬프트 만들기: p50 {statistics.median(build_times):.3f}ms / 최대 {max(build_times):.2f}ms")
+
+    chatbot.close_session(session)
+
+
+if __name__ == "__main__":
+    main()
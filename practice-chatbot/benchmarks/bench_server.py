@@ -0,0 +1,181 @@
+"""
+HTTP 서버 모드(chat_server.py) 부하 테스트
+
+가짜 OpenRouter 서버를 상대로 chat_server를 띄우고, 여러 클라이언트가 동시에
+세션을 만들어 SSE 스트리밍으로 대화합니다. 실제 openrouter.ai는 사용하지 않습니다.
+
+측정 항목:
+- 첫 응답 조각까지의 시간(TTFT), 전체 응답 시간 분포 (p50, p95, p99)
+- 초당 처리한 대화 턴 수, 503으로 거절된 요청 수
+- 응답 생성 중에 종료했을 때 진행 중인 응답이 끝까지 전달되는지 (정상 종료)
+
+실행 방법:
+    python benchmarks/bench_server.py
+    python benchmarks/bench_server.py --clients 500 --turns 5 --max-concurrency 64 --max-queue 100
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+# practice-chatbot 폴더의 모듈을 불러올 수 있도록 경로 추가
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from fake_openrouter import FakeOpenRouter, VALID_API_KEY
+
+
+def percentile(sorted_values, ratio):
+    """정렬된 값 목록에서 백분위수를 구합니다. (최근접 순위 방식)"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(ratio * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+async def stream_turn(http, session_id, content, on_first_delta=None):
+    """
+    메시지 하나를 보내고 SSE 응답을 끝까지 읽습니다.
+
+    Returns:
+        tuple: (결과 "done"/"error"/"rejected", TTFT(ms) 또는 None, 전체 시간(ms))
+    """
+    started = time.perf_counter()
+    ttft = None
+    event = None
+    async with http.stream("POST", f"/sessions/{session_id}/messages", json={"content": content}) as response:
+        if response.status_code == 503:
+            await response.aread()
+            return "rejected", None, (time.perf_counter() - started) * 1000
+
+        async for line in response.aiter_lines():
+            if line.startswith("event: "):
+                event = line[len("event: "):]
+            elif line.startswith("data: ") and event == "delta" and ttft is None:
+                ttft = (time.perf_counter() - started) * 1000
+                if on_first_delta is not None:
+                    on_first_delta()
+
+    return event or "error", ttft, (time.perf_counter() - started) * 1000
+
+
+async def client_loop(http, index, turns, results):
+    """클라이언트 하나: 세션을 만들고 turns번 대화합니다."""
+    response = await http.post("/sessions", json={"model": "gpt"})
+    if response.status_code != 201:
+        results.append(("rejected", None, 0.0))
+        return
+    session_id = response.json()["session_id"]
+
+    for turn in range(turns):
+        results.append(await stream_turn(http, session_id, f"클라이언트 {index}의 {turn}번째 질문"))
+
+
+async def check_graceful_shutdown(http, server, count):
+    """
+    응답 생성 중에 서버를 종료하고, 진행 중이던 응답이 끝까지 전달되는지 확인합니다.
+
+    Returns:
+        tuple: (끝까지 받은 응답 수, 종료에 걸린 시간(ms))
+    """
+    started = asyncio.Event()
+    first_deltas = 0
+
+    def on_first_delta():
+        nonlocal first_deltas
+        first_deltas += 1
+        if first_deltas == count:
+            started.set()
+
+    session_ids = []
+    for _ in range(count):
+        response = await http.post("/sessions", json={})
+        session_ids.append(response.json()["session_id"])
+
+    turns = [
+        asyncio.create_task(stream_turn(http, session_id, "종료 중 질문", on_first_delta))
+        for session_id in session_ids
+    ]
+    await started.wait()
+
+    shutdown_started = time.perf_counter()
+    await server.shutdown()
+    shutdown_ms = (time.perf_counter() - shutdown_started) * 1000
+
+    results = await asyncio.gather(*turns)
+    return sum(1 for result, _, _ in results if result == "done"), shutdown_ms
+
+
+async def run(args):
+    import httpx
+    import chat_server
+
+    server = chat_server.ChatServer(
+        VALID_API_KEY, port=0,
+        max_concurrent_turns=args.max_concurrency,
+        max_queued_turns=args.max_queue
+    )
+    await server.start()
+
+    limits = httpx.Limits(max_connections=args.clients * 2, max_keepalive_connections=args.clients)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{server.port}",
+                                 timeout=120, limits=limits) as http:
+        results = []
+        started = time.perf_counter()
+        await asyncio.gather(*(client_loop(http, i, args.turns, results) for i in range(args.clients)))
+        elapsed = time.perf_counter() - started
+
+        health = (await http.get("/health")).json()
+        completed, shutdown_ms = await check_graceful_shutdown(http, server, args.shutdown_turns)
+
+    return results, elapsed, health, completed, shutdown_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description="chat_server 부하 테스트")
+    parser.add_argument("--clients", type=int, default=200, help="동시 클라이언트 수")
+    parser.add_argument("--turns", type=int, default=3, help="클라이언트당 대화 턴 수")
+    parser.add_argument("--latency", type=float, default=0.2, help="가짜 서버 첫 바이트 지연 (초)")
+    parser.add_argument("--token-interval", type=float, default=0.005, help="스트리밍 조각 간격 (초)")
+    parser.add_argument("--response-tokens", type=int, default=50, help="응답 토큰 수")
+    parser.add_argument("--max-concurrency", type=int, default=None, help="서버 동시 AI 요청 수")
+    parser.add_argument("--max-queue", type=int, default=None, help="서버 대기열 크기")
+    parser.add_argument("--shutdown-turns", type=int, default=5, help="정상 종료 확인에 사용할 응답 수")
+    args = parser.parse_args()
+
+    with FakeOpenRouter(latency=args.latency, token_interval=args.token_interval,
+                        response_tokens=args.response_tokens) as upstream:
+        # chat_server를 불러오기 전에 가짜 서버 주소 설정
+        os.environ["OPENROUTER_BASE_URL"] = upstream.base_url
+        import config
+        if args.max_concurrency is None:
+            args.max_concurrency = config.SERVER_MAX_CONCURRENT_TURNS
+        if args.max_queue is None:
+            args.max_queue = config.SERVER_MAX_QUEUED_TURNS
+
+        results, elapsed, health, completed, shutdown_ms = asyncio.run(run(args))
+
+    done = [r for r in results if r[0] == "done"]
+    ttft = sorted(t for _, t, _ in done if t is not None)
+    total = sorted(t for _, _, t in done)
+
+    print(f"클라이언트 {args.clients}개 x {args.turns}턴"
+          f" (동시 요청 {args.max_concurrency}, 대기열 {args.max_queue})")
+    print(f"  완료 {len(done)} / 에러 {sum(1 for r in results if r[0] == 'error')}"
+          f" / 거절(503) {sum(1 for r in results if r[0] == 'rejected')}")
+    print(f"  처리량: {len(done) / elapsed:,.1f} 턴/초 ({elapsed:.2f}초)")
+    print(f"  TTFT:  p50 {percentile(ttft, 0.5):,.0f}ms / p95 {percentile(ttft, 0.95):,.0f}ms"
+          f" / p99 {percentile(ttft, 0.99):,.0f}ms")
+    print(f"  전체:  p50 {percentile(total, 0.5):,.0f}ms / p95 {percentile(total, 0.95):,.0f}ms"
+          f" / p99 {percentile(total, 0.99):,.0f}ms")
+    print(f"  서버 상태: {json.dumps(health, ensure_ascii=False)}")
+    print()
+    print(f"정상 종료: 진행 중이던 응답 {completed}/{args.shutdown_turns}개 전달, 종료 {shutdown_ms:,.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
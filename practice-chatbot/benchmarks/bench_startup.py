@@ -0,0 +1,151 @@
+"""
+콘솔 앱 시작 시간 벤치마크
+
+두 가지를 측정하고 정해진 예산(budget)을 넘으면 종료 코드 1을 반환합니다.
+
+1. 모듈 로딩 시간: `python -X importtime -c "import console_app"`의 console_app 누적 시간
+   (가장 오래 걸린 모듈 목록도 함께 출력)
+2. 첫 입력 프롬프트까지 걸린 시간: 프로세스 시작부터 "나: "가 출력될 때까지
+   (API 키 검증은 백그라운드에서 진행되므로, 응답이 느린 가짜 서버를 사용해도
+   프롬프트가 바로 나와야 함)
+
+실행 방법:
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --runs 20 --import-budget-ms 80
+"""
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+# practice-chatbot 폴더의 모듈을 불러올 수 있도록 경로 추가
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from fake_openrouter import FakeOpenRouter, VALID_API_KEY
+
+
+# 기본 예산 (밀리초)
+IMPORT_BUDGET_MS = 100
+PROMPT_BUDGET_MS = 400
+
+_IMPORTTIME_LINE = re.compile(r"import time:\s*(\d+)\s*\|\s*(\d+)\s*\|(\s*)(\S+)")
+
+
+def measure_import(env):
+    """
+    console_app을 새 프로세스에서 불러오고 -X importtime 결과를 해석합니다.
+
+    Returns:
+        tuple: (console_app 누적 시간(ms), [(모듈 이름, 자체 시간(ms))] 목록)
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import console_app"],
+        cwd=APP_DIR, env=env, capture_output=True, text=True, check=True
+    )
+
+    total_ms = None
+    modules = []
+    for line in result.stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, _, name = match.groups()
+        modules.append((name, int(self_us) / 1000))
+        if name == "console_app":
+            total_ms = int(cumulative_us) / 1000
+
+    return total_ms, modules
+
+
+def measure_time_to_prompt(env):
+    """
+    console_app.py를 실행하여 첫 입력 프롬프트("나: ")가 나올 때까지의 시간을 잽니다.
+
+    Returns:
+        float: 걸린 시간 (ms)
+    """
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-u", "console_app.py"],
+        cwd=APP_DIR, env=env,
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+    )
+
+    output = b""
+    prompt = "나: ".encode("utf-8")
+    try:
+        while prompt not in output:
+            chunk = process.stdout.read1(4096)
+            if not chunk:
+                raise RuntimeError("프롬프트가 나오기 전에 프로세스가 종료되었습니다.")
+            output += chunk
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        process.communicate(b"/quit\n", timeout=10)
+    finally:
+        if process.poll() is None:
+            process.kill()
+
+    return elapsed_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description="콘솔 앱 시작 시간 벤치마크")
+    parser.add_argument("--runs", type=int, default=10, help="측정 횟수")
+    parser.add_argument("--import-budget-ms", type=float, default=IMPORT_BUDGET_MS,
+                        help="console_app 모듈 로딩 시간 예산 (중앙값 기준)")
+    parser.add_argument("--prompt-budget-ms", type=float, default=PROMPT_BUDGET_MS,
+                        help="첫 프롬프트까지 걸리는 시간 예산 (중앙값 기준)")
+    parser.add_argument("--top", type=int, default=10, help="출력할 느린 모듈 수")
+    args = parser.parse_args()
+
+    # 검증 요청이 1초 걸리는 가짜 서버: 검증을 기다리면 프롬프트가 늦게 나옴
+    with FakeOpenRouter(latency=1.0) as server:
+        env = dict(
+            os.environ,
+            OPENROUTER_BASE_URL=server.base_url,
+            OPENROUTER_API_KEY=VALID_API_KEY,
+            PYTHONDONTWRITEBYTECODE="",
+        )
+
+        # 바이트코드 캐시(.pyc)를 미리 만들어 두고 측정
+        measure_import(env)
+
+        import_runs = [measure_import(env) for _ in range(args.runs)]
+        prompt_runs = [measure_time_to_prompt(env) for _ in range(args.runs)]
+
+    import_ms = statistics.median(total for total, _ in import_runs)
+    prompt_ms = statistics.median(prompt_runs)
+
+    # 중앙값에 가장 가까운 실행의 느린 모듈 목록
+    _, modules = min(import_runs, key=lambda run: abs(run[0] - import_ms))
+    print(f"느린 모듈 (자체 시간 기준 상위 {args.top}개)")
+    for name, self_ms in sorted(modules, key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"  {name:<40}{self_ms:>8.1f}ms")
+
+    print()
+    print(f"{'항목':<24}{'중앙값':>10}{'최소':>10}{'최대':>10}{'예산':>10}")
+    imports = [total for total, _ in import_runs]
+    print(f"{'모듈 로딩':<24}{import_ms:>8.1f}ms{min(imports):>8.1f}ms"
+          f"{max(imports):>8.1f}ms{args.import_budget_ms:>8.0f}ms")
+    print(f"{'첫 프롬프트까지':<24}{prompt_ms:>8.1f}ms{min(prompt_runs):>8.1f}ms"
+          f"{max(prompt_runs):>8.1f}ms{args.prompt_budget_ms:>8.0f}ms")
+
+    over = []
+    if import_ms > args.import_budget_ms:
+        over.append("모듈 로딩")
+    if prompt_ms > args.prompt_budget_ms:
+        over.append("첫 프롬프트")
+    if over:
+        print()
+        print(f"예산 초과: {', '.join(over)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
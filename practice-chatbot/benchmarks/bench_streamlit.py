@@ -0,0 +1,95 @@
+"""
+Streamlit 앱 다시 실행(rerun) 시간 벤치마크
+
+streamlit.testing의 AppTest로 streamlit_app.py를 브라우저 없이 실행하여,
+대화 길이별로 스크립트를 한 번 다시 실행하는 데 걸리는 시간을 잽니다.
+최근 CHAT_PAGE_SIZE개만 표시하는 경우("paged")와 모든 메시지를 표시하는 경우("all")를
+비교하면, 표시 개수를 제한했을 때 대화가 길어져도 시간이 거의 늘지 않는 것을 볼 수 있습니다.
+실제 openrouter.ai는 사용하지 않습니다.
+
+실행 방법:
+    python benchmarks/bench_streamlit.py
+    python benchmarks/bench_streamlit.py --lengths 0 50 100 200 --runs 30
+"""
+
+import argparse
+import logging
+import os
+import statistics
+import sys
+import time
+
+# practice-chatbot 폴더의 모듈을 불러올 수 있도록 경로 추가
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, APP_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from fake_openrouter import FakeOpenRouter, VALID_API_KEY
+
+
+def build_session(chatbot, length, message_chars):
+    """메시지가 length개 있는 세션을 만듭니다."""
+    session = chatbot.create_session("gpt")
+    for i in range(length):
+        role = "user" if i % 2 == 0 else "assistant"
+        text = f"{i}번째 메시지입니다. **굵게** `코드` " + "내용 " * (message_chars // 3)
+        session.append(role, text)
+    return session
+
+
+def measure_reruns(AppTest, client, session, visible, runs):
+    """
+    앱을 runs번 다시 실행하고 실행별 시간(ms)을 반환합니다.
+    """
+    app = AppTest.from_file(os.path.join(APP_DIR, "streamlit_app.py"), default_timeout=30)
+    app.session_state["client"] = client
+    app.session_state["api_key_valid"] = True
+    app.session_state["chat_session"] = session
+    if visible is not None:
+        app.session_state["visible_messages"] = visible
+
+    # 첫 실행은 모듈 로딩과 캐시 준비가 포함되므로 제외
+    app.run()
+    if app.exception:
+        raise RuntimeError(app.exception[0].message)
+
+    elapsed = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        app.run()
+        elapsed.append((time.perf_counter() - started) * 1000)
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Streamlit 앱 다시 실행 시간 측정")
+    parser.add_argument("--lengths", type=int, nargs="+", default=[0, 50, 100, 200],
+                        help="측정할 대화 길이 (메시지 수)")
+    parser.add_argument("--runs", type=int, default=20, help="길이별 측정 횟수")
+    parser.add_argument("--message-chars", type=int, default=300, help="메시지 길이 (글자)")
+    args = parser.parse_args()
+
+    with FakeOpenRouter() as server:
+        # chatbot을 불러오기 전에 가짜 서버 주소 설정
+        os.environ["OPENROUTER_BASE_URL"] = server.base_url
+        os.chdir(APP_DIR)
+        from streamlit.testing.v1 import AppTest
+        import chatbot
+
+        # 브라우저 없이 실행할 때 나오는 "missing ScriptRunContext" 경고 숨김
+        logging.getLogger("streamlit.runtime.scriptrunner_utils.script_run_context").disabled = True
+
+        client = chatbot.create_client(VALID_API_KEY)
+
+        print(f"{'메시지 수':>10}{'paged p50':>12}{'all p50':>12}")
+        for length in args.lengths:
+            session = build_session(chatbot, length, args.message_chars)
+            paged = measure_reruns(AppTest, client, session, None, args.runs)
+            full = measure_reruns(AppTest, client, session, max(length, 1), args.runs)
+            print(f"{len(session):>10}{statistics.median(paged):>10.1f}ms"
+                  f"{statistics.median(full):>10.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
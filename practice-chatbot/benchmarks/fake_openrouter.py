@@ -0,0 +1,410 @@
+"""
+가짜 OpenRouter 서버
+
+벤치마크와 부하 테스트에서 실제 openrouter.ai 대신 사용할 로컬 서버입니다.
+OpenAI 호환 /chat/completions (스트리밍 포함)와 /models 엔드포인트를 흉내 냅니다.
+
+- 응답 지연 (첫 바이트까지의 시간, 스트리밍 조각 사이 간격)
+- 연결 설정 지연 (새 연결마다 한 번, DNS/TCP/TLS 핸드셰이크 흉내)
+- 응답 크기 (응답 토큰 수)
+- 에러 주입 (지정한 비율로 429/5xx 등 반환, Retry-After 헤더 포함)
+- 프롬프트 캐시 (직전 요청과 앞부분이 같은 메시지를 usage의 cached_tokens로 보고)
+을 설정할 수 있습니다.
+
+실행 방법:
+    python benchmarks/fake_openrouter.py --port 8799 --latency 0.2 --error-rate 0.1
+
+    # 다른 터미널에서 앱이 가짜 서버를 사용하도록 설정
+    OPENROUTER_BASE_URL=http://127.0.0.1:8799/api/v1 python console_app.py
+
+코드에서 사용:
+    from fake_openrouter import FakeOpenRouter
+
+    with FakeOpenRouter(latency=0.05) as server:
+        os.environ["OPENROUTER_BASE_URL"] = server.base_url
+"""
+
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+# 가짜 서버에서 사용하는 API 키 (이 키가 아니면 401)
+VALID_API_KEY = "sk-or-fake"
+
+# 가짜 모델 카탈로그의 ETag (If-None-Match로 같은 값을 보내면 304)
+CATALOG_ETAG = '"fake-catalog-v1"'
+
+# 가짜 모델 카탈로그에 포함할 모델
+FAKE_MODELS = [
+    {"id": "google/gemini-3-flash-preview", "context_length": 1048576,
+     "top_provider": {"max_completion_tokens": 65536},
+     "pricing": {"prompt": "0.0000005", "completion": "0.000003"}},
+    {"id": "anthropic/claude-3.5-sonnet", "context_length": 200000,
+     "top_provider": {"max_completion_tokens": 8192},
+     "pricing": {"prompt": "0.000003", "completion": "0.000015"}},
+    {"id": "openai/gpt-4o-mini", "context_length": 128000,
+     "top_provider": {"max_completion_tokens": 16384},
+     "pricing": {"prompt": "0.00000015", "completion": "0.0000006"}},
+]
+
+
+def _message_text(message):
+    """메시지 내용을 문자열로 반환합니다. (cache_control이 붙은 조각 목록 형식 포함)"""
+    content = message.get("content", "")
+    if isinstance(content, list):
+        return "".join(part.get("text", "") for part in content)
+    return str(content)
+
+
+def _message_key(message):
+    """프롬프트 캐시 비교용 메시지 키 (역할 + 내용)."""
+    return (message.get("role"), _message_text(message))
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """가짜 OpenRouter 요청 처리기. 설정은 self.server.fake(FakeOpenRouter)에서 읽습니다."""
+
+    protocol_version = "HTTP/1.1"
+
+    # 헤더와 본문을 따로 보낼 때 Nagle 알고리즘 때문에 생기는 ~40ms 지연 방지
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        # 벤치마크 출력이 지저분해지지 않도록 접근 로그 생략
+        pass
+
+    def setup(self):
+        # 새 연결마다 핸드셰이크 비용만큼 늦게 응답 (keep-alive로 재사용하면 없음)
+        fake = self.server.fake
+        fake.count("connections")
+        if fake.connect_latency > 0:
+            time.sleep(fake.connect_latency)
+        super().setup()
+
+    # ------------------------------------------------------------
+    # 공통
+    # ------------------------------------------------------------
+
+    def _send_json(self, status, body, headers=None):
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _authorized(self):
+        return self.headers.get("Authorization") == f"Bearer {self.server.fake.api_key}"
+
+    def _maybe_inject_error(self):
+        """설정한 비율로 에러 응답을 보냅니다. 보냈으면 True."""
+        fake = self.server.fake
+        if fake.error_rate <= 0 or random.random() >= fake.error_rate:
+            return False
+
+        fake.count("errors")
+        headers = {}
+        if fake.retry_after is not None:
+            headers["Retry-After"] = str(fake.retry_after)
+        self._send_json(
+            fake.error_status,
+            {"error": {"message": "injected error", "code": fake.error_status}},
+            headers
+        )
+        return True
+
+    # ------------------------------------------------------------
+    # GET /models
+    # ------------------------------------------------------------
+
+    def do_GET(self):
+        fake = self.server.fake
+        if not self.path.rstrip("/").endswith("/models"):
+            self._send_json(404, {"error": {"message": "not found"}})
+            return
+
+        fake.count("models")
+        if not self._authorized():
+            self._send_json(401, {"error": {"message": "invalid api key"}})
+            return
+
+        # 카탈로그가 바뀌지 않았으면 본문 없이 304
+        if self.headers.get("If-None-Match") == CATALOG_ETAG:
+            fake.count("models_not_modified")
+            self.send_response(304)
+            self.send_header("ETag", CATALOG_ETAG)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        self._send_json(200, {"data": FAKE_MODELS}, {"ETag": CATALOG_ETAG})
+
+    # ------------------------------------------------------------
+    # HEAD (연결 미리 열기)
+    # ------------------------------------------------------------
+
+    def do_HEAD(self):
+        self.server.fake.count("head")
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    # ------------------------------------------------------------
+    # POST /chat/completions
+    # ------------------------------------------------------------
+
+    def do_POST(self):
+        fake = self.server.fake
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "not found"}})
+            return
+
+        fake.count("completions")
+        fake.last_request = body
+
+        if not self._authorized():
+            self._send_json(401, {"error": {"message": "invalid api key"}})
+            return
+
+        if fake.latency:
+            time.sleep(fake.latency)
+
+        if self._maybe_inject_error():
+            return
+
+        messages = body.get("messages", [])
+        message_tokens = [len(_message_text(m)) // 4 + 4 for m in messages]
+        prompt_tokens = sum(message_tokens)
+        cached_tokens = fake.cached_prefix_tokens(body.get("model"), messages, message_tokens)
+        words = [f"토큰{i}" for i in range(fake.response_tokens)]
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": len(words),
+            "total_tokens": prompt_tokens + len(words),
+            "prompt_tokens_details": {"cached_tokens": cached_tokens}
+        }
+
+        if body.get("stream"):
+            self._send_stream(body, words, usage)
+        else:
+            self._send_json(200, {
+                "id": "chatcmpl-fake",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body.get("model"),
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": " ".join(words)},
+                    "finish_reason": "stop"
+                }],
+                "usage": usage
+            })
+
+    def _send_stream(self, body, words, usage):
+        """SSE(Server-Sent Events) 형식으로 응답을 조각내어 보냅니다."""
+        fake = self.server.fake
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        def write_event(payload):
+            data = f"data: {payload}\n\n".encode("utf-8")
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+            self.wfile.flush()
+
+        def chunk(delta, finish_reason=None):
+            return json.dumps({
+                "id": "chatcmpl-fake",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": body.get("model"),
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+            }, ensure_ascii=False)
+
+        try:
+            for i, word in enumerate(words):
+                if i and fake.token_interval:
+                    time.sleep(fake.token_interval)
+                write_event(chunk({"content": word if i == 0 else " " + word}))
+
+            write_event(chunk({}, "stop"))
+            write_event(json.dumps({
+                "id": "chatcmpl-fake",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": body.get("model"),
+                "choices": [],
+                "usage": usage
+            }))
+            write_event("[DONE]")
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # 클라이언트가 중간에 연결을 끊은 경우 (취소 등)
+            fake.count("disconnects")
+            self.close_connection = True
+
+
+class _Server(ThreadingHTTPServer):
+    """가짜 서버용 HTTP 서버. 클라이언트가 끊은 연결은 에러로 출력하지 않습니다."""
+
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # 미리 열어 둔 keep-alive 연결을 클라이언트 프로세스가 끝나면서 닫는 것은 정상
+        if isinstance(sys.exc_info()[1], (BrokenPipeError, ConnectionResetError)):
+            return
+        super().handle_error(request, client_address)
+
+
+class FakeOpenRouter:
+    """
+    백그라운드 스레드에서 실행되는 가짜 OpenRouter 서버.
+
+    사용 예시:
+        with FakeOpenRouter(latency=0.05, response_tokens=200) as server:
+            print(server.base_url)      # http://127.0.0.1:포트/api/v1
+            print(server.stats())       # 요청 수 통계
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, token_interval=0.0,
+                 response_tokens=50, error_rate=0.0, error_status=429,
+                 retry_after=None, api_key=VALID_API_KEY, connect_latency=0.0):
+        """
+        Args:
+            host: 바인딩할 주소
+            port: 포트 (0이면 빈 포트 자동 선택)
+            latency: 응답 시작 전 지연 (초)
+            connect_latency: 새 연결의 첫 요청에 더할 지연 (초, 핸드셰이크 비용 흉내)
+            token_interval: 스트리밍 조각 사이 간격 (초)
+            response_tokens: 응답에 포함할 토큰(단어) 수
+            error_rate: 에러를 반환할 비율 (0.0 ~ 1.0)
+            error_status: 주입할 에러의 HTTP 상태 코드
+            retry_after: 에러 응답의 Retry-After 헤더 값 (초, None이면 생략)
+            api_key: 유효한 것으로 처리할 API 키
+        """
+        self.latency = latency
+        self.connect_latency = connect_latency
+        self.token_interval = token_interval
+        self.response_tokens = response_tokens
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.retry_after = retry_after
+        self.api_key = api_key
+        self.last_request = None
+
+        # 프롬프트 캐시 흉내: 모델별 직전 요청의 메시지 키 목록
+        self._prompt_prefixes = {}
+
+        self._counters = {}
+        self._counter_lock = threading.Lock()
+
+        self._server = _Server((host, port), _Handler)
+        self._server.fake = self
+        self._thread = None
+
+    @property
+    def base_url(self):
+        """앱의 API_BASE_URL로 사용할 주소."""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/api/v1"
+
+    def count(self, name):
+        """요청 수 카운터를 1 증가시킵니다."""
+        with self._counter_lock:
+            self._counters[name] = self._counters.get(name, 0) + 1
+
+    def cached_prefix_tokens(self, model, messages, message_tokens):
+        """
+        제공자 쪽 프롬프트 캐시를 흉내 냅니다.
+        같은 모델의 직전 요청과 앞부분(마지막 메시지 제외)이 같은 메시지들의 토큰 수를
+        캐시에서 읽은 토큰 수로 반환합니다.
+        """
+        keys = [_message_key(m) for m in messages]
+        with self._counter_lock:
+            previous = self._prompt_prefixes.get(model, [])
+            self._prompt_prefixes[model] = keys
+
+        cached = 0
+        for index, (key, old_key) in enumerate(zip(keys[:-1], previous)):
+            if key != old_key:
+                break
+            cached += message_tokens[index]
+        return cached
+
+    def stats(self):
+        """지금까지 받은 요청 수 통계를 반환합니다."""
+        with self._counter_lock:
+            return dict(self._counters)
+
+    def start(self):
+        """서버를 백그라운드 스레드에서 시작합니다."""
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """서버를 멈춥니다."""
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def main():
+    """명령줄에서 가짜 서버를 실행합니다."""
+    parser = argparse.ArgumentParser(description="가짜 OpenRouter 서버")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8799)
+    parser.add_argument("--latency", type=float, default=0.0, help="응답 시작 전 지연 (초)")
+    parser.add_argument("--connect-latency", type=float, default=0.0, help="새 연결 지연 (초)")
+    parser.add_argument("--token-interval", type=float, default=0.0, help="스트리밍 조각 간격 (초)")
+    parser.add_argument("--response-tokens", type=int, default=50, help="응답 토큰 수")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="에러 비율 (0.0 ~ 1.0)")
+    parser.add_argument("--error-status", type=int, default=429, help="주입할 에러 상태 코드")
+    parser.add_argument("--retry-after", type=float, default=None, help="Retry-After 헤더 (초)")
+    parser.add_argument("--api-key", default=VALID_API_KEY, help="유효한 API 키")
+    args = parser.parse_args()
+
+    server = FakeOpenRouter(
+        host=args.host,
+        port=args.port,
+        latency=args.latency,
+        connect_latency=args.connect_latency,
+        token_interval=args.token_interval,
+        response_tokens=args.response_tokens,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        retry_after=args.retry_after,
+        api_key=args.api_key
+    )
+
+    print(f"가짜 OpenRouter 서버 실행 중: {server.base_url}")
+    print(f"API 키: {args.api_key}")
+    print("종료: Ctrl+C")
+
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        print()
+        print("서버를 종료합니다.")
+    finally:
+        server._server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,729 @@
+"""
+HTTP 서버 모드
+
+다른 앱에서 챗봇을 HTTP로 사용할 수 있게 하는 서버입니다.
+asyncio와 표준 라이브러리만으로 만든 작은 HTTP/1.1 서버이며,
+대화는 async_chatbot.async_send_message로 처리하고 응답은 Server-Sent Events(SSE)로 스트리밍합니다.
+
+API:
+    POST   /sessions                 새 세션 만들기 {"model": "gpt"} -> 201 {"session_id", "model"}
+    GET    /sessions/{id}            세션 정보와 대화 히스토리
+    PATCH  /sessions/{id}            모델 변경 {"model": "claude"}
+    DELETE /sessions/{id}            세션 삭제 -> 204
+    POST   /sessions/{id}/messages   메시지 전송 {"content": "안녕!", "stream": true}
+                                     stream이면 SSE (event: delta -> done 또는 error),
+                                     false면 JSON {"response": ...}
+    GET    /health                   서버 상태 (세션 수, 진행/대기 중인 요청 수 등)
+    GET    /stats                    모델별 응답 속도 통계 (telemetry)
+
+- 세션은 메모리에만 보관합니다. 최대 SERVER_MAX_SESSIONS개이며,
+  SERVER_SESSION_IDLE_TTL초 동안 사용하지 않은 세션은 삭제됩니다.
+- AI에게 동시에 보내는 요청은 SERVER_MAX_CONCURRENT_TURNS개로 제한하고,
+  차례를 기다리는 요청이 SERVER_MAX_QUEUED_TURNS개를 넘으면 503(Retry-After)으로 거절합니다.
+- 받는 쪽이 느리면 응답 조각을 모아 한 번에 보내므로 전송 버퍼가 무한히 쌓이지 않습니다.
+- 스트리밍 중 클라이언트 연결이 끊기면 AI 요청을 취소하고 사용자 메시지를 롤백합니다.
+- SIGINT/SIGTERM(Ctrl+C)을 받으면 새 요청을 받지 않고, 진행 중인 응답을
+  SERVER_SHUTDOWN_TIMEOUT초까지 기다린 뒤 종료합니다.
+
+실행 방법:
+    python chat_server.py --port 8080
+
+    curl -X POST localhost:8080/sessions -d '{"model": "gpt"}'
+    curl -N -X POST localhost:8080/sessions/<session_id>/messages -d '{"content": "안녕!"}'
+
+부하 테스트는 benchmarks/bench_server.py를 참고하세요. (가짜 OpenRouter 서버 사용)
+"""
+
+import argparse
+import asyncio
+import json
+import re
+import signal
+import time
+import uuid
+from collections import OrderedDict
+from http import HTTPStatus
+
+import telemetry
+from config import (
+    get_api_key,
+    MODELS,
+    ERROR_MESSAGES,
+    SERVER_HOST,
+    SERVER_PORT,
+    SERVER_MAX_SESSIONS,
+    SERVER_SESSION_IDLE_TTL,
+    SERVER_MAX_CONCURRENT_TURNS,
+    SERVER_MAX_QUEUED_TURNS,
+    SERVER_MAX_BODY_BYTES,
+    SERVER_REQUEST_TIMEOUT,
+    SERVER_SHUTDOWN_TIMEOUT,
+    get_model_list
+)
+from chatbot import create_session, close_session, switch_model
+from async_chatbot import (
+    create_async_client,
+    async_validate_api_key,
+    async_send_message,
+    close_shared_http_client
+)
+
+
+# /sessions/{id} 와 /sessions/{id}/messages
+_SESSION_PATH = re.compile(r"^/sessions/([0-9a-f]{32})(/messages)?/?$")
+
+
+# ============================================================
+# 세션 테이블
+# ============================================================
+
+class _SessionEntry:
+    """세션 테이블의 항목 하나."""
+
+    __slots__ = ("session", "last_used", "busy")
+
+    def __init__(self, session):
+        self.session = session
+        self.last_used = time.monotonic()
+        self.busy = False   # 응답을 생성 중이면 True (삭제하지 않음)
+
+
+class SessionTable:
+    """
+    크기가 제한된 메모리 세션 테이블.
+
+    항목은 마지막으로 사용한 순서(OrderedDict)로 유지되어,
+    가득 차면 가장 오래 안 쓴 세션부터, 유휴 시간이 지나면 앞에서부터 삭제합니다.
+    응답을 생성 중인 세션은 삭제하지 않으며, 삭제한 세션은 close_session()으로 정리합니다.
+    이벤트 루프 하나에서만 사용하므로 잠금이 없습니다.
+
+    사용 예시:
+        table = SessionTable(max_sessions=100, idle_ttl=600)
+        session_id, entry = table.create("gpt")
+        entry = table.get(session_id)
+    """
+
+    def __init__(self, max_sessions=SERVER_MAX_SESSIONS, idle_ttl=SERVER_SESSION_IDLE_TTL):
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.evicted = 0
+        self._entries = OrderedDict()   # {세션ID: _SessionEntry}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def create(self, model_name=None):
+        """
+        새 세션을 만듭니다. 테이블이 가득 차면 가장 오래 안 쓴 세션을 삭제합니다.
+
+        Args:
+            model_name: 사용할 모델 이름 (기본값: DEFAULT_MODEL)
+
+        Returns:
+            tuple: (세션ID, _SessionEntry), 모든 세션이 응답 생성 중이라 자리가 없으면 (None, None)
+        """
+        self.evict_idle()
+        while len(self._entries) >= self.max_sessions:
+            victim = next((sid for sid, entry in self._entries.items() if not entry.busy), None)
+            if victim is None:
+                return None, None
+            close_session(self._entries.pop(victim).session)
+            self.evicted += 1
+
+        session_id = uuid.uuid4().hex
+        entry = _SessionEntry(create_session(model_name))
+        self._entries[session_id] = entry
+        return session_id, entry
+
+    def get(self, session_id):
+        """
+        세션을 찾고 마지막 사용 시각을 갱신합니다.
+
+        Returns:
+            _SessionEntry 또는 None
+        """
+        entry = self._entries.get(session_id)
+        if entry is not None:
+            entry.last_used = time.monotonic()
+            self._entries.move_to_end(session_id)
+        return entry
+
+    def remove(self, session_id):
+        """세션을 삭제합니다. 삭제했으면 True."""
+        entry = self._entries.pop(session_id, None)
+        if entry is None:
+            return False
+        close_session(entry.session)
+        return True
+
+    def evict_idle(self, now=None):
+        """
+        idle_ttl초 동안 사용하지 않은 세션을 삭제합니다.
+
+        Returns:
+            int: 삭제한 세션 수
+        """
+        cutoff = (time.monotonic() if now is None else now) - self.idle_ttl
+        expired = []
+        for session_id, entry in self._entries.items():
+            # 오래 안 쓴 순서이므로 최근에 쓴 세션이 나오면 멈춤
+            if entry.last_used > cutoff:
+                break
+            if not entry.busy:
+                expired.append(session_id)
+
+        for session_id in expired:
+            close_session(self._entries.pop(session_id).session)
+        self.evicted += len(expired)
+        return len(expired)
+
+
+# ============================================================
+# HTTP 유틸리티
+# ============================================================
+
+class _HTTPError(Exception):
+    """HTTP 에러 응답으로 바꿔 보낼 예외."""
+
+    def __init__(self, status, message, headers=None):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.headers = headers or {}
+
+
+def _response_head(status, headers):
+    """상태 줄과 헤더를 bytes로 만듭니다."""
+    lines = [f"HTTP/1.1 {status.value} {status.phrase}"]
+    lines.extend(f"{name}: {value}" for name, value in headers.items())
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+
+def _write_json(writer, status, body=None, keep_alive=True, headers=None):
+    """JSON 응답을 씁니다. body가 None이면 본문 없이 보냅니다."""
+    data = b"" if body is None else json.dumps(body, ensure_ascii=False).encode("utf-8")
+    head = {
+        "Content-Type": "application/json; charset=utf-8",
+        "Content-Length": str(len(data)),
+        "Connection": "keep-alive" if keep_alive else "close"
+    }
+    head.update(headers or {})
+    writer.write(_response_head(status, head) + data)
+
+
+def _sse(event, data):
+    """Server-Sent Events 이벤트 하나를 만듭니다."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode("utf-8")
+
+
+def _parse_json(body):
+    """요청 본문을 JSON 객체로 읽습니다. (본문이 없으면 빈 딕셔너리)"""
+    if not body:
+        return {}
+    try:
+        data = json.loads(body)
+    except ValueError as e:
+        raise _HTTPError(HTTPStatus.BAD_REQUEST, ERROR_MESSAGES["bad_request"].format(error=e))
+    if not isinstance(data, dict):
+        raise _HTTPError(
+            HTTPStatus.BAD_REQUEST,
+            ERROR_MESSAGES["bad_request"].format(error="본문은 JSON 객체여야 합니다")
+        )
+    return data
+
+
+def _validate_model(model_name):
+    """요청의 모델 이름을 확인합니다. (None이면 기본 모델)"""
+    if model_name is None:
+        return None
+    if not isinstance(model_name, str) or model_name.lower() not in MODELS:
+        raise _HTTPError(
+            HTTPStatus.BAD_REQUEST,
+            ERROR_MESSAGES["invalid_model"].format(models=get_model_list())
+        )
+    return model_name.lower()
+
+
+# ============================================================
+# 서버
+# ============================================================
+
+class ChatServer:
+    """
+    챗봇 HTTP 서버.
+
+    사용 예시:
+        server = ChatServer(api_key, port=8080)
+        await server.start()
+        ...
+        await server.shutdown()
+    """
+
+    def __init__(self, api_key, host=SERVER_HOST, port=SERVER_PORT,
+                 max_sessions=SERVER_MAX_SESSIONS,
+                 session_idle_ttl=SERVER_SESSION_IDLE_TTL,
+                 max_concurrent_turns=SERVER_MAX_CONCURRENT_TURNS,
+                 max_queued_turns=SERVER_MAX_QUEUED_TURNS):
+        """
+        Args:
+            api_key: OpenRouter API 키
+            host: 접속을 받을 주소
+            port: 접속을 받을 포트 (0이면 빈 포트를 자동으로 사용)
+            max_sessions: 메모리에 유지할 최대 세션 수
+            session_idle_ttl: 세션 유휴 만료 시간 (초)
+            max_concurrent_turns: AI에게 동시에 보내는 최대 요청 수
+            max_queued_turns: 차례를 기다릴 수 있는 최대 요청 수
+        """
+        self.api_key = api_key
+        self.host = host
+        self.port = port
+        self.max_concurrent_turns = max_concurrent_turns
+        self.max_queued_turns = max_queued_turns
+        self.sessions = SessionTable(max_sessions, session_idle_ttl)
+
+        self._client = None
+        self._server = None
+        self._sweeper = None
+        self._turn_slots = None
+        self._queued = 0
+        self._closing = False
+        self._connections = set()   # 연결 처리 작업
+        self._idle = set()          # 다음 요청을 기다리는 연결 처리 작업 (종료 시 바로 취소)
+        self._turns = set()         # 진행 중인 AI 요청 작업
+        self._stats = {"requests": 0, "turns": 0, "rejected": 0, "disconnects": 0}
+
+    # ------------------------------------------------------------
+    # 시작 / 종료
+    # ------------------------------------------------------------
+
+    async def start(self):
+        """접속을 받기 시작합니다. 이벤트 루프 안에서 호출해야 합니다."""
+        self._client = create_async_client(self.api_key)
+        self._turn_slots = asyncio.Semaphore(self.max_concurrent_turns)
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._sweeper = asyncio.create_task(self._sweep_sessions())
+
+    async def shutdown(self, timeout=SERVER_SHUTDOWN_TIMEOUT):
+        """
+        서버를 정상 종료합니다.
+        새 접속과 요청을 받지 않고, 진행 중인 응답을 timeout초까지 기다린 뒤
+        남은 요청을 취소하고 연결 풀을 닫습니다.
+
+        Args:
+            timeout: 진행 중인 응답을 기다릴 최대 시간 (초)
+        """
+        self._closing = True
+        self._server.close()
+        self._sweeper.cancel()
+
+        # 다음 요청을 기다리던 연결은 바로 닫음
+        for task in list(self._idle):
+            task.cancel()
+
+        if self._turns:
+            await asyncio.wait(set(self._turns), timeout=timeout)
+        for task in list(self._turns):
+            task.cancel()
+
+        # 연결 처리 작업이 마지막 응답을 쓰고 끝날 때까지 기다림
+        if self._connections:
+            _, pending = await asyncio.wait(set(self._connections), timeout=5)
+            for task in pending:
+                task.cancel()
+
+        await self._server.wait_closed()
+        await close_shared_http_client()
+
+    async def _sweep_sessions(self):
+        """유휴 세션을 주기적으로 삭제합니다."""
+        interval = max(1.0, min(60.0, self.sessions.idle_ttl / 2))
+        while True:
+            await asyncio.sleep(interval)
+            self.sessions.evict_idle()
+
+    def stats(self):
+        """
+        서버 상태를 반환합니다.
+
+        Returns:
+            dict: {status, sessions, active_turns, queued_turns, requests, turns,
+                   rejected (503으로 거절한 요청 수), disconnects, evicted_sessions}
+        """
+        return {
+            "status": "draining" if self._closing else "ok",
+            "sessions": len(self.sessions),
+            "active_turns": len(self._turns),
+            "queued_turns": self._queued,
+            **self._stats,
+            "evicted_sessions": self.sessions.evicted
+        }
+
+    # ------------------------------------------------------------
+    # 연결 처리
+    # ------------------------------------------------------------
+
+    async def _handle_connection(self, reader, writer):
+        """연결 하나의 요청들을 차례로 처리합니다. (keep-alive 지원)"""
+        task = asyncio.current_task()
+        self._connections.add(task)
+        try:
+            while not self._closing:
+                self._idle.add(task)
+                try:
+                    request = await self._read_request(reader)
+                except _HTTPError as e:
+                    _write_json(writer, e.status, {"error": e.message}, keep_alive=False)
+                    await writer.drain()
+                    break
+                finally:
+                    self._idle.discard(task)
+
+                if request is None:
+                    break
+
+                method, path, headers, body = request
+                self._stats["requests"] += 1
+                keep_alive = headers.get("connection", "").lower() != "close"
+                try:
+                    keep_alive = await self._dispatch(method, path, headers, body, writer, keep_alive)
+                except _HTTPError as e:
+                    _write_json(writer, e.status, {"error": e.message}, keep_alive, e.headers)
+                await writer.drain()
+
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        except asyncio.CancelledError:
+            # 종료 중 취소된 연결은 조용히 닫음
+            if not self._closing:
+                raise
+        finally:
+            self._connections.discard(task)
+            writer.close()
+
+    async def _read_request(self, reader):
+        """
+        요청 하나를 읽습니다.
+
+        Returns:
+            tuple 또는 None: (메서드, 경로, 헤더 딕셔너리, 본문 bytes), 연결이 끝났으면 None
+        """
+        try:
+            head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), SERVER_REQUEST_TIMEOUT)
+        except (asyncio.IncompleteReadError, asyncio.TimeoutError):
+            return None
+        except asyncio.LimitOverrunError:
+            raise _HTTPError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, "요청 헤더가 너무 큽니다.")
+
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, target, _ = lines[0].split(" ", 2)
+        except ValueError:
+            raise _HTTPError(HTTPStatus.BAD_REQUEST, ERROR_MESSAGES["bad_request"].format(error=lines[0]))
+
+        headers = {}
+        for line in lines[1:]:
+            name, sep, value = line.partition(":")
+            if sep:
+                headers[name.strip().lower()] = value.strip()
+
+        if "chunked" in headers.get("transfer-encoding", "").lower():
+            raise _HTTPError(HTTPStatus.LENGTH_REQUIRED, "Content-Length가 필요합니다.")
+
+        try:
+            length = int(headers.get("content-length") or 0)
+        except ValueError:
+            raise _HTTPError(HTTPStatus.BAD_REQUEST, ERROR_MESSAGES["bad_request"].format(error="Content-Length"))
+        if length > SERVER_MAX_BODY_BYTES:
+            raise _HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "요청 본문이 너무 큽니다.")
+
+        body = b""
+        if length:
+            try:
+                body = await asyncio.wait_for(reader.readexactly(length), SERVER_REQUEST_TIMEOUT)
+            except (asyncio.IncompleteReadError, asyncio.TimeoutError):
+                return None
+
+        return method.upper(), target.split("?", 1)[0], headers, body
+
+    async def _dispatch(self, method, path, headers, body, writer, keep_alive):
+        """
+        요청을 처리하고 응답을 씁니다.
+
+        Returns:
+            bool: 연결을 계속 유지할지 여부
+        """
+        if path == "/health" and method == "GET":
+            _write_json(writer, HTTPStatus.OK, self.stats(), keep_alive)
+            return keep_alive
+
+        if path == "/stats" and method == "GET":
+            _write_json(writer, HTTPStatus.OK, telemetry.get_stats(), keep_alive)
+            return keep_alive
+
+        if path.rstrip("/") == "/sessions":
+            if method != "POST":
+                raise _HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, "POST만 사용할 수 있습니다.")
+            return self._create_session(_parse_json(body), writer, keep_alive)
+
+        match = _SESSION_PATH.match(path)
+        if match is None:
+            raise _HTTPError(HTTPStatus.NOT_FOUND, "존재하지 않는 경로입니다.")
+
+        session_id, messages_path = match.groups()
+        entry = self.sessions.get(session_id)
+        if entry is None:
+            raise _HTTPError(HTTPStatus.NOT_FOUND, ERROR_MESSAGES["session_not_found"])
+
+        if messages_path:
+            if method != "POST":
+                raise _HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, "POST만 사용할 수 있습니다.")
+            return await self._handle_turn(session_id, entry, _parse_json(body), headers, writer, keep_alive)
+
+        if method == "GET":
+            session = entry.session
+            _write_json(writer, HTTPStatus.OK, {
+                "session_id": session_id,
+                "model": session.model,
+                "history_tokens": session.history_tokens,
+                "messages": [{"role": m.role, "content": m.content} for m in session.payload()]
+            }, keep_alive)
+        elif method == "PATCH":
+            model_name = _validate_model(_parse_json(body).get("model"))
+            if model_name is None:
+                raise _HTTPError(HTTPStatus.BAD_REQUEST, ERROR_MESSAGES["bad_request"].format(error="model"))
+            if entry.busy:
+                raise _HTTPError(HTTPStatus.CONFLICT, ERROR_MESSAGES["session_busy"])
+            switch_model(entry.session, model_name)
+            _write_json(writer, HTTPStatus.OK, {"session_id": session_id, "model": entry.session.model}, keep_alive)
+        elif method == "DELETE":
+            self.sessions.remove(session_id)
+            _write_json(writer, HTTPStatus.NO_CONTENT, None, keep_alive)
+        else:
+            raise _HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, "GET, PATCH, DELETE만 사용할 수 있습니다.")
+
+        return keep_alive
+
+    def _create_session(self, payload, writer, keep_alive):
+        """POST /sessions"""
+        model_name = _validate_model(payload.get("model"))
+        if self._closing:
+            raise _HTTPError(HTTPStatus.SERVICE_UNAVAILABLE, ERROR_MESSAGES["server_shutting_down"])
+
+        session_id, entry = self.sessions.create(model_name)
+        if entry is None:
+            self._stats["rejected"] += 1
+            raise _HTTPError(HTTPStatus.SERVICE_UNAVAILABLE, ERROR_MESSAGES["server_busy"], {"Retry-After": "1"})
+
+        _write_json(writer, HTTPStatus.CREATED, {"session_id": session_id, "model": entry.session.model}, keep_alive)
+        return keep_alive
+
+    # ------------------------------------------------------------
+    # 대화 (AI 요청)
+    # ------------------------------------------------------------
+
+    async def _handle_turn(self, session_id, entry, payload, headers, writer, keep_alive):
+        """POST /sessions/{id}/messages"""
+        content = payload.get("content")
+        if not isinstance(content, str):
+            raise _HTTPError(HTTPStatus.BAD_REQUEST, ERROR_MESSAGES["bad_request"].format(error="content"))
+
+        stream = payload.get("stream")
+        if stream is None:
+            stream = "application/json" not in headers.get("accept", "")
+
+        if self._closing:
+            raise _HTTPError(HTTPStatus.SERVICE_UNAVAILABLE, ERROR_MESSAGES["server_shutting_down"])
+        if entry.busy:
+            raise _HTTPError(HTTPStatus.CONFLICT, ERROR_MESSAGES["session_busy"])
+
+        # 기다리는 요청이 너무 많으면 바로 거절 (대기열이 무한히 늘지 않도록)
+        if self._queued >= self.max_queued_turns:
+            self._stats["rejected"] += 1
+            raise _HTTPError(HTTPStatus.SERVICE_UNAVAILABLE, ERROR_MESSAGES["server_busy"], {"Retry-After": "1"})
+
+        entry.busy = True
+        try:
+            self._queued += 1
+            try:
+                await self._turn_slots.acquire()
+            finally:
+                self._queued -= 1
+
+            try:
+                # 기다리는 동안 종료가 시작되었으면 새로 요청하지 않음
+                if self._closing:
+                    raise _HTTPError(HTTPStatus.SERVICE_UNAVAILABLE, ERROR_MESSAGES["server_shutting_down"])
+
+                self._stats["turns"] += 1
+                if stream:
+                    return await self._stream_turn(entry.session, content, writer)
+
+                task = self._start_turn(entry.session, content)
+                try:
+                    success, response = await task
+                except asyncio.CancelledError:
+                    # 종료 시간 초과로 AI 요청이 취소된 경우
+                    if not task.cancelled():
+                        raise
+                    raise _HTTPError(HTTPStatus.SERVICE_UNAVAILABLE, ERROR_MESSAGES["server_shutting_down"])
+                if success:
+                    _write_json(writer, HTTPStatus.OK, {"response": response}, keep_alive)
+                else:
+                    _write_json(writer, HTTPStatus.BAD_GATEWAY, {"error": response}, keep_alive)
+                return keep_alive
+            finally:
+                self._turn_slots.release()
+        finally:
+            entry.busy = False
+            self.sessions.get(session_id)
+
+    def _start_turn(self, session, content, on_delta=None):
+        """AI 요청을 작업으로 시작합니다. (종료 시 기다리거나 취소할 수 있도록 기록)"""
+        task = asyncio.create_task(async_send_message(self._client, session, content, on_delta=on_delta))
+        self._turns.add(task)
+        task.add_done_callback(self._turns.discard)
+        return task
+
+    async def _stream_turn(self, session, content, writer):
+        """
+        응답을 SSE로 스트리밍합니다.
+
+        받는 쪽이 느려 writer.drain()을 기다리는 동안 도착한 조각은 모아 두었다가
+        다음에 한 번에 보냅니다. 연결이 끊기면 AI 요청을 취소합니다. (사용자 메시지 롤백)
+
+        Returns:
+            bool: 연결 유지 여부 (스트리밍 응답 뒤에는 항상 닫음)
+        """
+        pending = []
+        ready = asyncio.Event()
+
+        def on_delta(text):
+            pending.append(text)
+            ready.set()
+
+        task = self._start_turn(session, content, on_delta)
+        writer.write(_response_head(HTTPStatus.OK, {
+            "Content-Type": "text/event-stream; charset=utf-8",
+            "Cache-Control": "no-cache",
+            "Connection": "close",
+            "X-Accel-Buffering": "no"
+        }))
+
+        try:
+            while True:
+                if not pending and not task.done():
+                    waiter = asyncio.ensure_future(ready.wait())
+                    await asyncio.wait((task, waiter), return_when=asyncio.FIRST_COMPLETED)
+                    waiter.cancel()
+                ready.clear()
+
+                if pending:
+                    text = "".join(pending)
+                    pending.clear()
+                    writer.write(_sse("delta", {"text": text}))
+                    await writer.drain()
+                elif task.done():
+                    break
+
+            if task.cancelled():
+                writer.write(_sse("error", {"error": ERROR_MESSAGES["server_shutting_down"]}))
+            else:
+                success, response = task.result()
+                if success:
+                    writer.write(_sse("done", {"response": response}))
+                else:
+                    writer.write(_sse("error", {"error": response}))
+            await writer.drain()
+
+        except ConnectionError:
+            self._stats["disconnects"] += 1
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+        return False
+
+
+# ============================================================
+# 실행
+# ============================================================
+
+async def serve(api_key, host=SERVER_HOST, port=SERVER_PORT, **options):
+    """
+    API 키를 확인하고 서버를 실행합니다. SIGINT/SIGTERM을 받으면 정상 종료합니다.
+
+    Args:
+        api_key: OpenRouter API 키
+        host: 접속을 받을 주소
+        port: 접속을 받을 포트
+        **options: ChatServer의 나머지 설정 (max_sessions 등)
+    """
+    is_valid, error = await async_validate_api_key(api_key)
+    if not is_valid:
+        print("[오류] API 키 문제")
+        print(error)
+        return
+
+    server = ChatServer(api_key, host, port, **options)
+    await server.start()
+    print(f"[알림] 서버 시작: http://{server.host}:{server.port}  (종료: Ctrl+C)")
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except (NotImplementedError, RuntimeError):
+            # Windows: Ctrl+C는 asyncio.run이 작업 취소로 처리
+            pass
+
+    try:
+        await stop.wait()
+    finally:
+        print("[알림] 서버 종료 중... (진행 중인 응답을 기다립니다)")
+        await server.shutdown()
+        print("[알림] 서버를 종료했습니다.")
+
+
+def main(argv=None):
+    """
+    서버 시작점입니다.
+
+    Args:
+        argv: 명령줄 인자 리스트 (기본값: None, sys.argv 사용)
+    """
+    parser = argparse.ArgumentParser(description="AI 챗봇 HTTP 서버 (SSE 스트리밍)")
+    parser.add_argument("--host", default=SERVER_HOST, help="접속을 받을 주소")
+    parser.add_argument("--port", type=int, default=SERVER_PORT, help="접속을 받을 포트")
+    parser.add_argument("--max-sessions", type=int, default=SERVER_MAX_SESSIONS,
+                        help="메모리에 유지할 최대 세션 수")
+    parser.add_argument("--max-concurrency", type=int, default=SERVER_MAX_CONCURRENT_TURNS,
+                        help="AI에게 동시에 보내는 최대 요청 수")
+    parser.add_argument("--max-queue", type=int, default=SERVER_MAX_QUEUED_TURNS,
+                        help="차례를 기다릴 수 있는 최대 요청 수")
+    args = parser.parse_args(argv)
+
+    api_key = get_api_key()
+    if not api_key or not api_key.strip():
+        print("[오류] API 키 문제")
+        print(ERROR_MESSAGES["no_api_key"])
+        return
+
+    try:
+        asyncio.run(serve(
+            api_key, args.host, args.port,
+            max_sessions=args.max_sessions,
+            max_concurrent_turns=args.max_concurrency,
+            max_queued_turns=args.max_queue
+        ))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
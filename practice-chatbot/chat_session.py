@@ -0,0 +1,283 @@
+"""
+대화 세션 자료구조 모듈
+
+대화 히스토리를 담는 Session과 메시지 하나를 담는 Message 클래스를 제공합니다.
+
+- Message: role/content/tokens만 담는 가벼운 레코드
+  (dict처럼 message["role"]로 읽을 수 있고, API에는 role/content만 전달됨)
+- Session: 최대 길이가 정해진 deque로 히스토리를 관리
+  (추가/오래된 메시지 삭제/롤백이 모두 O(1), 리스트 복사 없음)
+
+기존 코드와의 호환을 위해 Session도 session["model"], session["messages"]처럼
+딕셔너리 방식으로 접근할 수 있습니다.
+세션은 보통 chatbot.create_session()으로 만듭니다.
+
+사용 예시:
+    from chatbot import create_session, add_message
+
+    session = create_session("gpt")
+    add_message(session, "user", "안녕하세요!")
+    print(session["messages"][-1]["content"])
+"""
+
+from collections import deque
+from collections.abc import Mapping
+
+from config import MAX_HISTORY_LENGTH, TOKEN_OVERHEAD_PER_MESSAGE
+
+
+def estimate_tokens(text):
+    """
+    텍스트의 토큰 수를 추정합니다.
+    토크나이저 없이 빠르게 계산하기 위한 근사치입니다.
+    (영문/숫자 등 ASCII는 약 4글자당 1토큰, 한글 등은 글자당 약 1토큰)
+
+    Args:
+        text: 토큰 수를 셀 텍스트
+
+    Returns:
+        int: 추정 토큰 수 (메시지 구조 오버헤드 포함)
+
+    사용 예시:
+        tokens = estimate_tokens("안녕하세요!")
+    """
+    if not text:
+        return TOKEN_OVERHEAD_PER_MESSAGE
+
+    ascii_chars = len(text.encode("ascii", "ignore"))
+    other_chars = len(text) - ascii_chars
+    return (ascii_chars + 3) // 4 + other_chars + TOKEN_OVERHEAD_PER_MESSAGE
+
+
+class Message(Mapping):
+    """
+    대화 메시지 하나를 담는 레코드.
+
+    딕셔너리처럼 읽을 수 있는 키는 "role"과 "content"뿐이므로,
+    API 요청에 그대로 넘겨도 추정 토큰 수(tokens)는 전송되지 않습니다.
+
+    사용 예시:
+        message = Message("user", "안녕!", 7)
+        message["content"]  # "안녕!"
+        dict(message)       # {"role": "user", "content": "안녕!"}
+    """
+
+    __slots__ = ("role", "content", "tokens")
+
+    _KEYS = ("role", "content")
+
+    def __init__(self, role, content, tokens=0):
+        self.role = role
+        self.content = content
+        self.tokens = tokens
+
+    def __getitem__(self, key):
+        if key == "role":
+            return self.role
+        if key == "content":
+            return self.content
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(self._KEYS)
+
+    def __len__(self):
+        return len(self._KEYS)
+
+    def __repr__(self):
+        return f"Message(role={self.role!r}, content={self.content!r}, tokens={self.tokens})"
+
+
+class Session:
+    """
+    대화 세션.
+
+    히스토리는 MAX_HISTORY_LENGTH 크기의 deque에 저장되며,
+    가득 찬 상태에서 추가하면 가장 오래된 메시지가 O(1)로 밀려납니다.
+    전체 추정 토큰 수(history_tokens)를 함께 유지합니다.
+
+    session["model"], session["messages"], session.get("model") 처럼
+    예전 딕셔너리 세션과 같은 방식으로도 사용할 수 있습니다.
+
+    저장소(store)가 연결된 경우, 디스크 기록은 chatbot 모듈의
+    add_message/clear_session 등이 담당합니다.
+    보관소(archive)가 연결된 경우, 히스토리에서 밀려난 메시지는 버리지 않고 보관소로 넘깁니다.
+    색인(index)이 연결된 경우, 메시지를 추가/삭제할 때마다 색인도 함께 갱신합니다.
+    """
+
+    __slots__ = ("model", "messages", "history_tokens", "session_id", "store", "compaction", "archive", "index")
+
+    # 딕셔너리 방식으로 접근할 수 있는 키
+    _FIELDS = ("model", "messages", "history_tokens", "session_id")
+
+    def __init__(self, model, session_id=None, store=None):
+        self.model = model
+        self.messages = deque(maxlen=MAX_HISTORY_LENGTH)
+        self.history_tokens = 0
+
+        # 디스크 저장소 연결 정보 (session_store.SessionStore, 없으면 메모리에만 보관)
+        self.session_id = session_id
+        self.store = store
+
+        # 진행 중인 히스토리 요약 작업 (compactor 모듈이 관리)
+        self.compaction = None
+
+        # 밀려난 메시지를 보관할 turn_archive.TurnArchive (없으면 버림)
+        self.archive = None
+
+        # 관련 대화 검색용 context_builder.ContextIndex (없으면 히스토리 전체를 보냄)
+        self.index = None
+
+    # ------------------------------------------------------------
+    # 히스토리 조작
+    # ------------------------------------------------------------
+
+    def append(self, role, content, tokens=None):
+        """
+        메시지를 추가합니다. 최대 개수에 도달했으면 가장 오래된 메시지가 밀려납니다.
+
+        Args:
+            role: 메시지 역할
+            content: 메시지 내용
+            tokens: 메시지의 추정 토큰 수 (None이면 여기서 계산)
+
+        Returns:
+            Message: 추가한 메시지
+        """
+        if tokens is None:
+            tokens = estimate_tokens(content)
+
+        if len(self.messages) == self.messages.maxlen:
+            oldest = self.messages[0]
+            self.history_tokens -= oldest.tokens
+            if self.archive is not None:
+                self.archive.add(oldest)
+            if self.index is not None:
+                self.index.remove(oldest)
+
+        message = Message(role, content, tokens)
+        self.messages.append(message)
+        self.history_tokens += tokens
+        if self.index is not None:
+            self.index.add(message)
+        return message
+
+    def pop_oldest(self):
+        """
+        가장 오래된 메시지를 삭제하고 반환합니다.
+
+        Returns:
+            Message: 삭제한 메시지
+        """
+        message = self.messages.popleft()
+        self.history_tokens -= message.tokens
+        if self.archive is not None:
+            self.archive.add(message)
+        if self.index is not None:
+            self.index.remove(message)
+        return message
+
+    def remove_last(self, message):
+        """
+        마지막 메시지가 주어진 메시지 객체와 같은 객체일 때만 삭제합니다.
+        (내용이 같은 다른 메시지를 잘못 지우지 않도록 객체 동일성으로 비교)
+
+        Args:
+            message: 삭제할 메시지 객체
+
+        Returns:
+            bool: 삭제 여부
+        """
+        if self.messages and self.messages[-1] is message:
+            self.messages.pop()
+            self.history_tokens -= message.tokens
+            if self.index is not None:
+                self.index.remove(message)
+            return True
+        return False
+
+    def replace_oldest(self, messages, role, content, tokens=None):
+        """
+        가장 오래된 메시지들을 메시지 하나로 바꿉니다. (히스토리 요약용)
+        앞쪽 메시지들이 주어진 메시지 객체들과 같은 객체일 때만 바꿉니다.
+
+        Args:
+            messages: 바꿀 가장 오래된 메시지 객체들 (순서대로)
+            role: 새 메시지 역할
+            content: 새 메시지 내용
+            tokens: 새 메시지의 추정 토큰 수 (None이면 여기서 계산)
+
+        Returns:
+            Message 또는 None: 추가한 메시지, 히스토리가 바뀌어 맞지 않으면 None
+        """
+        if not messages or len(messages) > len(self.messages):
+            return None
+        if any(current is not expected for current, expected in zip(self.messages, messages)):
+            return None
+
+        if tokens is None:
+            tokens = estimate_tokens(content)
+
+        for _ in messages:
+            self.pop_oldest()
+
+        message = Message(role, content, tokens)
+        self.messages.appendleft(message)
+        self.history_tokens += tokens
+        return message
+
+    def clear(self):
+        """히스토리를 모두 삭제합니다."""
+        self.messages.clear()
+        self.history_tokens = 0
+        if self.index is not None:
+            self.index.clear()
+
+    def payload(self):
+        """
+        API 요청에 넘길 메시지 목록을 반환합니다.
+        복사본을 만들지 않고 내부 deque를 그대로 돌려주므로 읽기 전용으로 사용하세요.
+
+        Returns:
+            deque: Message 레코드들
+        """
+        return self.messages
+
+    def __len__(self):
+        return len(self.messages)
+
+    # ------------------------------------------------------------
+    # 딕셔너리 방식 접근 (기존 코드 호환)
+    # ------------------------------------------------------------
+
+    def __getitem__(self, key):
+        if key not in self._FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        if key == "messages":
+            # 메시지 목록을 통째로 바꾸는 경우 (예: session["messages"] = [])
+            self.clear()
+            for message in value:
+                tokens = message.tokens if isinstance(message, Message) else None
+                self.append(message["role"], message["content"], tokens)
+            return
+
+        if key not in self._FIELDS:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key):
+        return key in self._FIELDS
+
+    def get(self, key, default=None):
+        if key not in self._FIELDS:
+            return default
+        return getattr(self, key)
+
+    def __repr__(self):
+        return (
+            f"Session(model={self.model!r}, messages={len(self.messages)}, "
+            f"history_tokens={self.history_tokens})"
+        )
@@ -12,29 +12,106 @@ OpenRouter API와 통신하고 대화를 관리하는 핵심 기능을 제공합
     response = send_message(client, session, "안녕하세요!")
 """
 
-from openai import OpenAI
-import openai
-import requests
+import atexit
+import hashlib
+import importlib.util
+import socket
+import sqlite3
+import threading
+import time
+
+# openai, httpx, requests는 불러오는 데 수백 ms가 걸리므로 처음 사용하는 함수 안에서 불러옴
+# (콘솔 앱이 API 키 검증을 기다리지 않고 바로 입력을 받을 수 있도록)
 
 from config import (
     API_BASE_URL,
     API_TIMEOUT,
+    HTTP_POOL_MAX_CONNECTIONS,
+    HTTP_POOL_MAX_KEEPALIVE,
+    HTTP_KEEPALIVE_EXPIRY,
+    HTTP2_ENABLED,
+    HTTP_PREWARM_ENABLED,
+    HTTP_PREWARM_CONNECTIONS,
+    HTTP_PREWARM_TIMEOUT,
     MAX_HISTORY_LENGTH,
+    HISTORY_TRIM_MODE,
+    HISTORY_TRIM_TARGET_RATIO,
+    PROMPT_CACHE_MIN_TOKENS,
+    VALIDATION_CACHE_TTL,
+    VALIDATION_NEGATIVE_CACHE_TTL,
+    RACE_HEDGE_DELAY,
+    RACE_HEDGE_MODELS,
+    RACE_MAX_HEDGES,
+    COALESCE_ENABLED,
+    ARCHIVE_ENABLED,
+    ARCHIVE_SEARCH_LIMIT,
+    RETRIEVAL_ENABLED,
     MODELS,
     DEFAULT_MODEL,
     ERROR_MESSAGES,
     get_model_id,
-    get_model_list
+    get_model_list,
+    get_history_token_budget
 )
+import coalesce
+import compactor
+import model_catalog
+import retry
+import router
+import telemetry
+from chat_session import Session, estimate_tokens
+from context_builder import ContextIndex, build_context
+from rate_limit import get_model_limiter
+from response_cache import get_response_cache, make_cache_key
+from turn_archive import TurnArchive
 
 
 # ============================================================
 # API 클라이언트 생성
 # ============================================================
 
+# API 키별 공유 클라이언트: {키 해시: OpenAI 클라이언트}
+# 모든 클라이언트는 하나의 HTTP 연결 풀(_shared_http_client)을 함께 사용
+_client_registry = {}
+_shared_http_client = None
+_client_registry_lock = threading.Lock()
+
+# 마지막으로 연결을 미리 열어 둔 시각 (유휴 연결이 유지되는 동안은 다시 열지 않음)
+_warmed_at = None
+
+
+def http_client_options():
+    """
+    공유 HTTP 연결 풀 설정을 httpx 클라이언트 인자로 반환합니다.
+    동기/비동기 연결 풀이 같은 설정을 사용합니다.
+
+    HTTP2_ENABLED가 True여도 h2 패키지가 없으면 HTTP/1.1을 사용합니다.
+
+    Returns:
+        dict: httpx.Client / httpx.AsyncClient 생성 인자
+    """
+    import httpx
+
+    return {
+        "timeout": API_TIMEOUT,
+        "limits": httpx.Limits(
+            max_connections=HTTP_POOL_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_POOL_MAX_KEEPALIVE,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY
+        ),
+        "http2": HTTP2_ENABLED and importlib.util.find_spec("h2") is not None
+    }
+
+
 def create_client(api_key):
     """
-    OpenRouter API 클라이언트를 생성합니다.
+    OpenRouter API 클라이언트를 반환합니다.
+
+    같은 API 키에 대해서는 프로세스 전체에서 하나의 클라이언트를 재사용하며,
+    모든 클라이언트가 하나의 HTTP 연결 풀을 공유합니다.
+    따라서 사용자(세션)가 늘어나도 연결 수와 메모리는 키 개수만큼만 늘어납니다.
+    공유 객체이므로 반환된 클라이언트를 직접 close()하지 마세요.
+    (종료 시 close_clients()가 자동으로 정리합니다)
 
     Args:
         api_key: OpenRouter API 키
@@ -45,19 +122,151 @@ def create_client(api_key):
     사용 예시:
         client = create_client("sk-or-...")
     """
-    client = OpenAI(
-        base_url=API_BASE_URL,
-        api_key=api_key,
-        timeout=API_TIMEOUT
-    )
+    from openai import OpenAI
+
+    key_hash = _hash_api_key(api_key)
+
+    with _client_registry_lock:
+        client = _client_registry.get(key_hash)
+        if client is not None:
+            return client
+
+        client = OpenAI(
+            base_url=API_BASE_URL,
+            api_key=api_key,
+            timeout=API_TIMEOUT,
+            # 재시도는 send_message가 retry 모듈 정책으로 직접 처리
+            max_retries=0,
+            http_client=_get_shared_http_client()
+        )
+        _client_registry[key_hash] = client
+
     return client
 
 
+def _get_shared_http_client():
+    """
+    모든 API 클라이언트가 함께 사용하는 httpx 연결 풀을 반환합니다. (없으면 생성)
+    _client_registry_lock을 잡은 상태에서 호출해야 합니다.
+    """
+    global _shared_http_client
+
+    import httpx
+
+    if _shared_http_client is None or _shared_http_client.is_closed:
+        _shared_http_client = httpx.Client(**http_client_options())
+    return _shared_http_client
+
+
+def warm_up_connections(count=HTTP_PREWARM_CONNECTIONS, timeout=HTTP_PREWARM_TIMEOUT):
+    """
+    API 서버 연결을 공유 연결 풀에 미리 열어 둡니다.
+
+    create_client로 만든 클라이언트는 모두 이 연결 풀을 사용하므로, 첫 메시지도
+    이미 열린 연결로 보내 DNS 조회와 TCP/TLS 핸드셰이크 시간만큼 빨라집니다.
+    count개의 HEAD 요청(인증 헤더 없음)을 동시에 보내 연결을 열고,
+    모두 열린 뒤 함께 반납하여 서로 다른 연결이 풀에 남도록 합니다.
+
+    열어 둔 연결이 아직 유지되는 시간(HTTP_KEEPALIVE_EXPIRY) 안이면 다시 열지 않으며,
+    실패해도 첫 메시지를 보낼 때 평소처럼 연결하므로 에러를 알리지 않습니다.
+
+    Args:
+        count: 열어 둘 연결 수 (HTTP/2는 한 연결로 여러 요청을 보내므로 1개)
+        timeout: 연결을 여는 최대 시간 (초)
+
+    Returns:
+        int: 새로 열어 둔 연결 수
+
+    사용 예시:
+        threading.Thread(target=warm_up_connections, daemon=True).start()
+        is_valid, error = validate_api_key(api_key)   # 그동안 검증 진행
+    """
+    global _warmed_at
+
+    with _client_registry_lock:
+        if _warmed_at is not None and time.monotonic() - _warmed_at < HTTP_KEEPALIVE_EXPIRY:
+            return 0
+        _warmed_at = time.monotonic()
+        http_client = _get_shared_http_client()
+
+    if http_client_options()["http2"]:
+        count = 1
+
+    # 모든 요청이 응답을 받을 때까지 연결을 붙잡고 있다가 함께 반납
+    barrier = threading.Barrier(count)
+    opened = []
+
+    def open_connection():
+        try:
+            with http_client.stream("HEAD", f"{API_BASE_URL}/models", timeout=timeout) as response:
+                # 응답을 끝까지 읽어야 연결이 닫히지 않고 풀로 돌아감
+                response.read()
+                opened.append(True)
+                barrier.wait(timeout)
+        except threading.BrokenBarrierError:
+            pass
+        except Exception:
+            barrier.abort()
+
+    threads = [threading.Thread(target=open_connection, daemon=True) for _ in range(count - 1)]
+    for thread in threads:
+        thread.start()
+    open_connection()
+    for thread in threads:
+        thread.join()
+
+    return len(opened)
+
+
+def start_warm_up():
+    """
+    warm_up_connections()를 백그라운드 스레드에서 시작합니다.
+    HTTP_PREWARM_ENABLED가 False면 아무것도 하지 않습니다.
+
+    Returns:
+        threading.Thread 또는 None: 연결을 여는 스레드
+    """
+    if not HTTP_PREWARM_ENABLED:
+        return None
+
+    thread = threading.Thread(target=warm_up_connections, daemon=True)
+    thread.start()
+    return thread
+
+
+def close_clients():
+    """
+    공유 클라이언트를 모두 정리하고 HTTP 연결 풀을 닫습니다.
+    프로그램 종료 시 자동으로 호출되며, 직접 호출해도 안전합니다.
+
+    사용 예시:
+        close_clients()
+    """
+    global _shared_http_client, _warmed_at
+
+    with _client_registry_lock:
+        _client_registry.clear()
+        _warmed_at = None
+        if _shared_http_client is not None:
+            _shared_http_client.close()
+            _shared_http_client = None
+
+
+# 프로그램 종료 시 열린 연결을 정리
+atexit.register(close_clients)
+
+
 def validate_api_key(api_key):
     """
     API 키가 유효한지 확인합니다.
     /models 엔드포인트를 호출하여 검증합니다.
 
+    검증 결과는 프로세스 전체에서 공유되는 캐시에 저장되어,
+    같은 키로 다시 검증하면 네트워크 요청 없이 바로 결과를 돌려줍니다.
+    (유효한 키: VALIDATION_CACHE_TTL초, 잘못된 키: VALIDATION_NEGATIVE_CACHE_TTL초)
+
+    응답으로 받은 모델 카탈로그는 model_catalog에 저장되어 MODELS의 한도와 가격에 반영됩니다.
+
     Args:
         api_key: 검증할 API 키
 
@@ -73,52 +282,228 @@ def validate_api_key(api_key):
     if not api_key or api_key.strip() == "":
         return False, ERROR_MESSAGES["no_api_key"]
 
-    # API 호출로 키 유효성 검증
-    try:
-        response = requests.get(
-            f"{API_BASE_URL}/models",
-            headers={"Authorization": f"Bearer {api_key}"},
-            timeout=10
-        )
+    import requests
 
-        if response.status_code == 401:
-            return False, ERROR_MESSAGES["invalid_api_key"]
+    # 같은 키를 동시에 검증하면 한 번만 요청하도록 키별로 잠금
+    with _validation_lock_for(api_key):
+        cached = get_cached_validation(api_key)
+        if cached is not None:
+            return cached
 
-        if response.status_code == 200:
-            return True, None
+        # API 호출로 키 유효성 검증 (연결을 재사용하는 공유 세션 사용)
+        # 응답으로 오는 모델 카탈로그는 저장해 두고, 바뀌지 않았으면 다시 받지 않음 (304)
+        headers = {"Authorization": f"Bearer {api_key}"}
+        headers.update(model_catalog.request_headers())
+        try:
+            response = _get_http_session().get(
+                f"{API_BASE_URL}/models",
+                headers=headers,
+                timeout=10
+            )
+
+            model_catalog.update_from_response(response)
+            status_code = 200 if response.status_code == 304 else response.status_code
+            return cache_validation(api_key, status_code)
+
+        except requests.exceptions.ConnectionError:
+            return False, ERROR_MESSAGES["network_error"]
+        except requests.exceptions.Timeout:
+            return False, ERROR_MESSAGES["timeout"]
+        except Exception as e:
+            return False, ERROR_MESSAGES["unknown_error"].format(error=str(e))
+
+
+# ============================================================
+# API 키 검증 캐시 및 공유 HTTP 세션
+# ============================================================
+
+# keep-alive 연결을 재사용하는 공유 requests 세션
+_http_session = None
+_http_session_lock = threading.Lock()
+
+# 검증 결과 캐시: {키 해시: (만료 시각, 결과 튜플)}
+# API 키 원문은 메모리에 남기지 않도록 해시로만 저장
+_validation_cache = {}
+_validation_locks = {}
+_validation_cache_lock = threading.Lock()
+
+
+def _get_http_session():
+    """
+    프로세스 전체에서 공유하는 requests 세션을 반환합니다.
+    TCP/TLS 연결을 재사용하여 매번 핸드셰이크하는 비용을 줄입니다.
+
+    Returns:
+        requests.Session: 공유 HTTP 세션
+    """
+    global _http_session
+
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    with _http_session_lock:
+        if _http_session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=HTTP_POOL_MAX_KEEPALIVE,
+                pool_maxsize=HTTP_POOL_MAX_CONNECTIONS
+            )
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _http_session = session
+
+    return _http_session
+
+
+def _hash_api_key(api_key):
+    """API 키를 캐시 키로 쓸 해시 문자열로 변환합니다."""
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+
+
+def _validation_lock_for(api_key):
+    """API 키별 검증 잠금을 반환합니다."""
+    key_hash = _hash_api_key(api_key)
+    with _validation_cache_lock:
+        if key_hash not in _validation_locks:
+            _validation_locks[key_hash] = threading.Lock()
+        return _validation_locks[key_hash]
+
+
+def get_cached_validation(api_key):
+    """
+    캐시에 저장된 API 키 검증 결과를 반환합니다.
+
+    Args:
+        api_key: 검증할 API 키
+
+    Returns:
+        tuple 또는 None: (성공 여부, 에러 메시지 또는 None), 없거나 만료되면 None
+    """
+    key_hash = _hash_api_key(api_key)
+    with _validation_cache_lock:
+        entry = _validation_cache.get(key_hash)
+        if entry is None:
+            return None
+
+        expires_at, result = entry
+        if time.monotonic() >= expires_at:
+            del _validation_cache[key_hash]
+            return None
+
+        return result
+
+
+def cache_validation(api_key, status_code):
+    """
+    /models 응답 상태 코드로 검증 결과를 만들고 캐시에 저장합니다.
+    유효한 키(200)와 잘못된 키(401)만 저장하고, 그 외 일시적인 오류는
+    다음 검증 때 다시 확인하도록 저장하지 않습니다.
+
+    Args:
+        api_key: 검증한 API 키
+        status_code: /models 응답의 HTTP 상태 코드
+
+    Returns:
+        tuple: (성공 여부, 에러 메시지 또는 None)
+    """
+    result = _validation_result(status_code)
+
+    if status_code == 200:
+        ttl = VALIDATION_CACHE_TTL
+    elif status_code == 401:
+        ttl = VALIDATION_NEGATIVE_CACHE_TTL
+    else:
+        return result
+
+    with _validation_cache_lock:
+        _validation_cache[_hash_api_key(api_key)] = (time.monotonic() + ttl, result)
+
+    return result
+
+
+def clear_validation_cache():
+    """
+    API 키 검증 캐시를 비웁니다.
+    키를 교체한 직후 바로 다시 검증하고 싶을 때 사용합니다.
+
+    사용 예시:
+        clear_validation_cache()
+    """
+    with _validation_cache_lock:
+        _validation_cache.clear()
 
-        return False, ERROR_MESSAGES["unknown_error"].format(
-            error=f"상태 코드: {response.status_code}"
-        )
 
-    except requests.exceptions.ConnectionError:
-        return False, ERROR_MESSAGES["network_error"]
-    except requests.exceptions.Timeout:
-        return False, ERROR_MESSAGES["timeout"]
-    except Exception as e:
-        return False, ERROR_MESSAGES["unknown_error"].format(error=str(e))
+def _validation_result(status_code):
+    """
+    /models 응답 상태 코드를 검증 결과로 변환합니다.
+    동기/비동기 검증 함수가 함께 사용합니다.
+
+    Args:
+        status_code: HTTP 상태 코드
+
+    Returns:
+        tuple: (성공 여부, 에러 메시지 또는 None)
+    """
+    if status_code == 401:
+        return False, ERROR_MESSAGES["invalid_api_key"]
+
+    if status_code == 200:
+        return True, None
+
+    return False, ERROR_MESSAGES["unknown_error"].format(
+        error=f"상태 코드: {status_code}"
+    )
 
 
 # ============================================================
 # 세션 관리
 # ============================================================
 
-def create_session(model_name=None):
+def create_session(model_name=None, session_id=None, store=None, retrieval=None, archive=None):
     """
     새로운 대화 세션을 생성합니다.
 
+    store와 session_id를 함께 지정하면 세션이 디스크에 저장되며,
+    같은 ID로 저장된 세션이 있으면 최근 대화를 불러와 이어서 사용합니다.
+    archive가 True면 히스토리에서 밀려난 메시지를 보관소에 보관하여
+    search_history()로 찾을 수 있습니다. (저장하는 세션은 같은 ID의 보관소를 이어서 사용,
+    저장하지 않는 세션은 close_session()이나 프로그램 종료 때 보관 파일을 삭제)
+
+    retrieval이 True면 히스토리 전체 대신 최근 메시지와 관련 있는 이전 대화만 보냅니다.
+    (context_builder.py, 히스토리 자체는 그대로 유지)
+
     Args:
-        model_name: 사용할 모델 이름 (기본값: DEFAULT_MODEL)
+        model_name: 사용할 모델 이름 (기본값: DEFAULT_MODEL, 저장된 세션은 저장된 모델)
+        session_id: 세션 ID (기본값: None, 디스크에 저장하지 않음)
+        store: 세션 저장소 (session_store.SessionStore)
+        retrieval: 관련 대화 검색 사용 여부 (기본값: None, RETRIEVAL_ENABLED를 따름)
+        archive: 지난 대화 보관 사용 여부 (기본값: None, ARCHIVE_ENABLED를 따름)
 
     Returns:
-        dict: 세션 정보 딕셔너리
+        Session: 세션 객체 (딕셔너리처럼 접근 가능)
             - model: 현재 모델 이름
-            - messages: 대화 히스토리 리스트
+            - messages: 대화 히스토리 (Message 레코드의 deque)
+            - history_tokens: 히스토리 전체의 추정 토큰 수
+            - session_id: 세션 ID (저장하지 않는 세션은 None)
 
     사용 예시:
         session = create_session("claude")
         session = create_session()  # 기본 모델 사용
+        session = create_session(session_id="my-chat", store=get_session_store())
+        session = create_session("claude", retrieval=True)
+        session = create_session(archive=True)  # /search로 지난 대화 검색
     """
+    if store is None or session_id is None:
+        store = None
+        session_id = None
+
+    # 저장된 세션 불러오기
+    stored_model, stored_messages = None, []
+    if store is not None and store.exists(session_id):
+        stored_model, stored_messages = store.load(session_id)
+        if model_name is None:
+            model_name = stored_model
+
     if model_name is None:
         model_name = DEFAULT_MODEL
 
@@ -126,38 +511,156 @@ def create_session(model_name=None):
     if model_name.lower() not in MODELS:
         model_name = DEFAULT_MODEL
 
-    return {
-        "model": model_name.lower(),
-        "messages": []
-    }
+    session = Session(model_name.lower(), session_id, store)
+
+    # 불러오는 메시지도 색인하도록 먼저 연결
+    if RETRIEVAL_ENABLED if retrieval is None else retrieval:
+        session.index = ContextIndex()
+
+    # 불러온 메시지는 이미 저장되어 있으므로 메모리에만 추가
+    for role, content, tokens in stored_messages:
+        session.append(role, content, tokens)
+    _trim_history(session)
+
+    if store is not None and stored_model != session.model:
+        store.set_model(session_id, session.model)
+
+    # 불러온 뒤에 연결하여, 이미 보관한 메시지를 다시 보관하지 않도록 함
+    if ARCHIVE_ENABLED if archive is None else archive:
+        session.archive = TurnArchive.for_session(session_id)
+
+    return session
 
 
-def add_message(session, role, content):
+def close_session(session):
+    """
+    더 이상 사용하지 않는 세션을 정리합니다.
+    보관소에 남은 메시지를 기록하며, 저장하지 않는 세션이면 보관 파일을 삭제합니다.
+    (HTTP 서버처럼 세션을 많이 만들고 버리는 경우에 호출)
+
+    Args:
+        session: 대화 세션
+
+    사용 예시:
+        close_session(session)
+    """
+    if session.archive is not None:
+        session.archive.close()
+        session.archive = None
+
+
+def search_history(session, query, limit=ARCHIVE_SEARCH_LIMIT):
+    """
+    현재 대화와 보관한 지난 대화에서 검색어를 모두 포함하는 메시지를 최근 것부터 찾습니다.
+    (대소문자 무시, 공백으로 나눈 검색어는 모두 포함해야 함)
+
+    Args:
+        session: 대화 세션
+        query: 검색어
+        limit: 최대 결과 수
+
+    Returns:
+        list: [{"role", "content", "archived_at"}, ...]
+            (현재 대화에 있는 메시지는 archived_at이 None)
+
+    사용 예시:
+        for hit in search_history(session, "파이썬 리스트"):
+            print(hit["role"], hit["content"])
+    """
+    words = query.lower().split()
+    if not words:
+        return []
+
+    hits = []
+    for message in reversed(session.messages):
+        if message.role == "system":
+            continue
+        lowered = message.content.lower()
+        if all(word in lowered for word in words):
+            hits.append({"role": message.role, "content": message.content, "archived_at": None})
+            if len(hits) >= limit:
+                return hits
+
+    if session.archive is not None:
+        hits.extend(session.archive.search(query, limit - len(hits)))
+    return hits
+
+
+def add_message(session, role, content, flush_archive=True):
     """
     세션에 메시지를 추가합니다.
-    최대 개수를 초과하면 오래된 메시지를 삭제합니다.
+    메시지의 토큰 수는 추가할 때 한 번만 계산해 두고,
+    모델의 토큰 예산을 초과하면 오래된 메시지부터 삭제합니다.
 
     Args:
-        session: 대화 세션 딕셔너리
+        session: 대화 세션
         role: 메시지 역할 ("user" 또는 "assistant")
         content: 메시지 내용
+        flush_archive: 밀려난 메시지를 바로 보관소에 기록할지 여부
+            (이벤트 루프에서 호출할 때는 False로 두고 기록은 다른 스레드에서 _flush_archive()로)
 
     Returns:
-        None (세션을 직접 수정)
+        Message: 추가한 메시지 (세션을 직접 수정)
 
     사용 예시:
         add_message(session, "user", "안녕하세요!")
         add_message(session, "assistant", "안녕하세요! 무엇을 도와드릴까요?")
     """
-    session["messages"].append({
-        "role": role,
-        "content": content
-    })
+    tokens = estimate_tokens(content)
+    message = session.append(role, content, tokens)
+
+    # 저장소가 연결된 세션이면 디스크에도 기록
+    if session.store is not None:
+        session.store.append(session.session_id, role, content, tokens)
+
+    _trim_history(session)
+    if flush_archive:
+        _flush_archive(session)
+    return message
+
+
+def _trim_history(session):
+    """
+    히스토리가 모델의 토큰 예산이나 최대 메시지 수를 넘으면 가장 오래된 메시지부터 삭제합니다.
+    누적 토큰 수를 유지하므로 삭제하는 메시지 수만큼만 계산합니다.
+    (가장 최근 메시지는 예산을 넘더라도 항상 남김)
 
-    # 최대 개수 초과 시 가장 오래된 메시지부터 삭제
-    if len(session["messages"]) > MAX_HISTORY_LENGTH:
-        # 리스트 슬라이싱으로 효율적으로 제한
-        session["messages"] = session["messages"][-MAX_HISTORY_LENGTH:]
+    HISTORY_TRIM_MODE가 "chunked"면 한도의 HISTORY_TRIM_TARGET_RATIO까지 한 번에 줄입니다.
+    메시지를 하나씩 밀어내면 요청마다 히스토리 앞부분이 바뀌어 제공자 쪽 프롬프트 캐시가
+    적중하지 않지만, 한 번에 줄이면 다음 정리 전까지 앞부분이 그대로 유지됩니다.
+
+    Args:
+        session: 대화 세션
+    """
+    budget = get_history_token_budget(session.model)
+
+    if HISTORY_TRIM_MODE != "chunked":
+        # 최대 메시지 수는 Session의 deque가 직접 제한
+        while len(session) > 1 and session.history_tokens > budget:
+            session.pop_oldest()
+        return
+
+    if session.history_tokens <= budget and len(session) < MAX_HISTORY_LENGTH:
+        return
+
+    token_target = int(budget * HISTORY_TRIM_TARGET_RATIO)
+    count_target = int(MAX_HISTORY_LENGTH * HISTORY_TRIM_TARGET_RATIO)
+    while len(session) > 1 and (session.history_tokens > token_target or len(session) > count_target):
+        session.pop_oldest()
+
+    # 히스토리가 AI 응답으로 시작하지 않도록 질문-응답 경계에서 자름
+    while len(session) > 1 and session.payload()[0].role == "assistant":
+        session.pop_oldest()
+
+
+def _flush_archive(session):
+    """히스토리에서 밀려난 메시지를 보관소에 기록합니다. (보관 실패는 대화에 영향 없음)"""
+    if session.archive is None:
+        return
+    try:
+        session.archive.flush()
+    except (OSError, sqlite3.Error):
+        pass
 
 
 def clear_session(session):
@@ -165,7 +668,7 @@ def clear_session(session):
     세션의 대화 히스토리를 초기화합니다.
 
     Args:
-        session: 대화 세션 딕셔너리
+        session: 대화 세션
 
     Returns:
         None (세션을 직접 수정)
@@ -173,7 +676,10 @@ def clear_session(session):
     사용 예시:
         clear_session(session)
     """
-    session["messages"] = []
+    session.clear()
+
+    if session.store is not None:
+        session.store.clear(session.session_id)
 
 
 def switch_model(session, model_name):
@@ -181,7 +687,7 @@ def switch_model(session, model_name):
     세션의 모델을 변경합니다.
 
     Args:
-        session: 대화 세션 딕셔너리
+        session: 대화 세션
         model_name: 새로운 모델 이름
 
     Returns:
@@ -197,21 +703,143 @@ def switch_model(session, model_name):
         return False, error_msg
 
     session["model"] = model_name.lower()
+
+    if session.store is not None:
+        session.store.set_model(session.session_id, session.model)
+
+    # 새 모델의 토큰 예산에 맞게 히스토리 정리
+    _trim_history(session)
     return True, None
 
 
+# ============================================================
+# 응답 생성 취소
+# ============================================================
+
+class CancelToken:
+    """
+    진행 중인 응답 생성(턴) 하나를 취소하는 토큰.
+
+    send_message / send_message_race에 cancel로 넘기고, 다른 스레드(Ctrl+C 처리,
+    중지 버튼 등)에서 cancel()을 호출하면 응답을 받던 HTTP 연결을 끊고
+    사용자 메시지를 롤백한 뒤 (False, ERROR_MESSAGES["cancelled"])를 반환합니다.
+    끊은 연결은 연결 풀로 돌아가지 않고 닫히므로 제공자도 생성을 멈춥니다.
+
+    - 응답을 받는 중: 소켓을 바로 닫아 읽기를 깨움 (HTTP/1.1)
+    - 응답 헤더를 기다리는 중: 헤더가 도착하는 대로 중단
+    - 재시도 대기 중: 바로 중단
+    (비동기 함수는 토큰 대신 asyncio 작업 취소를 사용)
+
+    사용 예시:
+        cancel = CancelToken()
+        threading.Timer(5, cancel.cancel).start()
+        success, response = send_message(client, session, "긴 글 써줘", on_delta=print, cancel=cancel)
+    """
+
+    __slots__ = ("_event", "_lock", "_callbacks")
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks = {}    # {등록 번호: 취소 시 호출할 함수}
+
+    @property
+    def cancelled(self):
+        """cancel()이 호출되었는지 여부."""
+        return self._event.is_set()
+
+    def cancel(self):
+        """응답 생성을 취소합니다. 어느 스레드에서나 호출할 수 있으며, 두 번째 호출부터는 무시합니다."""
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._event.set()
+            callbacks = list(self._callbacks.values())
+            self._callbacks.clear()
+
+        for callback in callbacks:
+            callback()
+
+    def wait(self, timeout):
+        """최대 timeout초 동안 취소를 기다립니다. 취소되었으면 True."""
+        return self._event.wait(timeout)
+
+    def add_callback(self, callback):
+        """
+        취소 시 호출할 함수를 등록합니다. 이미 취소되었으면 바로 호출합니다.
+
+        Returns:
+            int 또는 None: remove_callback()에 넘길 등록 번호 (바로 호출했으면 None)
+        """
+        with self._lock:
+            if not self._event.is_set():
+                handle = id(callback)
+                self._callbacks[handle] = callback
+                return handle
+        callback()
+        return None
+
+    def remove_callback(self, handle):
+        """add_callback()으로 등록한 함수를 해제합니다."""
+        if handle is not None:
+            with self._lock:
+                self._callbacks.pop(handle, None)
+
+
+class _TurnCancelled(Exception):
+    """CancelToken으로 취소되어 응답을 더 받지 않을 때 발생시키는 내부 예외."""
+
+
+def _abort_stream(stream):
+    """
+    응답을 받고 있는 스트림의 소켓을 닫아, 다른 스레드에서 읽기를 기다리던 호출을 깨웁니다.
+    HTTP/2는 한 연결을 다른 요청과 함께 쓰므로 소켓을 닫지 않고 다음 조각에서 중단합니다.
+    """
+    response = getattr(stream, "response", None)
+    if response is None or response.http_version != "HTTP/1.1":
+        return
+
+    network_stream = response.extensions.get("network_stream")
+    sock = network_stream.get_extra_info("socket") if network_stream is not None else None
+    if sock is None:
+        return
+    try:
+        sock.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass
+
+
 # ============================================================
 # 메시지 전송
 # ============================================================
 
-def send_message(client, session, user_input):
+def send_message(client, session, user_input, on_delta=None, use_cache=True, cancel=None):
     """
     사용자 메시지를 보내고 AI 응답을 받습니다.
 
+    on_delta를 지정하면 스트리밍 모드로 동작하여, 응답 조각(delta)이
+    도착할 때마다 on_delta(조각 문자열)를 호출합니다.
+    첫 토큰이 도착하는 즉시 화면에 표시할 수 있어 체감 대기 시간이 줄어듭니다.
+
+    429, 5xx, 네트워크 오류는 지수 백오프(Retry-After 헤더 우선)로 다시 시도하며,
+    모델별 속도 제한(MODEL_RATE_LIMITS)에 맞춰 요청 간격을 조절합니다.
+    재시도와 대기를 포함한 전체 시간은 REQUEST_DEADLINE초를 넘지 않고,
+    끝내 실패하면 사용자 메시지를 롤백합니다.
+    (스트리밍 조각을 이미 전달한 뒤의 오류는 다시 시도하지 않음)
+
+    같은 모델, 같은 대화 내용의 요청이 다른 세션에서 이미 진행 중이면
+    API를 다시 호출하지 않고 그 결과를 함께 받습니다. (COALESCE_ENABLED, coalesce.py)
+    합친 요청을 취소하면 이 세션만 빠지며, 실제 API 요청은 함께 기다리는 요청이
+    모두 취소되었을 때만 끊습니다.
+
     Args:
         client: OpenRouter API 클라이언트
-        session: 대화 세션 딕셔너리
+        session: 대화 세션
         user_input: 사용자가 입력한 메시지
+        on_delta: 응답 조각을 받을 콜백 함수 (기본값: None, 스트리밍 안 함)
+        use_cache: 응답 캐시가 켜져 있을 때 캐시를 사용할지 여부
+            (False면 이번 호출만 캐시를 건너뛰고 항상 API를 호출)
+        cancel: 응답 생성을 중간에 취소할 CancelToken (기본값: None)
 
     Returns:
         tuple: (성공 여부, 응답 또는 에러 메시지)
@@ -224,75 +852,344 @@ def send_message(client, session, user_input):
             print(response)
         else:
             print(f"오류: {response}")
+
+        # 스트리밍 모드
+        success, response = send_message(
+            client, session, "안녕!",
+            on_delta=lambda delta: print(delta, end="", flush=True)
+        )
+    """
+    model_name, model_info, user_message, error = _begin_turn(session, user_input)
+    if error:
+        return False, error
+
+    # 실제로 보낼 메시지 (관련 대화 검색을 쓰면 히스토리와 다르므로 캐시/합치기 키도 이것으로 만듦)
+    # 세션의 deque를 그대로 넘기지 않고 스냅숏으로 복사: 합친 요청은 이 세션이 취소되어
+    # 사용자 메시지를 롤백한 뒤에도 함께 기다리는 요청을 위해 계속 재시도할 수 있음
+    messages = list(build_payload(session, model_info))
+
+    # 응답 캐시 확인 (적중 시 API 호출 없이 바로 반환)
+    cache, cache_key, cached = _lookup_cached_response(messages, model_info, use_cache)
+    if cached is not None:
+        if on_delta is not None:
+            on_delta(cached)
+        add_message(session, "assistant", cached)
+        return True, cached
+
+    # API 호출: 같은 요청이 동시에 진행 중이면 그 결과를 함께 받음
+    try:
+        if COALESCE_ENABLED:
+            success, result = coalesce.run(
+                coalesce.make_key(client, model_info, messages),
+                lambda delta_callback, flight_cancel: _complete_with_retry(
+                    client, model_name, model_info, messages, delta_callback, flight_cancel
+                ),
+                on_delta,
+                cancel=cancel
+            )
+        else:
+            success, result = _complete_with_retry(
+                client, model_name, model_info, messages, on_delta, cancel
+            )
+    except BaseException:
+        # Ctrl+C 등으로 중단된 경우에도 히스토리를 원래대로 되돌림
+        _rollback_user_message(session, user_message)
+        raise
+
+    if not success:
+        # 포기 또는 취소: 사용자 메시지 롤백 후 에러 메시지 반환
+        _rollback_user_message(session, user_message)
+        return False, result
+    assistant_message = result
+
+    # 다음에 같은 요청이 오면 재사용하도록 캐시에 저장
+    if cache is not None and assistant_message:
+        cache.put(cache_key, assistant_message)
+
+    # AI 응답을 세션에 추가
+    add_message(session, "assistant", assistant_message)
+
+    # 히스토리가 길어졌으면 오래된 메시지 요약을 백그라운드에서 시작
+    compactor.maybe_compact(client, session)
+
+    return True, assistant_message
+
+
+def _complete_with_retry(client, model_name, model_info, messages, on_delta=None, cancel=None):
+    """
+    API를 호출하여 응답을 받습니다.
+    일시적인 오류는 백오프 후 재시도하며, 전체 마감 시간(REQUEST_DEADLINE)을 넘지 않습니다.
+    세션은 수정하지 않으므로 실패 시 롤백은 호출한 쪽에서 합니다.
+
+    Args:
+        client: OpenRouter API 클라이언트
+        model_name: 속도 제한에 사용할 모델 이름 (MODELS의 키)
+        model_info: MODELS의 모델 정보 딕셔너리
+        messages: API에 보낼 메시지 리스트
+        on_delta: 응답 조각을 받을 콜백 함수 (기본값: None, 스트리밍 안 함)
+        cancel: 취소 토큰 (기본값: None)
+
+    Returns:
+        tuple: (성공 여부, AI 응답 또는 에러 메시지)
+    """
+    deadline = retry.start_deadline()
+    limiter = get_model_limiter(model_name)
+    attempt = 0
+
+    while True:
+        # 모델별 속도 제한: 429를 받기 전에 미리 요청 간격을 조절 (기다리는 도중에도 취소 가능)
+        if limiter is not None and not limiter.acquire(max_wait=retry.remaining(deadline), cancel=cancel):
+            if cancel is not None and cancel.cancelled:
+                return False, ERROR_MESSAGES["cancelled"]
+            return False, ERROR_MESSAGES["rate_limit"]
+
+        if retry.remaining(deadline) <= 0:
+            return False, ERROR_MESSAGES["timeout"]
+
+        if cancel is not None and cancel.cancelled:
+            return False, ERROR_MESSAGES["cancelled"]
+
+        # 시도마다 지연 시간과 토큰 사용량 측정
+        timer = telemetry.start_request(model_info["id"])
+        timer.extra["attempt"] = attempt + 1
+        try:
+            assistant_message, usage = _request_completion(
+                client, model_info, messages, on_delta, timer,
+                timeout=min(API_TIMEOUT, retry.remaining(deadline)),
+                cancel=cancel
+            )
+            timer.finish(usage=usage)
+            return True, assistant_message
+
+        except _TurnCancelled:
+            # 사용자가 취소한 요청은 에러로 기록하지 않음 (자동 선택의 에러율에 섞이지 않도록)
+            return False, ERROR_MESSAGES["cancelled"]
+
+        except Exception as e:
+            timer.finish(error=e)
+
+            # 이미 화면에 출력한 조각이 있으면 다시 시도하지 않음
+            shown = on_delta is not None and timer.first_token is not None
+            delay = None if shown else retry.next_delay(attempt, e, deadline)
+            if delay is None:
+                return False, _api_error_message(e)
+
+            if cancel is not None:
+                cancel.wait(delay)
+            else:
+                time.sleep(delay)
+            attempt += 1
+
+        except BaseException as e:
+            timer.finish(error=e)
+            raise
+
+
+def _request_completion(client, model_info, messages, on_delta=None, timer=None, timeout=None, cancel=None):
+    """
+    API를 한 번 호출하여 응답을 받습니다. (재시도 없음)
+
+    Args:
+        client: OpenRouter API 클라이언트
+        model_info: MODELS의 모델 정보 딕셔너리
+        messages: API에 보낼 메시지 리스트
+        on_delta: 응답 조각을 받을 콜백 함수 (None이면 스트리밍 안 함)
+        timer: 응답 헤더/첫 토큰 시점을 기록할 telemetry.RequestTimer (선택)
+        timeout: 이번 요청의 제한 시간 (초, 기본값: 클라이언트 설정)
+        cancel: 취소 토큰 (지정하면 중간에 끊을 수 있도록 항상 스트리밍으로 받음)
+
+    Returns:
+        tuple: (응답 문자열, usage 객체 또는 None)
+    """
+    import openai
+
+    if on_delta is not None or cancel is not None:
+        return _stream_completion(client, model_info, messages, on_delta, timer, timeout, cancel)
+
+    response = client.chat.completions.create(
+        model=model_info["id"],
+        max_tokens=model_info["max_tokens"],
+        messages=messages,
+        timeout=timeout if timeout is not None else openai.NOT_GIVEN
+    )
+
+    # 응답 추출
+    return response.choices[0].message.content, response.usage
+
+
+def _begin_turn(session, user_input, flush_archive=True):
+    """
+    메시지 전송 전 입력을 검증하고 사용자 메시지를 세션에 추가합니다.
+    동기/비동기 send_message가 함께 사용합니다.
+
+    Args:
+        session: 대화 세션
+        user_input: 사용자가 입력한 메시지
+        flush_archive: 밀려난 메시지를 바로 보관소에 기록할지 여부 (add_message와 같음)
+
+    Returns:
+        tuple: (모델 이름, 모델 정보, 추가한 사용자 메시지, 에러 메시지 또는 None)
+            (세션 모델이 "auto"면 이번 요청에 사용할 실제 모델의 이름과 정보이며,
+            속도 제한도 이 모델 기준으로 적용)
     """
     # 빈 입력 확인
     if not user_input or user_input.strip() == "":
-        return False, ERROR_MESSAGES["empty_input"]
+        return None, None, None, ERROR_MESSAGES["empty_input"]
 
     # 모델 정보 가져오기
-    model_info = MODELS.get(session["model"])
+    model_name = session["model"]
+    model_info = MODELS.get(model_name)
     if not model_info:
-        return False, ERROR_MESSAGES["invalid_model"].format(
+        return None, None, None, ERROR_MESSAGES["invalid_model"].format(
             models=get_model_list()
         )
 
-    # 사용자 메시지를 임시 저장 (롤백 대비)
-    user_message = {"role": "user", "content": user_input}
-    session["messages"].append(user_message)
+    # 끝난 히스토리 요약이 있으면 이번 요청부터 반영
+    compactor.apply_compaction(session)
 
-    # 히스토리 제한 적용
-    if len(session["messages"]) > MAX_HISTORY_LENGTH:
-        session["messages"] = session["messages"][-MAX_HISTORY_LENGTH:]
+    # 사용자 메시지를 임시 저장 (롤백 대비, 히스토리 제한도 함께 적용)
+    user_message = add_message(session, "user", user_input, flush_archive)
 
-    # API 호출
-    try:
-        response = client.chat.completions.create(
-            model=model_info["id"],
-            max_tokens=model_info["max_tokens"],
-            messages=session["messages"]
-        )
+    # 자동 선택: 최근 성능이 가장 좋고 현재 히스토리가 들어가는 모델로 요청
+    if model_info.get("router"):
+        model_name = router.choose_model(session.history_tokens)
+        model_info = MODELS[model_name]
 
-        # 응답 추출
-        assistant_message = response.choices[0].message.content
+    return model_name, model_info, user_message, None
 
-        # AI 응답을 세션에 추가
-        add_message(session, "assistant", assistant_message)
 
-        return True, assistant_message
+def _lookup_cached_response(messages, model_info, use_cache):
+    """
+    응답 캐시에서 이번에 보낼 메시지 목록에 대한 응답을 찾습니다.
+    동기/비동기 send_message가 함께 사용합니다.
 
-    # OpenAI SDK 구조화된 예외 처리
-    except openai.RateLimitError:
-        # Rate limit 에러 - 롤백 후 반환
-        _rollback_user_message(session, user_message)
-        return False, ERROR_MESSAGES["rate_limit"]
+    Args:
+        messages: API에 보낼 메시지 목록 (build_payload 결과)
+        model_info: MODELS의 모델 정보 딕셔너리
+        use_cache: 캐시 사용 여부
 
-    except openai.APIConnectionError:
-        # 네트워크 연결 에러
-        _rollback_user_message(session, user_message)
-        return False, ERROR_MESSAGES["network_error"]
+    Returns:
+        tuple: (캐시 객체 또는 None, 캐시 키 또는 None, 저장된 응답 또는 None)
+    """
+    cache = get_response_cache() if use_cache else None
+    if cache is None:
+        return None, None, None
 
-    except openai.APITimeoutError:
-        # 타임아웃 에러
-        _rollback_user_message(session, user_message)
-        return False, ERROR_MESSAGES["timeout"]
+    cache_key = make_cache_key(model_info["id"], model_info["max_tokens"], messages)
+    return cache, cache_key, cache.get(cache_key)
 
-    except openai.AuthenticationError:
-        # 인증 에러
-        _rollback_user_message(session, user_message)
-        return False, ERROR_MESSAGES["invalid_api_key"]
 
-    except openai.APIStatusError as e:
-        # 기타 API 상태 에러 (5xx 등)
-        _rollback_user_message(session, user_message)
-        if e.status_code >= 500:
-            return False, ERROR_MESSAGES["server_error"]
-        return False, ERROR_MESSAGES["unknown_error"].format(error=str(e))
+def build_payload(session, model_info, context=None):
+    """
+    API 요청에 보낼 메시지 목록을 만듭니다.
 
-    except Exception as e:
-        # 기타 예외
-        _rollback_user_message(session, user_message)
-        error_message = handle_error(e)
-        return False, error_message
+    세션에 색인(index)이 연결되어 있으면 히스토리 전체 대신 최근 메시지와
+    마지막 질문과 관련 있는 이전 대화만 보냅니다. (context_builder.build_context)
+
+    프롬프트 캐시를 지원하는 모델(prompt_cache)이고 보낼 메시지가 충분히 길면
+    첫 메시지와 마지막 메시지에 캐시 지점(cache_control)을 표시합니다.
+    제공자는 표시한 지점까지의 앞부분을 캐시해 두었다가, 다음 요청의 앞부분이
+    같으면 다시 계산하지 않고 읽어 옵니다. (입력 토큰 비용과 첫 토큰 지연 감소)
+    그 외 모델은 세션의 메시지를 복사 없이 그대로 반환합니다.
+
+    Args:
+        session: 대화 세션
+        model_info: MODELS의 모델 정보 딕셔너리 (이번 요청에 사용할 모델)
+        context: 미리 만든 (메시지 목록, 추정 토큰 수) (기본값: None, 여기서 build_context로 만듦)
+            (여러 모델에 같은 내용을 보낼 때 한 번 만든 스냅숏을 넘김)
+
+    Returns:
+        deque 또는 list: API에 보낼 메시지 목록 (읽기 전용)
+
+    사용 예시:
+        messages = build_payload(session, MODELS["claude"])
+    """
+    messages, tokens = build_context(session) if context is None else context
+    if not model_info.get("prompt_cache") or tokens < PROMPT_CACHE_MIN_TOKENS:
+        return messages
+
+    payload = list(messages)
+    for index in {0, len(payload) - 1}:
+        message = payload[index]
+        payload[index] = {
+            "role": message["role"],
+            "content": [{
+                "type": "text",
+                "text": message["content"],
+                "cache_control": {"type": "ephemeral"}
+            }]
+        }
+    return payload
+
+
+def _stream_completion(client, model_info, messages, on_delta, timer=None, timeout=None, cancel=None):
+    """
+    스트리밍 방식으로 API를 호출하고 응답 조각을 콜백으로 전달합니다.
+
+    Args:
+        client: OpenRouter API 클라이언트
+        model_info: MODELS의 모델 정보 딕셔너리
+        messages: API에 보낼 메시지 리스트
+        on_delta: 응답 조각을 받을 콜백 함수 (None이면 조각을 모으기만 함)
+        timer: 응답 헤더/첫 토큰 시점을 기록할 telemetry.RequestTimer (선택)
+        timeout: 이번 요청의 제한 시간 (초, 기본값: 클라이언트 설정)
+        cancel: 취소 토큰 (취소되면 연결을 끊고 _TurnCancelled 발생)
+
+    Returns:
+        tuple: (조각을 모두 이어 붙인 전체 응답, usage 객체 또는 None)
+    """
+    import openai
+
+    stream = client.chat.completions.create(
+        model=model_info["id"],
+        max_tokens=model_info["max_tokens"],
+        messages=messages,
+        stream=True,
+        # 마지막 조각에 토큰 사용량을 포함하도록 요청
+        stream_options={"include_usage": True},
+        timeout=timeout if timeout is not None else openai.NOT_GIVEN
+    )
+    if timer is not None:
+        timer.mark_connected()
+
+    # 취소되면 다른 스레드에서 소켓을 닫아 아래 읽기를 바로 깨움 (이미 취소되었으면 바로 닫음)
+    abort_handle = cancel.add_callback(lambda: _abort_stream(stream)) if cancel is not None else None
+
+    chunks = []
+    usage = None
+    try:
+        for chunk in stream:
+            if cancel is not None and cancel.cancelled:
+                raise _TurnCancelled()
+            if chunk.usage is not None:
+                usage = chunk.usage
+
+            # 사용량 정보 등 choices가 비어있는 조각은 건너뜀
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                if timer is not None and not chunks:
+                    timer.mark_first_token()
+                chunks.append(delta)
+                if on_delta is not None:
+                    on_delta(delta)
+    except Exception:
+        # 소켓을 닫아서 생긴 읽기 오류는 취소로 처리
+        if cancel is not None and cancel.cancelled:
+            raise _TurnCancelled() from None
+        raise
+    finally:
+        # 중간에 중단되더라도 HTTP 연결을 반드시 정리
+        if cancel is not None:
+            cancel.remove_callback(abort_handle)
+        stream.close()
+
+    if cancel is not None and cancel.cancelled:
+        # 소켓을 닫은 직후 응답이 정상 종료처럼 끝난 경우
+        raise _TurnCancelled()
+
+    return "".join(chunks), usage
 
 
 def _rollback_user_message(session, user_message):
@@ -301,12 +1198,57 @@ def _rollback_user_message(session, user_message):
     추가한 정확한 메시지를 찾아서 삭제합니다.
 
     Args:
-        session: 대화 세션 딕셔너리
-        user_message: 롤백할 사용자 메시지 딕셔너리
+        session: 대화 세션
+        user_message: 롤백할 사용자 메시지 (add_message가 반환한 Message)
+    """
+    # 마지막 메시지가 추가한 바로 그 메시지 객체일 때만 삭제
+    if session.remove_last(user_message) and session.store is not None:
+        session.store.pop(session.session_id)
+
+
+def _api_error_message(error):
+    """
+    API 호출 중 발생한 예외를 ERROR_MESSAGES의 메시지로 변환합니다.
+    동기/비동기 send_message가 함께 사용합니다.
+
+    Args:
+        error: 발생한 예외 객체
+
+    Returns:
+        str: 한국어 에러 메시지
     """
-    # 마지막 메시지가 추가한 메시지와 일치하면 삭제
-    if session["messages"] and session["messages"][-1] == user_message:
-        session["messages"].pop()
+    import openai
+
+    # OpenAI SDK 구조화된 예외 처리
+    # (APITimeoutError는 APIConnectionError의 하위 클래스이므로 먼저 확인)
+    if isinstance(error, openai.APITimeoutError):
+        # 타임아웃 에러
+        return ERROR_MESSAGES["timeout"]
+
+    if isinstance(error, openai.APIConnectionError):
+        # 네트워크 연결 에러
+        return ERROR_MESSAGES["network_error"]
+
+    if isinstance(error, openai.RateLimitError):
+        # Rate limit 에러
+        return ERROR_MESSAGES["rate_limit"]
+
+    if isinstance(error, openai.AuthenticationError):
+        # 인증 에러
+        return ERROR_MESSAGES["invalid_api_key"]
+
+    if isinstance(error, openai.APIStatusError):
+        # 기타 API 상태 에러 (5xx 등)
+        if error.status_code >= 500:
+            return ERROR_MESSAGES["server_error"]
+        return ERROR_MESSAGES["unknown_error"].format(error=str(error))
+
+    if isinstance(error, _RateLimitWait):
+        # 속도 제한 버킷에서 마감 시간 안에 차례가 오지 않음
+        return ERROR_MESSAGES["rate_limit"]
+
+    # 기타 예외
+    return handle_error(error)
 
 
 def handle_error(error):
@@ -352,6 +1294,267 @@ def handle_error(error):
     return ERROR_MESSAGES["unknown_error"].format(error=str(error))
 
 
+# ============================================================
+# 경쟁(race) 요청
+# ============================================================
+
+class _RaceLost(Exception):
+    """다른 모델이 이겨서 더 이상 응답을 받을 필요가 없을 때 발생시키는 내부 예외."""
+
+
+class _RateLimitWait(Exception):
+    """마감 시간 안에 모델별 속도 제한 토큰을 얻지 못했을 때의 내부 예외."""
+
+
+class _Race:
+    """
+    send_message_race에서 여러 모델 요청의 진행 상황을 공유하는 상태.
+    각 요청은 별도 스레드에서 실행되며, 모든 상태 변경은 cond 잠금 안에서 합니다.
+    """
+
+    def __init__(self, commit_on_first_token):
+        # 스트리밍 중이면 첫 토큰을 받은 모델이 바로 이김 (두 응답을 섞어 보여줄 수 없음)
+        self.commit_on_first_token = commit_on_first_token
+        self.cond = threading.Condition()
+        self.first_token = False
+        self.winner = None
+        self.result = None
+        self.error = None
+        self.errors = []
+        self.failed = 0
+        self.completed = False
+        self.cancelled = False
+
+    def is_lost(self, index):
+        """index 번째 요청이 이미 진 상태인지 확인합니다. (cond 잠금 안에서 호출)"""
+        return self.cancelled or (self.winner is not None and self.winner != index)
+
+    def on_token(self, index):
+        """응답 조각이 도착했을 때 호출합니다. 계속 받아야 하면 True."""
+        with self.cond:
+            if self.is_lost(index):
+                return False
+            self.first_token = True
+            if self.commit_on_first_token and self.winner is None:
+                self.winner = index
+            self.cond.notify_all()
+            return True
+
+    def on_complete(self, index, text, usage):
+        """응답을 모두 받았을 때 호출합니다. 이 응답이 채택되면 True."""
+        with self.cond:
+            if self.is_lost(index):
+                return False
+            self.winner = index
+            self.result = (text, usage)
+            self.completed = True
+            self.cond.notify_all()
+            return True
+
+    def on_error(self, index, error):
+        """요청이 실패했을 때 호출합니다."""
+        with self.cond:
+            self.failed += 1
+            self.errors.append(error)
+            # 이미 화면에 출력 중이던 모델이 실패하면 이번 턴은 실패
+            if self.winner == index:
+                self.error = error
+                self.completed = True
+            self.cond.notify_all()
+
+    def cancel(self):
+        """진행 중인 모든 요청을 중단시킵니다."""
+        with self.cond:
+            self.cancelled = True
+            self.cond.notify_all()
+
+
+def get_race_models(primary, hedge_models=None, max_hedges=RACE_MAX_HEDGES):
+    """
+    경쟁 요청에 참여할 모델 목록을 반환합니다.
+
+    Args:
+        primary: 주 모델 이름 (세션의 현재 모델)
+        hedge_models: 보조 모델 후보 (기본값: RACE_HEDGE_MODELS)
+        max_hedges: 최대 보조 모델 수
+
+    Returns:
+        list: [주 모델, 보조 모델, ...] 이름 목록
+
+    사용 예시:
+        get_race_models("gemini")  # ["gemini", "gpt"]
+    """
+    if hedge_models is None:
+        hedge_models = RACE_HEDGE_MODELS
+
+    hedges = []
+    for name in hedge_models:
+        name = name.lower()
+        if name in MODELS and not MODELS[name].get("router") and name != primary and name not in hedges:
+            hedges.append(name)
+
+    return [primary] + hedges[:max_hedges]
+
+
+def send_message_race(client, session, user_input, on_delta=None,
+                      hedge_models=None, hedge_delay=RACE_HEDGE_DELAY, use_cache=True, cancel=None):
+    """
+    주 모델에 메시지를 보내고, 첫 토큰이 hedge_delay초 안에 오지 않으면
+    다른 모델에도 같은 요청을 보내(hedge) 먼저 성공한 응답을 사용합니다.
+
+    - 주 모델이 hedge_delay 전에 실패하면 바로 다음 모델로 요청합니다.
+    - 스트리밍(on_delta 지정) 중이면 첫 토큰을 먼저 받은 모델의 응답을 사용하고,
+      아니면 응답을 먼저 모두 받은 모델의 응답을 사용합니다.
+    - 진 요청은 다음 조각을 받는 즉시 연결을 끊어 중단합니다.
+      (응답 헤더를 받기 전인 요청은 헤더가 도착하는 대로 중단)
+    - 이긴 모델의 응답만 히스토리에 추가하며, 세션의 모델은 바뀌지 않습니다.
+    - 보조 요청 비율과 승률은 telemetry.get_race_stats()로 확인할 수 있습니다.
+
+    각 모델 요청은 한 번씩만 보내며(send_message의 재시도 없음),
+    모든 모델이 실패하면 사용자 메시지를 롤백합니다.
+    모델별 속도 제한(MODEL_RATE_LIMITS)은 실제로 요청하는 모델마다 적용합니다.
+    on_delta는 요청을 처리하는 작업 스레드에서 호출됩니다.
+
+    Args:
+        client: OpenRouter API 클라이언트
+        session: 대화 세션
+        user_input: 사용자가 입력한 메시지
+        on_delta: 응답 조각을 받을 콜백 함수 (기본값: None, 스트리밍 안 함)
+        hedge_models: 보조 모델 후보 (기본값: RACE_HEDGE_MODELS)
+        hedge_delay: 보조 요청을 보내기 전 기다릴 시간 (초)
+        use_cache: 응답 캐시가 켜져 있을 때 캐시를 사용할지 여부
+        cancel: 모든 모델의 요청을 중간에 취소할 CancelToken (기본값: None)
+
+    Returns:
+        tuple: (성공 여부, 응답 또는 에러 메시지)
+
+    사용 예시:
+        success, response = send_message_race(client, session, "안녕!", hedge_delay=1.5)
+    """
+    model_name, model_info, user_message, error = _begin_turn(session, user_input)
+    if error:
+        return False, error
+
+    # 자동 선택이면 이번에 고른 모델이 주 모델
+    models = get_race_models(model_name, hedge_models)
+
+    # 작업 스레드가 세션의 deque를 직접 읽지 않도록, 보낼 내용은 이 스레드에서 스냅숏으로 만듦
+    # (이긴 응답을 히스토리에 추가하는 동안 진 요청이 아직 보내는 중일 수 있음)
+    messages, tokens = build_context(session)
+    messages = list(messages)
+    payloads = {name: build_payload(session, MODELS[name], (messages, tokens)) for name in models}
+
+    # 응답 캐시 확인 (주 모델에 보낼 메시지 기준)
+    cache, cache_key, cached = _lookup_cached_response(payloads[model_name], model_info, use_cache)
+    if cached is not None:
+        if on_delta is not None:
+            on_delta(cached)
+        add_message(session, "assistant", cached)
+        return True, cached
+
+    race = _Race(commit_on_first_token=on_delta is not None)
+    deadline = retry.start_deadline()
+
+    def run(index, model_name):
+        info = MODELS[model_name]
+
+        # 모델별 속도 제한: 차례를 기다리는 동안 늦어지면 다른 모델로 보조 요청
+        limiter = get_model_limiter(model_name)
+        if limiter is not None and not limiter.acquire(max_wait=retry.remaining(deadline), cancel=cancel):
+            if cancel is None or not cancel.cancelled:
+                race.on_error(index, _RateLimitWait())
+            return
+
+        timer = telemetry.start_request(info["id"])
+        timer.extra["race"] = "primary" if index == 0 else "hedge"
+
+        def deliver(delta):
+            if not race.on_token(index):
+                raise _RaceLost()
+            if on_delta is not None:
+                on_delta(delta)
+
+        try:
+            text, usage = _stream_completion(
+                client, info, payloads[model_name], deliver, timer, cancel=cancel
+            )
+        except (_RaceLost, _TurnCancelled):
+            # 진 요청과 취소된 요청은 측정 기록에 남기지 않음
+            return
+        except Exception as e:
+            timer.finish(error=e)
+            race.on_error(index, e)
+            return
+
+        timer.extra["race_won"] = race.on_complete(index, text, usage)
+        timer.finish(usage=usage)
+
+    def launch(index):
+        thread = threading.Thread(target=run, args=(index, models[index]), daemon=True)
+        thread.start()
+        return index + 1, time.monotonic() + hedge_delay
+
+    # 취소되면 기다리던 반복문을 깨우고 모든 요청을 멈춤
+    cancel_handle = cancel.add_callback(race.cancel) if cancel is not None else None
+    try:
+        with race.cond:
+            launched, hedge_at = launch(0)
+            while not race.completed and not race.cancelled:
+                # 시작한 요청이 모두 실패: 남은 모델이 있으면 바로 요청, 없으면 포기
+                if race.failed == launched:
+                    if launched == len(models):
+                        break
+                    launched, hedge_at = launch(launched)
+                    continue
+
+                can_hedge = launched < len(models) and not race.first_token
+                if not can_hedge:
+                    race.cond.wait()
+                    continue
+
+                race.cond.wait(timeout=max(0.0, hedge_at - time.monotonic()))
+                if not race.completed and not race.first_token and time.monotonic() >= hedge_at:
+                    launched, hedge_at = launch(launched)
+    except BaseException:
+        # Ctrl+C 등으로 중단된 경우 모든 요청을 멈추고 히스토리를 되돌림
+        race.cancel()
+        _rollback_user_message(session, user_message)
+        raise
+    finally:
+        if cancel is not None:
+            cancel.remove_callback(cancel_handle)
+
+    if race.cancelled:
+        _rollback_user_message(session, user_message)
+        return False, ERROR_MESSAGES["cancelled"]
+
+    winner = race.winner if race.completed and race.error is None else None
+    telemetry.record_race(
+        model_info["id"],
+        launched > 1,
+        MODELS[models[winner]]["id"] if winner is not None else None
+    )
+
+    if winner is None:
+        race.cancel()
+        _rollback_user_message(session, user_message)
+        return False, _api_error_message(race.error or race.errors[0])
+
+    assistant_message, _ = race.result
+
+    # 실제로 응답한 모델 기준으로 캐시에 저장
+    if cache is not None and assistant_message:
+        winner_info = MODELS[models[winner]]
+        cache.put(
+            make_cache_key(winner_info["id"], winner_info["max_tokens"], payloads[models[winner]]),
+            assistant_message
+        )
+
+    add_message(session, "assistant", assistant_message)
+    compactor.maybe_compact(client, session)
+    return True, assistant_message
+
+
 # ============================================================
 # 유틸리티 함수
 # ============================================================
@@ -361,7 +1564,7 @@ def get_current_model_name(session):
     현재 세션에서 사용 중인 모델의 표시 이름을 반환합니다.
 
     Args:
-        session: 대화 세션 딕셔너리
+        session: 대화 세션
 
     Returns:
         str: 모델 표시 이름
@@ -0,0 +1,338 @@
+"""
+같은 요청 합치기(single-flight) 모듈
+
+여러 사용자가 거의 동시에 같은 모델로 같은 대화 내용(예: 공유 링크의 첫 질문)을 보내면,
+먼저 온 요청 하나만 API를 호출하고 나머지는 그 결과를 함께 받습니다.
+응답은 각자의 세션에 따로 추가되며, 실패하면 모든 요청이 같은 에러 메시지를 받고
+각자 사용자 메시지를 롤백합니다. (chatbot.send_message, async_send_message가 사용)
+
+- 키: (API 키, 모델 ID, max_tokens, 메시지 목록 해시)
+- 스트리밍: 먼저 온 요청이 스트리밍이면 뒤에 합류한 요청도 이미 받은 조각부터 차례로 받습니다.
+  (먼저 온 요청이 스트리밍이 아니면 끝난 뒤 응답 전체를 한 번에 받음)
+- 취소: 요청마다 따로 취소할 수 있으며, 실제 요청은 기다리는 요청이 모두 빠졌을 때만 끊습니다.
+- 이미 끝난 요청의 결과는 보관하지 않습니다. (다시 쓰려면 응답 캐시를 사용)
+
+사용 예시:
+    import coalesce
+
+    messages = build_payload(session, model_info)
+    key = coalesce.make_key(client, model_info, messages)
+    success, response = coalesce.run(key, lambda on_delta, cancel: call_api(on_delta, cancel), on_delta)
+    print(coalesce.get_coalesce_stats())
+"""
+
+import hashlib
+import threading
+import time
+
+from config import ERROR_MESSAGES, REQUEST_DEADLINE
+from response_cache import make_cache_key
+
+
+# 진행 중인 요청: {키: _Flight 또는 _AsyncFlight}
+_flights = {}
+_async_flights = {}
+
+_stats = {
+    "calls": 0,       # 전체 요청 수
+    "upstream": 0,    # 실제로 API를 호출한 요청 수
+    "coalesced": 0    # 다른 요청의 결과를 함께 받은 요청 수
+}
+_lock = threading.Lock()
+
+
+def make_key(client, model_info, messages):
+    """
+    요청 합치기에 사용할 키를 만듭니다.
+    다른 API 키의 요청끼리는 합치지 않습니다.
+
+    Args:
+        client: API 클라이언트 (api_key 속성 사용)
+        model_info: MODELS의 모델 정보 딕셔너리
+        messages: API에 보낼 메시지 리스트 (히스토리가 아니라 build_payload 결과)
+
+    Returns:
+        tuple: (API 키 해시, 요청 해시)
+    """
+    key_hash = hashlib.sha256(client.api_key.encode("utf-8")).hexdigest()
+    return key_hash, make_cache_key(model_info["id"], model_info["max_tokens"], messages)
+
+
+def _count(leader):
+    """요청 수를 기록합니다."""
+    with _lock:
+        _stats["calls"] += 1
+        _stats["upstream" if leader else "coalesced"] += 1
+
+
+def _interrupted_result(error):
+    """요청을 보낸 쪽이 중단되었을 때 함께 기다리던 요청이 받을 결과."""
+    return False, ERROR_MESSAGES["unknown_error"].format(error=f"요청이 중단되었습니다 ({type(error).__name__})")
+
+
+# ============================================================
+# 동기 (스레드)
+# ============================================================
+
+class _Flight:
+    """진행 중인 요청 하나. (스레드용)"""
+
+    __slots__ = ("chunks", "result", "done", "changed", "waiters", "cancel")
+
+    def __init__(self):
+        self.chunks = []     # 지금까지 받은 응답 조각
+        self.result = None   # (성공 여부, 응답 또는 에러 메시지)
+        self.done = False
+        self.changed = threading.Condition(_lock)
+        self.waiters = 0     # 결과를 기다리는 요청 수 (취소로 0이 되면 실제 요청도 취소)
+        self.cancel = None   # 실제 요청의 취소 토큰 (취소할 수 있는 요청이 먼저 온 경우)
+
+
+def run(key, call, on_delta=None, timeout=REQUEST_DEADLINE, cancel=None):
+    """
+    같은 키의 요청이 진행 중이면 그 결과를 기다리고, 없으면 call을 실행합니다.
+
+    cancel을 지정하면 이 요청만 취소할 수 있습니다. 취소한 요청은 바로
+    (False, ERROR_MESSAGES["cancelled"])를 반환하고, 실제 API 요청은
+    기다리는 요청이 하나도 남지 않았을 때만 끊습니다. (run_async와 같은 방식)
+    이를 위해 취소할 수 있는 요청이 먼저 오면 실제 요청은 별도 스레드에서 보냅니다.
+
+    Args:
+        key: make_key()로 만든 키
+        call: 실제 요청 함수. call(on_delta, cancel)을 호출하면 (성공 여부, 응답 또는 에러 메시지)를 반환
+            (on_delta가 None이면 스트리밍하지 않음, cancel은 실제 요청의 CancelToken 또는 None)
+            (먼저 온 요청이 빠진 뒤에도 계속 실행되므로 세션의 deque 대신 복사한 메시지를 사용)
+        on_delta: 응답 조각을 받을 콜백 함수 (기본값: None)
+        timeout: 다른 요청의 결과를 기다리는 최대 시간 (초)
+        cancel: 이 요청을 취소할 chatbot.CancelToken (기본값: None)
+
+    Returns:
+        tuple: (성공 여부, 응답 또는 에러 메시지)
+    """
+    with _lock:
+        flight = _flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = _flights[key] = _Flight()
+        flight.waiters += 1
+    _count(leader)
+
+    if leader and cancel is None:
+        # 끝까지 기다리는 요청이므로 이 스레드에서 직접 보냄
+        return _lead(key, flight, call, on_delta, on_delta is not None)
+
+    if leader:
+        # chatbot이 이 모듈을 불러오므로 순환 import를 피해 여기서 불러옴
+        from chatbot import CancelToken
+
+        flight.cancel = CancelToken()
+        threading.Thread(
+            target=_lead_in_background, args=(key, flight, call, on_delta is not None), daemon=True
+        ).start()
+    return _follow(key, flight, on_delta, timeout, cancel)
+
+
+def _lead(key, flight, call, on_delta, stream):
+    """요청을 직접 보내고, 받은 조각과 결과를 기다리는 요청들에게 전달합니다."""
+
+    def publish(delta):
+        if on_delta is not None:
+            on_delta(delta)
+        with flight.changed:
+            flight.chunks.append(delta)
+            flight.changed.notify_all()
+
+    result = None
+    try:
+        result = call(publish if stream else None, flight.cancel)
+        return result
+    except BaseException as e:
+        result = _interrupted_result(e)
+        raise
+    finally:
+        with flight.changed:
+            flight.result = result
+            flight.done = True
+            if _flights.get(key) is flight:
+                del _flights[key]
+            flight.changed.notify_all()
+
+
+def _lead_in_background(key, flight, call, stream):
+    """별도 스레드에서 요청을 보냅니다. (결과와 예외는 flight.result로 전달)"""
+    try:
+        _lead(key, flight, call, None, stream)
+    except BaseException:
+        pass
+
+
+def _follow(key, flight, on_delta, timeout, cancel=None):
+    """진행 중인 요청의 조각과 결과를 받습니다. 취소하거나 시간이 지나면 혼자 빠집니다."""
+    deadline = time.monotonic() + timeout
+    sent = 0
+
+    def wake():
+        with flight.changed:
+            flight.changed.notify_all()
+
+    # 잠금 밖에서 등록 (이미 취소되었으면 wake가 바로 호출됨)
+    handle = cancel.add_callback(wake) if cancel is not None else None
+    try:
+        while True:
+            with flight.changed:
+                while len(flight.chunks) == sent and not flight.done:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or (cancel is not None and cancel.cancelled):
+                        break
+                    flight.changed.wait(remaining)
+
+                new = flight.chunks[sent:]
+                sent = len(flight.chunks)
+                done = flight.done
+
+            # 화면 출력 등은 잠금 밖에서 (각자의 스레드에서 호출)
+            if new and on_delta is not None:
+                on_delta("".join(new))
+            if done:
+                break
+            if cancel is not None and cancel.cancelled:
+                return _leave(key, flight, ERROR_MESSAGES["cancelled"])
+            if time.monotonic() >= deadline:
+                return _leave(key, flight, ERROR_MESSAGES["timeout"])
+    except BaseException:
+        _leave(key, flight, None)
+        raise
+    finally:
+        if cancel is not None:
+            cancel.remove_callback(handle)
+
+    success, response = flight.result
+    if success and on_delta is not None and sent == 0:
+        on_delta(response)
+    return success, response
+
+
+def _leave(key, flight, message):
+    """
+    결과를 기다리지 않고 빠집니다. 남은 요청이 없으면 실제 요청을 끊습니다.
+
+    Returns:
+        tuple: (False, message)
+    """
+    with _lock:
+        flight.waiters -= 1
+        abort = flight.waiters == 0 and not flight.done
+        # 끊을 요청에 새 요청이 합류하지 않도록 바로 목록에서 뺌
+        if abort and _flights.get(key) is flight:
+            del _flights[key]
+
+    if abort and flight.cancel is not None:
+        flight.cancel.cancel()
+    return False, message
+
+
+# ============================================================
+# 비동기 (asyncio)
+# ============================================================
+
+class _AsyncFlight:
+    """진행 중인 요청 하나. (asyncio용)"""
+
+    __slots__ = ("chunks", "task", "waiters", "changed")
+
+    def __init__(self):
+        import asyncio
+
+        self.chunks = []
+        self.task = None
+        self.waiters = 0
+        self.changed = asyncio.Event()   # 조각이 올 때마다 새 Event로 교체
+
+
+async def run_async(key, call, on_delta=None):
+    """
+    run()의 asyncio 버전입니다.
+
+    요청은 별도 작업으로 실행되어, 기다리던 요청 중 하나가 취소되어도
+    나머지는 계속 결과를 받습니다. (모두 취소되면 요청도 취소)
+
+    Args:
+        key: make_key()로 만든 키
+        call: 실제 요청 코루틴 함수. await call(on_delta) -> (성공 여부, 응답 또는 에러 메시지)
+            (먼저 온 작업이 취소된 뒤에도 계속 실행되므로 세션의 deque 대신 복사한 메시지를 사용)
+        on_delta: 응답 조각을 받을 콜백 함수 (기본값: None)
+
+    Returns:
+        tuple: (성공 여부, 응답 또는 에러 메시지)
+    """
+    # 대화 모드 시작 속도를 위해 asyncio는 필요할 때만 불러옴
+    import asyncio
+
+    flight = _async_flights.get(key)
+    leader = flight is None
+    if leader:
+        flight = _async_flights[key] = _AsyncFlight()
+
+        def publish(delta):
+            flight.chunks.append(delta)
+            changed, flight.changed = flight.changed, asyncio.Event()
+            changed.set()
+
+        flight.task = asyncio.ensure_future(call(publish if on_delta is not None else None))
+
+        def finished(task):
+            if _async_flights.get(key) is flight:
+                del _async_flights[key]
+            flight.changed.set()
+
+        flight.task.add_done_callback(finished)
+    _count(leader)
+
+    flight.waiters += 1
+    sent = 0
+    try:
+        while True:
+            if len(flight.chunks) == sent and not flight.task.done():
+                await flight.changed.wait()
+
+            new = flight.chunks[sent:]
+            sent = len(flight.chunks)
+            if new and on_delta is not None:
+                on_delta("".join(new))
+            if flight.task.done():
+                break
+    except BaseException:
+        # 기다리던 요청이 모두 취소되면 실제 요청도 취소
+        flight.waiters -= 1
+        if flight.waiters == 0:
+            flight.task.cancel()
+        raise
+    flight.waiters -= 1
+
+    if flight.task.cancelled():
+        return _interrupted_result(asyncio.CancelledError())
+    if flight.task.exception() is not None:
+        return _interrupted_result(flight.task.exception())
+
+    success, response = flight.task.result()
+    if success and on_delta is not None and sent == 0:
+        on_delta(response)
+    return success, response
+
+
+def get_coalesce_stats():
+    """
+    요청 합치기 통계를 반환합니다.
+
+    Returns:
+        dict: {calls, upstream, coalesced,
+               coalesce_ratio (전체 요청 중 다른 요청의 결과를 함께 받은 비율)}
+
+    사용 예시:
+        stats = coalesce.get_coalesce_stats()
+        print(f"합친 요청: {stats['coalesced']}개 ({stats['coalesce_ratio']:.0%})")
+    """
+    with _lock:
+        stats = dict(_stats)
+    stats["coalesce_ratio"] = stats["coalesced"] / stats["calls"] if stats["calls"] else 0.0
+    return stats
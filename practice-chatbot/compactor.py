@@ -0,0 +1,286 @@
+"""
+히스토리 요약(compaction) 모듈
+
+대화가 길어지면 매 요청마다 전체 히스토리를 다시 보내므로 입력 토큰과 지연 시간이 늘어납니다.
+히스토리가 COMPACTION_TRIGGER_TOKENS를 넘으면 최근 COMPACTION_KEEP_RECENT개를 제외한
+오래된 메시지를 저렴한 모델(COMPACTION_MODEL)로 요약하여 시스템 메시지 하나로 바꿉니다.
+
+- 요약은 백그라운드 스레드에서 실행되므로 응답을 기다리게 하지 않습니다.
+  결과는 다음 메시지를 보낼 때(chatbot._begin_turn) 세션에 반영됩니다.
+- 이미 요약이 있으면 "기존 요약 + 새로 밀려난 메시지"만 보내 요약을 갱신합니다. (증분 요약)
+- 같은 내용의 요약 요청은 캐시(메모리 + 응답 캐시가 켜져 있으면 디스크)에서 재사용합니다.
+- 효과는 get_compaction_stats()와 telemetry의 prompt_tokens로 확인할 수 있습니다.
+  (benchmarks/bench_compaction.py 참고)
+
+요약은 메모리의 세션에만 반영되며, 세션 저장소에는 원래 메시지가 그대로 남습니다.
+
+사용 예시:
+    import compactor
+
+    compactor.maybe_compact(client, session)   # 응답을 받은 뒤 호출
+    compactor.apply_compaction(session)        # 다음 요청 전에 호출
+    print(compactor.get_compaction_stats())
+"""
+
+import threading
+from collections import OrderedDict
+from itertools import islice
+
+import telemetry
+from config import (
+    API_TIMEOUT,
+    MODELS,
+    COMPACTION_ENABLED,
+    COMPACTION_MODEL,
+    COMPACTION_TRIGGER_TOKENS,
+    COMPACTION_KEEP_RECENT,
+    COMPACTION_MAX_TOKENS,
+    COMPACTION_CACHE_SIZE
+)
+from response_cache import get_response_cache, make_cache_key
+
+
+# 요약 시스템 메시지의 머리말 (요약 메시지인지 구분하는 데도 사용)
+SUMMARY_PREFIX = "[이전 대화 요약]"
+
+SUMMARY_INSTRUCTION = (
+    "당신은 대화 요약기입니다. 아래 대화를 이후 대화를 이어가는 데 필요한 내용만 남겨 "
+    "간결하게 요약하세요. 사용자에 대한 사실과 선호, 결정된 사항, 중요한 수치와 이름, "
+    "아직 해결되지 않은 질문을 빠뜨리지 마세요. "
+    "기존 요약이 있으면 새 대화 내용과 합쳐 하나의 요약으로 갱신하세요. "
+    "요약문만 출력하세요."
+)
+
+# 요약 결과 캐시: {캐시 키: 요약문}
+_summary_cache = OrderedDict()
+
+_stats = {
+    "compactions": 0,          # 세션에 반영한 요약 수
+    "messages_compacted": 0,   # 요약으로 대체한 메시지 수
+    "tokens_before": 0,        # 대체한 메시지들의 추정 토큰 합계
+    "tokens_after": 0,         # 대신 들어간 요약 메시지의 추정 토큰 합계
+    "cache_hits": 0,
+    "failures": 0
+}
+_lock = threading.Lock()
+
+
+class _CompactionJob:
+    """세션 하나의 백그라운드 요약 작업."""
+
+    __slots__ = ("messages", "summary", "done")
+
+    def __init__(self, messages):
+        self.messages = messages
+        self.summary = None
+        self.done = threading.Event()
+
+
+def is_summary(message):
+    """
+    요약으로 만들어진 시스템 메시지인지 확인합니다.
+
+    Args:
+        message: 확인할 메시지
+
+    Returns:
+        bool: 요약 메시지이면 True
+    """
+    return message["role"] == "system" and message["content"].startswith(SUMMARY_PREFIX)
+
+
+def build_summary_request(messages):
+    """
+    요약 모델에 보낼 메시지 목록을 만듭니다.
+
+    Args:
+        messages: 요약할 메시지들 (맨 앞은 기존 요약일 수 있음)
+
+    Returns:
+        list: API에 보낼 메시지 딕셔너리 목록
+    """
+    lines = []
+    for message in messages:
+        if is_summary(message):
+            lines.append("[기존 요약]")
+            lines.append(message["content"][len(SUMMARY_PREFIX):].strip())
+            lines.append("")
+            lines.append("[새 대화]")
+        else:
+            lines.append(f"{message['role']}: {message['content']}")
+
+    return [
+        {"role": "system", "content": SUMMARY_INSTRUCTION},
+        {"role": "user", "content": "\n".join(lines)}
+    ]
+
+
+def summarize(client, messages):
+    """
+    메시지들을 요약합니다. 캐시에 있으면 API를 호출하지 않습니다.
+
+    Args:
+        client: OpenRouter API 클라이언트 (동기)
+        messages: 요약할 메시지들
+
+    Returns:
+        str: 요약문
+    """
+    model_info = MODELS[COMPACTION_MODEL]
+    request = build_summary_request(messages)
+    cache_key = make_cache_key(model_info["id"], COMPACTION_MAX_TOKENS, request)
+
+    with _lock:
+        summary = _summary_cache.get(cache_key)
+        if summary is not None:
+            _summary_cache.move_to_end(cache_key)
+
+    disk_cache = get_response_cache()
+    if summary is None and disk_cache is not None:
+        summary = disk_cache.get(cache_key)
+
+    if summary is not None:
+        with _lock:
+            _stats["cache_hits"] += 1
+    else:
+        timer = telemetry.start_request(model_info["id"])
+        timer.extra["purpose"] = "compaction"
+        try:
+            response = client.chat.completions.create(
+                model=model_info["id"],
+                max_tokens=COMPACTION_MAX_TOKENS,
+                messages=request,
+                timeout=API_TIMEOUT
+            )
+        except Exception as e:
+            timer.finish(error=e)
+            raise
+        timer.finish(usage=response.usage)
+
+        summary = (response.choices[0].message.content or "").strip()
+        if disk_cache is not None and summary:
+            disk_cache.put(cache_key, summary)
+
+    with _lock:
+        _summary_cache[cache_key] = summary
+        _summary_cache.move_to_end(cache_key)
+        while len(_summary_cache) > COMPACTION_CACHE_SIZE:
+            _summary_cache.popitem(last=False)
+
+    return summary
+
+
+def maybe_compact(client, session, enabled=None):
+    """
+    히스토리가 길면 오래된 메시지의 요약을 백그라운드에서 시작합니다.
+    이미 요약 중이거나 요약할 만큼 길지 않으면 아무것도 하지 않습니다.
+
+    Args:
+        client: OpenRouter API 클라이언트 (동기)
+        session: 대화 세션
+        enabled: 요약 사용 여부 (기본값: COMPACTION_ENABLED)
+
+    Returns:
+        bool: 요약을 시작했으면 True
+    """
+    if enabled is None:
+        enabled = COMPACTION_ENABLED
+    if not enabled or session.compaction is not None:
+        return False
+    if session.history_tokens <= COMPACTION_TRIGGER_TOKENS:
+        return False
+
+    # 최근 메시지는 그대로 두고, 그 앞의 메시지만 요약
+    count = len(session) - COMPACTION_KEEP_RECENT
+    messages = tuple(islice(session.payload(), max(0, count)))
+
+    # 기존 요약 하나만 있거나 새로 요약할 메시지가 너무 적으면 건너뜀
+    if sum(1 for message in messages if not is_summary(message)) < 2:
+        return False
+
+    job = _CompactionJob(messages)
+    session.compaction = job
+
+    def run():
+        try:
+            job.summary = summarize(client, messages)
+        except Exception:
+            # 요약 실패는 대화에 영향을 주지 않음 (다음 응답 후 다시 시도)
+            with _lock:
+                _stats["failures"] += 1
+        finally:
+            job.done.set()
+
+    threading.Thread(target=run, daemon=True).start()
+    return True
+
+
+def apply_compaction(session):
+    """
+    끝난 요약 작업이 있으면 세션에 반영합니다.
+    요약하는 동안 히스토리가 바뀌었으면(초기화, 삭제 등) 버립니다.
+    세션을 사용하는 스레드에서 호출해야 합니다.
+
+    Args:
+        session: 대화 세션
+
+    Returns:
+        bool: 요약을 반영했으면 True
+    """
+    job = session.compaction
+    if job is None or not job.done.is_set():
+        return False
+
+    session.compaction = None
+    if not job.summary:
+        return False
+
+    content = f"{SUMMARY_PREFIX}\n{job.summary}"
+    tokens_before = sum(message.tokens for message in job.messages)
+    message = session.replace_oldest(job.messages, "system", content)
+    if message is None:
+        return False
+
+    with _lock:
+        _stats["compactions"] += 1
+        _stats["messages_compacted"] += len(job.messages)
+        _stats["tokens_before"] += tokens_before
+        _stats["tokens_after"] += message.tokens
+
+    return True
+
+
+def wait_for_compaction(session, timeout=None):
+    """
+    진행 중인 요약 작업이 끝날 때까지 기다린 뒤 세션에 반영합니다.
+    (벤치마크 등 결과를 바로 확인해야 할 때 사용)
+
+    Args:
+        session: 대화 세션
+        timeout: 최대 대기 시간 (초)
+
+    Returns:
+        bool: 요약을 반영했으면 True
+    """
+    job = session.compaction
+    if job is not None:
+        job.done.wait(timeout)
+    return apply_compaction(session)
+
+
+def get_compaction_stats():
+    """
+    요약 통계를 반환합니다.
+
+    Returns:
+        dict: {compactions, messages_compacted, tokens_before, tokens_after,
+               tokens_saved, cache_hits, failures}
+
+    사용 예시:
+        stats = compactor.get_compaction_stats()
+        print(f"요약으로 줄인 토큰: {stats['tokens_saved']}")
+    """
+    with _lock:
+        stats = dict(_stats)
+    stats["tokens_saved"] = stats["tokens_before"] - stats["tokens_after"]
+    return stats
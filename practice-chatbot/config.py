@@ -25,13 +25,140 @@ load_dotenv(override=True)
 # ============================================================
 
 # OpenRouter API 기본 URL
-API_BASE_URL = "https://openrouter.ai/api/v1"
+# (벤치마크 등에서 가짜 서버를 쓸 때는 OPENROUTER_BASE_URL 환경변수로 변경)
+API_BASE_URL = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
 
 # API 요청 타임아웃 (초)
 API_TIMEOUT = 30
 
 # 대화 히스토리 최대 메시지 수
-MAX_HISTORY_LENGTH = 20
+# (실제 히스토리 길이는 모델별 토큰 예산으로 정해지며, 이 값은 메모리 보호용 상한)
+MAX_HISTORY_LENGTH = 200
+
+# 응답 캐시 설정 (같은 모델 + 같은 대화 내용이면 저장된 응답 재사용)
+RESPONSE_CACHE_ENABLED = False                         # 기본값은 꺼짐
+RESPONSE_CACHE_PATH = ".cache/responses.sqlite3"       # 디스크 캐시 파일
+RESPONSE_CACHE_TTL = 24 * 60 * 60                      # 유효 시간 (초)
+RESPONSE_CACHE_MEMORY_SIZE = 256                       # 메모리 LRU 최대 항목 수
+RESPONSE_CACHE_MAX_ENTRIES = 10000                     # 디스크 최대 항목 수
+
+# 세션 저장소 설정 (대화를 디스크에 저장하여 재시작 후에도 이어서 대화)
+SESSION_STORE_ENABLED = False          # Streamlit 앱에서 사용할지 여부
+SESSION_STORE_DIR = ".cache/sessions"  # 세션 파일 저장 폴더
+SESSION_STORE_FSYNC_INTERVAL = 1.0     # 디스크 동기화 주기 (초)
+SESSION_STORE_MAX_OPEN_FILES = 64      # 동시에 열어둘 세션 파일 수
+
+# 지난 대화 보관 (히스토리에서 밀려난 메시지를 압축해 보관하고 /search로 검색)
+ARCHIVE_ENABLED = False                 # 기본값은 꺼짐 (콘솔은 --archive로 켤 수 있음)
+ARCHIVE_DIR = ".cache/archive"          # 저장하는 세션의 보관 파일 폴더 (나머지는 임시 폴더)
+ARCHIVE_BLOCK_MESSAGES = 16             # 한 블록으로 묶어 압축할 메시지 수
+ARCHIVE_SEARCH_LIMIT = 10               # 검색 결과 최대 개수
+
+# 관련 대화 검색 (긴 대화에서 최근 메시지 + 질문과 관련 있는 이전 대화만 보내 프롬프트 크기 절약)
+# 켜면 요청마다 앞부분이 바뀌므로 제공자 쪽 프롬프트 캐시는 적중하기 어려움
+RETRIEVAL_ENABLED = False               # 기본값은 꺼짐 (콘솔은 --retrieval로 켤 수 있음)
+RETRIEVAL_RECENT_MESSAGES = 6           # 항상 보내는 최근 메시지 수
+RETRIEVAL_TOP_K = 4                     # 함께 보낼 관련 이전 대화(질문-응답) 최대 수
+RETRIEVAL_TOKEN_BUDGET = 1500           # 관련 이전 대화에 쓸 최대 추정 토큰 수
+RETRIEVAL_BM25_K1 = 1.2                 # BM25 단어 빈도 포화 정도
+RETRIEVAL_BM25_B = 0.75                 # BM25 문서 길이 보정 정도
+
+# 성능 통계(/stats)에 사용할 모델별 최근 요청 수
+TELEMETRY_WINDOW = 500
+
+# 토큰 수 추정 시 메시지 하나당 추가되는 구조 오버헤드 (role 등)
+TOKEN_OVERHEAD_PER_MESSAGE = 4
+
+# 토큰 수는 추정치이므로 컨텍스트 길이의 일부만 히스토리에 사용
+HISTORY_TOKEN_SAFETY_RATIO = 0.9
+
+# 히스토리 정리 방식
+# - "sliding": 한도를 넘을 때마다 가장 오래된 메시지를 하나씩 삭제
+# - "chunked": 한도를 넘으면 한도의 HISTORY_TRIM_TARGET_RATIO까지 한 번에 삭제
+#   (다음 정리 전까지 앞부분이 그대로 유지되어 제공자 쪽 프롬프트 캐시가 적중)
+HISTORY_TRIM_MODE = "chunked"
+HISTORY_TRIM_TARGET_RATIO = 0.75
+
+# 프롬프트 캐시 지점(cache_control)을 표시할 최소 히스토리 토큰 수
+# (Anthropic은 1024토큰 미만의 프롬프트는 캐시하지 않음)
+PROMPT_CACHE_MIN_TOKENS = 1024
+
+# 공유 HTTP 연결 풀 설정 (여러 대화가 하나의 풀을 나눠 씀)
+HTTP_POOL_MAX_CONNECTIONS = 100   # 최대 동시 연결 수
+HTTP_POOL_MAX_KEEPALIVE = 20      # 유지할 유휴(keep-alive) 연결 수
+HTTP_KEEPALIVE_EXPIRY = 30        # 유휴 연결 유지 시간 (초)
+HTTP2_ENABLED = False             # HTTP/2 사용 여부 (h2 패키지 필요)
+
+# 시작할 때 API 서버 연결을 미리 열어 둠 (첫 메시지의 DNS 조회, TCP/TLS 핸드셰이크 시간 제거)
+HTTP_PREWARM_ENABLED = True
+HTTP_PREWARM_CONNECTIONS = 2      # 미리 열어 둘 연결 수 (HTTP/2면 1개만 엶)
+HTTP_PREWARM_TIMEOUT = 5          # 연결을 여는 최대 시간 (초)
+
+# API 키 검증 결과 캐시 유지 시간 (초)
+VALIDATION_CACHE_TTL = 600           # 유효한 키
+VALIDATION_NEGATIVE_CACHE_TTL = 60   # 잘못된 키 (401)
+
+# 일시적인 오류(429, 5xx, 네트워크) 재시도 설정
+RETRY_MAX_ATTEMPTS = 4    # 첫 시도를 포함한 최대 시도 횟수
+RETRY_BASE_DELAY = 0.5    # 첫 재시도 전 최대 대기 시간 (초, 이후 2배씩 증가)
+RETRY_MAX_DELAY = 8       # 재시도 사이 최대 대기 시간 (초, Retry-After는 예외)
+REQUEST_DEADLINE = 60     # 재시도와 대기를 포함한 메시지 하나의 전체 제한 시간 (초)
+
+# 경쟁(race) 모드: 주 모델의 첫 토큰이 늦으면 다른 모델에도 같은 요청을 보냄
+RACE_HEDGE_DELAY = 2.0                          # 보조 요청을 보내기 전 기다릴 시간 (초)
+RACE_HEDGE_MODELS = ["gpt", "gemini", "claude"]  # 보조 요청에 사용할 모델 (우선순위 순)
+RACE_MAX_HEDGES = 1                             # 요청 하나당 최대 보조 요청 수
+
+# 자동 선택(auto) 모델 설정
+ROUTER_EWMA_ALPHA = 0.2          # 최근 요청 반영 비율 (클수록 최근 결과에 민감)
+ROUTER_EXPLORATION_RATE = 0.05   # 다른 모델의 상태를 확인하기 위해 무작위로 고르는 비율
+ROUTER_MIN_SAMPLES = 3           # 이보다 기록이 적은 모델은 먼저 사용해 봄
+ROUTER_ERROR_PENALTY = 10        # 에러율 1.0일 때 지연 시간에 곱할 벌점 (1 + 벌점 x 에러율)
+
+# 히스토리 요약(compaction): 대화가 길어지면 오래된 메시지를 저렴한 모델로 요약하여
+# 시스템 메시지 하나로 바꿈 (요청마다 보내는 입력 토큰 감소)
+COMPACTION_ENABLED = False        # 기본값은 꺼짐
+COMPACTION_MODEL = "gpt"          # 요약에 사용할 모델 (MODELS의 이름)
+COMPACTION_TRIGGER_TOKENS = 4000  # 히스토리가 이 토큰 수를 넘으면 요약
+COMPACTION_KEEP_RECENT = 6        # 요약하지 않고 그대로 둘 최근 메시지 수
+COMPACTION_MAX_TOKENS = 512       # 요약문 최대 토큰 수
+COMPACTION_CACHE_SIZE = 128       # 메모리에 보관할 요약 결과 수
+
+# 같은 요청 합치기: 같은 모델, 같은 대화 내용의 요청이 동시에 진행 중이면
+# API를 한 번만 호출하고 결과를 나눠 받음 (coalesce.py 참고)
+COALESCE_ENABLED = True
+
+# 모델별 초당 요청 수 제한 (없는 모델은 제한하지 않음)
+# 예시: {"gpt": 5, "claude": 2}
+MODEL_RATE_LIMITS = {}
+
+# 모델 카탈로그(/models 응답) 디스크 캐시
+# API 키를 검증할 때 받은 카탈로그로 MODELS의 컨텍스트 길이, 최대 출력, 가격을 채움
+MODEL_CATALOG_ENABLED = True
+MODEL_CATALOG_PATH = ".cache/models.json"
+MODEL_CATALOG_TTL = 24 * 60 * 60   # 이 시간 안에는 ETag로 변경 여부만 확인 (초)
+
+# 일괄 처리(--batch) 기본 동시 요청 수
+BATCH_CONCURRENCY = 8
+
+# HTTP 서버 모드(chat_server.py) 설정
+SERVER_HOST = "127.0.0.1"
+SERVER_PORT = 8080
+SERVER_MAX_SESSIONS = 1000           # 메모리에 유지할 최대 세션 수 (넘으면 오래 안 쓴 세션부터 삭제)
+SERVER_SESSION_IDLE_TTL = 30 * 60    # 이 시간 동안 사용하지 않은 세션은 삭제 (초)
+SERVER_MAX_CONCURRENT_TURNS = 32     # 동시에 AI에게 보내는 최대 요청 수
+SERVER_MAX_QUEUED_TURNS = 256        # 차례를 기다릴 수 있는 최대 요청 수 (넘으면 503)
+SERVER_MAX_BODY_BYTES = 64 * 1024    # 요청 본문 최대 크기 (바이트)
+SERVER_REQUEST_TIMEOUT = 30          # 요청 헤더/본문을 받는 제한 시간 (초, 유휴 연결 포함)
+SERVER_SHUTDOWN_TIMEOUT = 30         # 종료 시 진행 중인 응답을 기다리는 최대 시간 (초)
+
+# Streamlit 앱에서 한 번에 표시할 메시지 수
+# (이전 메시지는 "Show earlier" 버튼으로 이만큼씩 더 불러옴)
+CHAT_PAGE_SIZE = 20
+
+# Streamlit 앱에서 응답 생성 중 화면을 갱신하는 간격 (초)
+# (갱신할 때마다 중지 버튼 입력을 확인하므로, 응답 조각이 오지 않는 동안에도 이 간격으로 확인)
+CHAT_RENDER_INTERVAL = 0.1
 
 
 # ============================================================
@@ -41,26 +168,42 @@ MAX_HISTORY_LENGTH = 20
 # 모델 정보 딕셔너리
 # - id: OpenRouter에서 사용하는 모델 ID
 # - name: 사용자에게 표시할 이름
-# - max_tokens: 최대 출력 토큰 수
+# - max_tokens: 최대 출력 토큰 수 (요청마다 보내는 값)
+# - context_length: 컨텍스트 길이 (입력 + 출력 토큰 수)
+#   (모델 카탈로그를 받으면 실제 값으로 갱신되고, max_output, prompt_price,
+#    completion_price(토큰당 USD)가 추가됨 - model_catalog.py 참고)
 # - description: 모델 설명
+# - prompt_cache: True면 요청에 프롬프트 캐시 지점(cache_control)을 표시 (선택)
+# - router: True면 실제 모델이 아닌 자동 선택 항목 (router.py가 요청마다 모델을 고름)
 MODELS = {
     "gemini": {
         "id": "google/gemini-3-flash-preview",
         "name": "Gemini 3.0 Flash Preview",
         "max_tokens": 8192,
+        "context_length": 1048576,
         "description": "Google의 최신 Gemini 3.0 모델 (빠르고 강력)"
     },
     "claude": {
         "id": "anthropic/claude-3.5-sonnet",
         "name": "Claude 3.5 Sonnet",
         "max_tokens": 4096,
+        "context_length": 200000,
+        "prompt_cache": True,
         "description": "Anthropic의 강력한 AI 모델, 긴 대화에 적합"
     },
     "gpt": {
         "id": "openai/gpt-4o-mini",
         "name": "GPT-4o Mini",
         "max_tokens": 4096,
+        "context_length": 128000,
         "description": "OpenAI의 빠르고 저렴한 모델"
+    },
+    # 실제 모델이 아니라, 요청마다 최근 응답 속도와 에러율이 가장 좋은 모델을 고름
+    "auto": {
+        "id": None,
+        "name": "자동 선택 (Auto)",
+        "router": True,
+        "description": "최근 응답 속도와 에러율을 보고 가장 좋은 모델을 자동으로 선택"
     }
 }
 
@@ -96,8 +239,16 @@ API 키가 설정되지 않았습니다.
 
     # 입력 관련
     "empty_input": "메시지를 입력해주세요.",
+    "cancelled": "응답 생성을 취소했습니다.",
     "invalid_model": "존재하지 않는 모델입니다. 사용 가능한 모델: {models}",
 
+    # HTTP 서버 모드 관련
+    "bad_request": "잘못된 요청입니다: {error}",
+    "session_not_found": "세션을 찾을 수 없습니다. (만료되었거나 삭제됨)",
+    "session_busy": "이 세션은 이전 메시지에 대한 응답을 생성 중입니다.",
+    "server_busy": "요청이 너무 많습니다. 잠시 후 다시 시도해주세요.",
+    "server_shutting_down": "서버가 종료 중입니다.",
+
     # 일반 오류
     "unknown_error": "알 수 없는 오류가 발생했습니다: {error}"
 }
@@ -157,3 +308,31 @@ def get_model_list():
     for key, info in MODELS.items():
         items.append(f"{key} ({info['name']})")
     return ", ".join(items)
+
+
+def get_history_token_budget(model_name):
+    """
+    모델의 대화 히스토리에 사용할 수 있는 토큰 예산을 계산합니다.
+    컨텍스트 길이에서 출력용 max_tokens를 뺀 값에 여유 비율을 적용합니다.
+
+    Args:
+        model_name: 모델 이름 (예: "claude", "gpt", "gemini")
+
+    Returns:
+        int: 히스토리 토큰 예산
+
+    사용 예시:
+        budget = get_history_token_budget("gpt")
+        # (128000 - 4096) * 0.9 = 111513
+    """
+    model = MODELS.get(model_name.lower(), MODELS[DEFAULT_MODEL])
+
+    # 자동 선택은 가장 큰 예산을 사용 (요청마다 히스토리가 들어가는 모델만 고름)
+    if model.get("router"):
+        return max(
+            get_history_token_budget(name)
+            for name, info in MODELS.items() if not info.get("router")
+        )
+
+    available = model["context_length"] - model["max_tokens"]
+    return int(available * HISTORY_TOKEN_SAFETY_RATIO)
@@ -5,31 +5,56 @@
 
 실행 방법:
     python console_app.py
+    python console_app.py --session my-chat   # 대화를 저장하고 다음 실행 때 이어서 대화
+    python console_app.py --race              # 응답이 늦으면 다른 모델에도 동시에 요청
+    python console_app.py --retrieval         # 최근 대화 + 관련 있는 이전 대화만 보내기
+    python console_app.py --archive           # 밀려난 지난 대화도 보관하여 /search로 검색
+    python console_app.py --batch prompts.jsonl --concurrency 16 --rate-limit gpt=5
+                                              # JSONL 파일의 프롬프트를 일괄 처리
 
 명령어:
     /help     - 도움말 표시
     /models   - 사용 가능한 모델 목록
     /model X  - 모델 변경 (예: /model claude)
     /clear    - 대화 초기화
+    /stats    - 모델별 응답 속도 통계
+    /search X - 지난 대화 검색 (예: /search 파이썬 리스트)
     /quit     - 종료 (또는 'quit', 'exit', '종료')
 """
 
+import argparse
+import threading
+import time
+
 from config import (
     get_api_key,
     MODELS,
     DEFAULT_MODEL,
     ERROR_MESSAGES,
+    BATCH_CONCURRENCY,
     get_model_list
 )
 from chatbot import (
+    CancelToken,
     create_client,
+    start_warm_up,
     validate_api_key,
     create_session,
     send_message,
+    send_message_race,
     switch_model,
     clear_session,
+    search_history,
     get_current_model_name
 )
+from session_store import get_session_store
+from turn_archive import make_snippet
+import coalesce
+import compactor
+import context_builder
+import model_catalog
+import router
+import telemetry
 
 
 def print_welcome():
@@ -60,8 +85,13 @@ def print_help():
     print("    /models   - 사용 가능한 모델 목록")
     print("    /model X  - 모델 변경 (예: /model claude)")
     print("    /clear    - 대화 초기화")
+    print("    /stats    - 모델별 응답 속도 통계")
+    print("    /search X - 지난 대화 검색 (예: /search 파이썬 리스트)")
     print("    /quit     - 종료")
     print()
+    print("  응답 취소:")
+    print("    응답을 기다리는 중에 Ctrl+C")
+    print()
     print("  종료:")
     print("    'quit', 'exit', '종료' 입력")
     print()
@@ -87,6 +117,11 @@ def print_models(current_model):
         print(f"  {key}{marker}")
         print(f"    - 이름: {info['name']}")
         print(f"    - 설명: {info['description']}")
+        if info.get("max_output"):
+            print(f"    - 한도: 컨텍스트 {info['context_length']:,} 토큰 / 최대 출력 {info['max_output']:,} 토큰")
+        if info.get("prompt_price") is not None and info.get("completion_price") is not None:
+            print(f"    - 가격: 입력 ${info['prompt_price'] * 1e6:,.2f} / 출력 ${info['completion_price'] * 1e6:,.2f}"
+                  f" (100만 토큰당)")
         print()
 
     print("  사용법: /model 모델이름")
@@ -95,13 +130,104 @@ def print_models(current_model):
     print("-" * 50)
 
 
+def format_ms(value):
+    """밀리초 값을 표시용 문자열로 변환합니다. (값이 없으면 '-')"""
+    if value is None:
+        return "-"
+    return f"{value:,.0f}ms"
+
+
+def print_stats():
+    """
+    모델별 최근 요청 통계(지연 시간, 토큰, 에러율)를 출력합니다.
+    """
+    stats = telemetry.get_stats()
+
+    print()
+    print("=" * 50)
+    print("  응답 속도 통계")
+    print("=" * 50)
+    print()
+
+    if not stats:
+        print("  아직 기록된 요청이 없습니다.")
+        print()
+        print("-" * 50)
+        return
+
+    # 모델 ID를 사용자에게 익숙한 이름으로 표시
+    names = {info["id"]: info["name"] for info in MODELS.values()}
+
+    for model_id, model_stats in stats.items():
+        ttft = model_stats["ttft_ms"]
+        total = model_stats["total_ms"]
+        speed = model_stats["tokens_per_s"]
+
+        print(f"  {names.get(model_id, model_id)}")
+        print(f"    - 요청: {model_stats['requests']}회 (에러율 {model_stats['error_rate']:.0%})")
+        print(f"    - 첫 토큰: p50 {format_ms(ttft['p50'])} / p95 {format_ms(ttft['p95'])} / p99 {format_ms(ttft['p99'])}")
+        print(f"    - 전체 응답: p50 {format_ms(total['p50'])} / p95 {format_ms(total['p95'])} / p99 {format_ms(total['p99'])}")
+        print(f"    - 토큰: 입력 {model_stats['prompt_tokens']:,} / 출력 {model_stats['completion_tokens']:,}"
+              + (f" ({speed:,.1f} 토큰/초)" if speed else ""))
+        if model_stats["cached_tokens"]:
+            print(f"    - 프롬프트 캐시: {model_stats['cached_tokens']:,} 토큰"
+                  f" (입력의 {model_stats['cache_hit_ratio']:.0%})")
+        cost = model_catalog.estimate_cost(
+            model_id, model_stats["prompt_tokens"], model_stats["completion_tokens"]
+        )
+        if cost is not None:
+            print(f"    - 예상 비용: ${cost:,.4f}")
+        print()
+
+    routes = {name: state for name, state in router.get_router_stats().items() if state["routed"]}
+    if routes:
+        print("  자동 선택(auto)")
+        for name, state in routes.items():
+            print(f"    - {MODELS[name]['name']}: {state['routed']}회 선택"
+                  f" (지연 {format_ms(state['latency_ms'])}, 에러율 {state['error_rate']:.0%})")
+        print()
+
+    compaction = compactor.get_compaction_stats()
+    if compaction["compactions"]:
+        print("  히스토리 요약")
+        print(f"    - 요약: {compaction['compactions']}회 (메시지 {compaction['messages_compacted']}개)")
+        print(f"    - 줄인 입력 토큰: 약 {compaction['tokens_saved']:,}개/요청")
+        print()
+
+    coalesced = coalesce.get_coalesce_stats()
+    if coalesced["coalesced"]:
+        print("  요청 합치기")
+        print(f"    - 같은 요청 {coalesced['coalesced']}회를 진행 중인 요청과 합침"
+              f" (전체의 {coalesced['coalesce_ratio']:.0%}, API 호출 {coalesced['upstream']}회)")
+        print()
+
+    context = context_builder.get_context_stats()
+    if context["requests"]:
+        print("  관련 대화 검색")
+        print(f"    - 요청: {context['requests']}회 / 함께 보낸 이전 대화: {context['retrieved_turns']}개")
+        print(f"    - 프롬프트: {context['sent_tokens']:,} 토큰 (히스토리 전체 {context['window_tokens']:,} 토큰,"
+              f" {context['saved_ratio']:.0%} 절약)")
+        print()
+
+    race = telemetry.get_race_stats()
+    if race["races"]:
+        print("  경쟁(race) 모드")
+        print(f"    - 요청: {race['races']}회 / 보조 요청: {race['hedged']}회 ({race['hedge_rate']:.0%})")
+        print(f"    - 보조 모델 승률: {race['hedge_win_rate']:.0%} / 모두 실패: {race['failures']}회")
+        for model_id, wins in race["wins"].items():
+            print(f"    - {names.get(model_id, model_id)}: {wins}회 채택")
+        print()
+
+    print("-" * 50)
+
+
 def handle_command(command, session):
     """
     슬래시 명령어를 처리합니다.
 
     Args:
         command: 사용자가 입력한 명령어 (예: "/model claude")
-        session: 대화 세션 딕셔너리
+        session: 대화 세션
 
     Returns:
         bool: 프로그램 종료 여부 (True면 종료)
@@ -154,6 +280,23 @@ def handle_command(command, session):
         print()
         return False
 
+    # /stats - 응답 속도 통계
+    if cmd == "/stats":
+        print_stats()
+        return False
+
+    # /search - 지난 대화 검색
+    if cmd == "/search":
+        if len(parts) < 2:
+            print()
+            print("[알림] 검색어를 입력해주세요.")
+            print("예시: /search 파이썬 리스트")
+            print()
+            return False
+
+        print_search_results(session, " ".join(parts[1:]))
+        return False
+
     # 알 수 없는 명령어
     print()
     print(f"[알림] 알 수 없는 명령어: {cmd}")
@@ -162,35 +305,338 @@ def handle_command(command, session):
     return False
 
 
-def main():
+def print_search_results(session, query):
+    """
+    현재 대화와 보관한 지난 대화에서 검색어를 찾아 출력합니다.
+
+    Args:
+        session: 대화 세션
+        query: 검색어
+    """
+    started = time.perf_counter()
+    hits = search_history(session, query)
+    elapsed = time.perf_counter() - started
+
+    print()
+    print(f"[검색] '{query}' - {len(hits)}건 ({elapsed * 1000:.1f}ms)")
+    for hit in hits:
+        speaker = "나" if hit["role"] == "user" else "AI"
+        when = "현재 대화" if hit["archived_at"] is None else time.strftime(
+            "%m-%d %H:%M", time.localtime(hit["archived_at"])
+        )
+        print(f"  [{when}] {speaker}: {make_snippet(hit['content'], query)}")
+    print()
+
+
+def make_delta_printer():
+    """
+    스트리밍 응답 조각을 즉시 출력하는 콜백을 만듭니다.
+
+    Returns:
+        tuple: (콜백 함수, 출력 시작 여부를 확인하는 함수)
+    """
+    state = {"started": False}
+
+    def print_delta(delta):
+        # 첫 조각이 도착했을 때만 "AI: " 머리말 출력
+        if not state["started"]:
+            state["started"] = True
+            print()
+            print("AI: ", end="")
+        print(delta, end="", flush=True)
+
+    def has_started():
+        return state["started"]
+
+    return print_delta, has_started
+
+
+def send_cancellable(send, client, session, user_input, on_delta=None):
+    """
+    메시지 전송을 작업 스레드에서 실행하고, 기다리는 동안 Ctrl+C를 누르면 취소합니다.
+    취소하면 응답을 받던 연결을 끊고 사용자 메시지를 롤백한 뒤 돌아옵니다.
+    (취소 처리를 기다리는 중에 Ctrl+C를 한 번 더 누르면 프로그램을 종료)
+
+    Args:
+        send: send_message 또는 send_message_race
+        client: OpenRouter API 클라이언트
+        session: 대화 세션
+        user_input: 사용자가 입력한 메시지
+        on_delta: 응답 조각을 받을 콜백 함수 (작업 스레드에서 호출됨)
+
+    Returns:
+        tuple: (성공 여부, 응답 또는 에러 메시지, 취소 여부)
+    """
+    cancel = CancelToken()
+    outcome = {}
+    done = threading.Event()
+
+    def run():
+        try:
+            outcome["result"] = send(client, session, user_input, on_delta=on_delta, cancel=cancel)
+        except Exception as e:
+            outcome["error"] = e
+        finally:
+            done.set()
+
+    # Thread.join()은 Ctrl+C로 중단되면 스레드가 끝난 것으로 잘못 표시될 수 있으므로 Event로 기다림
+    threading.Thread(target=run, daemon=True).start()
+    try:
+        done.wait()
+    except KeyboardInterrupt:
+        cancel.cancel()
+        done.wait()
+
+    if "error" in outcome:
+        raise outcome["error"]
+    success, response = outcome["result"]
+    return success, response, cancel.cancelled and not success
+
+
+def parse_args(argv=None):
+    """
+    명령줄 인자를 해석합니다.
+
+    Args:
+        argv: 인자 리스트 (기본값: None, sys.argv 사용)
+
+    Returns:
+        argparse.Namespace: 해석된 인자
+    """
+    parser = argparse.ArgumentParser(description="콘솔 AI 챗봇")
+    parser.add_argument(
+        "--session",
+        metavar="ID",
+        help="대화를 디스크에 저장할 세션 ID (같은 ID로 실행하면 이어서 대화)"
+    )
+    parser.add_argument(
+        "--race",
+        action="store_true",
+        help="첫 응답이 늦으면 다른 모델에도 같은 요청을 보내 먼저 온 응답을 사용"
+    )
+    parser.add_argument(
+        "--retrieval",
+        action="store_true",
+        default=None,
+        help="히스토리 전체 대신 최근 대화와 질문과 관련 있는 이전 대화만 보내 프롬프트 크기 절약"
+    )
+    parser.add_argument(
+        "--archive",
+        action="store_true",
+        default=None,
+        help="히스토리에서 밀려난 지난 대화를 보관하여 /search로 검색"
+    )
+
+    # 일괄 처리 모드
+    parser.add_argument(
+        "--batch",
+        metavar="INPUT",
+        help="프롬프트 JSONL 파일을 일괄 처리 (한 줄에 {\"id\", \"prompt\", \"model\"})"
+    )
+    parser.add_argument(
+        "--output",
+        metavar="PATH",
+        help="일괄 처리 결과 JSONL 파일 (기본값: 입력파일.out.jsonl, 있으면 이어서 처리)"
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=BATCH_CONCURRENCY,
+        help=f"일괄 처리 동시 요청 수 (기본값: {BATCH_CONCURRENCY})"
+    )
+    parser.add_argument(
+        "--rate-limit",
+        metavar="MODEL=RPS",
+        action="append",
+        default=[],
+        help="모델별 초당 요청 수 제한 (여러 번 지정 가능, 예: --rate-limit gpt=5)"
+    )
+    parser.add_argument(
+        "--model",
+        default=DEFAULT_MODEL,
+        choices=list(MODELS.keys()),
+        help=f"model이 없는 항목에 사용할 모델 (기본값: {DEFAULT_MODEL})"
+    )
+
+    args = parser.parse_args(argv)
+    if args.concurrency < 1:
+        parser.error("--concurrency는 1 이상이어야 합니다.")
+
+    # --rate-limit gpt=5 형식을 {"gpt": 5.0}으로 변환
+    rate_limits = {}
+    for value in args.rate_limit:
+        name, _, rate = value.partition("=")
+        try:
+            rate = float(rate)
+        except ValueError:
+            parser.error(f"--rate-limit 형식이 올바르지 않습니다: {value} (예: gpt=5)")
+        if rate <= 0:
+            parser.error(f"--rate-limit 값은 0보다 커야 합니다: {value}")
+        rate_limits[name.strip().lower()] = rate
+    args.rate_limits = rate_limits
+
+    return args
+
+
+def run_batch_mode(api_key, args):
+    """
+    일괄 처리 모드를 실행하고 진행 상황을 출력합니다.
+
+    Args:
+        api_key: OpenRouter API 키
+        args: parse_args()로 해석한 명령줄 인자
+    """
+    # 일괄 처리에서만 쓰는 asyncio 관련 모듈은 이때 불러옴 (대화 모드 시작 속도 개선)
+    import asyncio
+    from batch_runner import run_batch, default_output_path
+
+    output_path = args.output or default_output_path(args.batch)
+
+    print(f"[알림] 일괄 처리: {args.batch} -> {output_path}")
+    print(f"[알림] 동시 요청 수: {args.concurrency}")
+    print()
+
+    def print_progress(result):
+        status = "성공" if result["success"] else f"실패 ({result['error_class']})"
+        print(f"  [{result['id']}] {status} - {format_ms(result['latency_ms'])}")
+
+    try:
+        summary = asyncio.run(run_batch(
+            api_key,
+            args.batch,
+            output_path,
+            concurrency=args.concurrency,
+            rate_limits=args.rate_limits,
+            default_model=args.model,
+            on_progress=print_progress
+        ))
+    except FileNotFoundError as e:
+        print(f"[오류] 파일을 찾을 수 없습니다: {e.filename}")
+        return
+    except KeyboardInterrupt:
+        print()
+        print("[알림] 일괄 처리를 중단했습니다. 같은 명령으로 다시 실행하면 이어서 처리합니다.")
+        return
+
+    print()
+    print(f"[알림] 완료: 성공 {summary['succeeded']} / 실패 {summary['failed']}"
+          f" / 건너뜀 {summary['skipped']} ({summary['elapsed_s']}초)")
+
+
+def start_client_setup(api_key):
+    """
+    API 키 검증과 클라이언트 생성을 백그라운드 스레드에서 시작합니다.
+    검증(네트워크 요청)과 openai 라이브러리 로딩을 기다리지 않고 바로 입력을 받을 수 있습니다.
+    검증과 동시에 API 서버 연결도 미리 열어 두어, 첫 메시지도 이미 열린 연결로 보냅니다.
+
+    Args:
+        api_key: OpenRouter API 키
+
+    Returns:
+        dict: 작업 상태 {"done": threading.Event, "result": (클라이언트 또는 None, 에러 메시지 또는 None)}
+    """
+    setup = {"done": threading.Event(), "result": None}
+
+    def run():
+        start_warm_up()
+        try:
+            is_valid, error = validate_api_key(api_key)
+            setup["result"] = (create_client(api_key), None) if is_valid else (None, error)
+        except Exception as e:
+            setup["result"] = (None, ERROR_MESSAGES["unknown_error"].format(error=str(e)))
+        finally:
+            setup["done"].set()
+
+    threading.Thread(target=run, daemon=True).start()
+    return setup
+
+
+def wait_for_client(setup):
+    """
+    백그라운드 검증이 끝날 때까지 기다립니다. (첫 메시지를 보낼 때 호출)
+
+    Args:
+        setup: start_client_setup()이 반환한 작업 상태
+
+    Returns:
+        tuple: (클라이언트 또는 None, 에러 메시지 또는 None)
+    """
+    if not setup["done"].is_set():
+        print("[알림] API 키 확인 중...")
+    setup["done"].wait()
+    return setup["result"]
+
+
+def main(argv=None):
     """
     챗봇 메인 함수.
     프로그램 시작점입니다.
+
+    API 키 검증과 클라이언트 생성은 백그라운드에서 진행하고 바로 입력을 받으며,
+    첫 메시지를 보낼 때 검증 결과를 기다립니다.
+
+    Args:
+        argv: 명령줄 인자 리스트 (기본값: None, sys.argv 사용)
     """
+    args = parse_args(argv)
+
     # 환영 메시지 출력
     print_welcome()
 
-    # API 키 확인
+    # API 키 확인 (키가 없으면 네트워크 없이 바로 알 수 있음)
     api_key = get_api_key()
-    is_valid, error = validate_api_key(api_key)
-
-    if not is_valid:
+    if not api_key or not api_key.strip():
         print()
         print("[오류] API 키 문제")
-        print(error)
+        print(ERROR_MESSAGES["no_api_key"])
         print()
         return
 
-    print(f"[알림] API 키 확인 완료!")
-    print()
+    if args.batch:
+        # 일괄 처리는 시작 전에 검증
+        # (연결 미리 열기는 하지 않음: 일괄 처리는 이벤트 루프마다 따로 만드는 비동기 연결 풀을 사용)
+        is_valid, error = validate_api_key(api_key)
+        if not is_valid:
+            print()
+            print("[오류] API 키 문제")
+            print(error)
+            print()
+            return
+
+        print(f"[알림] API 키 확인 완료!")
+        print()
+        run_batch_mode(api_key, args)
+        return
+
+    # 검증과 클라이언트 생성은 백그라운드에서 (첫 메시지 전송 때 결과 확인)
+    setup = start_client_setup(api_key)
+    client = None
+
+    # 세션 생성
+    if args.session:
+        try:
+            session = create_session(session_id=args.session, store=get_session_store(),
+                                     retrieval=args.retrieval, archive=args.archive)
+        except ValueError as e:
+            print()
+            print(f"[오류] {e}")
+            print()
+            return
 
-    # 클라이언트 및 세션 생성
-    client = create_client(api_key)
-    session = create_session(DEFAULT_MODEL)
+        if session["messages"]:
+            print(f"[알림] 저장된 대화를 불러왔습니다. (메시지 {len(session['messages'])}개)")
+    else:
+        session = create_session(DEFAULT_MODEL, retrieval=args.retrieval, archive=args.archive)
 
     print(f"[알림] 현재 모델: {get_current_model_name(session)}")
+    if args.race:
+        print("[알림] 경쟁 모드: 응답이 늦으면 다른 모델에도 동시에 요청합니다.")
+    if session.index is not None:
+        print("[알림] 관련 대화 검색: 최근 대화와 관련 있는 이전 대화만 보냅니다.")
     print()
 
+    send = send_message_race if args.race else send_message
+
     # 메인 대화 루프
     while True:
         try:
@@ -219,15 +665,39 @@ def main():
                     break
                 continue
 
+            # 첫 메시지: 백그라운드 검증 결과 확인
+            if client is None:
+                client, error = wait_for_client(setup)
+                if client is None:
+                    print()
+                    print("[오류] API 키 문제")
+                    print(error)
+                    print()
+                    return
+
             # AI에게 메시지 전송
             print()
             print("AI가 생각 중...")
 
-            success, response = send_message(client, session, user_input)
+            # 응답을 기다리는 중 Ctrl+C: 이번 응답만 취소하고 입력으로 돌아감
+            print_delta, has_started = make_delta_printer()
+            success, response, cancelled = send_cancellable(
+                send, client, session, user_input, on_delta=print_delta
+            )
 
-            if success:
+            # 스트리밍 출력 중이었다면 줄바꿈으로 마무리
+            if has_started():
                 print()
-                print(f"AI: {response}")
+
+            if cancelled:
+                print()
+                print(f"[알림] {response} (보낸 메시지는 대화에 남지 않습니다)")
+                print()
+            elif success:
+                if not has_started():
+                    # 빈 응답 등 조각이 하나도 없었던 경우
+                    print()
+                    print(f"AI: {response}")
                 print()
             else:
                 print()
@@ -235,7 +705,7 @@ def main():
                 print()
 
         except KeyboardInterrupt:
-            # Ctrl+C 처리
+            # Ctrl+C 처리 (응답 생성 중에는 send_cancellable이 취소로 처리)
             print()
             print()
             print("챗봇을 종료합니다. 감사합니다!")
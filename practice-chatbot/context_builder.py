@@ -0,0 +1,277 @@
+"""
+관련 대화 검색으로 프롬프트 만들기 모듈
+
+대화가 길어져도 히스토리 전체를 보내지 않고,
+최근 메시지 몇 개와 이번 질문과 관련 있는 이전 대화(질문-응답)만 골라 보냅니다.
+관련도는 세션 히스토리 전체에 대한 BM25 점수로 계산합니다.
+(chatbot.build_payload가 세션에 색인이 연결되어 있을 때 사용)
+
+- 색인: 메시지마다 단어의 출현 횟수를 저장하는 역색인 (ContextIndex)
+  Session이 메시지를 추가/삭제할 때마다 함께 갱신하므로 요청마다 다시 만들지 않습니다.
+- 단어: 영문/숫자는 단어 그대로, 한국어 등은 글자 2-gram
+  ("리스트는", "리스트를"처럼 조사가 붙어도 같은 2-gram이 겹쳐 찾을 수 있음)
+- 프롬프트: 앞쪽 요약(system) 메시지 + 관련 이전 대화(시간 순) + 최근 RETRIEVAL_RECENT_MESSAGES개
+  관련 이전 대화는 최대 RETRIEVAL_TOP_K개, RETRIEVAL_TOKEN_BUDGET 토큰까지만 넣습니다.
+
+사용 예시:
+    from context_builder import ContextIndex, build_context, get_context_stats
+
+    session.index = ContextIndex()          # 보통 chatbot.create_session(retrieval=True)
+    messages, tokens = build_context(session)
+    print(get_context_stats())
+"""
+
+import math
+import re
+import threading
+from collections import Counter
+
+from config import (
+    RETRIEVAL_RECENT_MESSAGES,
+    RETRIEVAL_TOP_K,
+    RETRIEVAL_TOKEN_BUDGET,
+    RETRIEVAL_BM25_K1,
+    RETRIEVAL_BM25_B
+)
+
+
+# 단어 구분 (문자/숫자가 아닌 글자는 모두 구분자)
+_WORD = re.compile(r"\w+")
+
+_stats = {
+    "requests": 0,          # 관련 대화를 골라 보낸 요청 수
+    "window_tokens": 0,     # 히스토리 전체를 보냈다면 보냈을 추정 토큰 수
+    "sent_tokens": 0,       # 실제로 보낸 추정 토큰 수
+    "retrieved_turns": 0    # 함께 보낸 관련 이전 대화 수
+}
+_lock = threading.Lock()
+
+
+def tokenize(text):
+    """
+    BM25 색인에 사용할 단어 목록을 만듭니다.
+
+    Args:
+        text: 메시지 내용
+
+    Returns:
+        list: 단어 목록 (같은 단어가 여러 번 나오면 여러 번 포함)
+
+    사용 예시:
+        tokenize("Python 리스트는")  # ["python", "리스", "스트", "트는"]
+    """
+    terms = []
+    for word in _WORD.findall(text.lower()):
+        if word.isascii() or len(word) == 1:
+            terms.append(word)
+        else:
+            terms.extend(word[i:i + 2] for i in range(len(word) - 1))
+    return terms
+
+
+class ContextIndex:
+    """
+    세션 히스토리의 BM25 역색인.
+
+    메시지 객체 단위로 추가/삭제하며, 같은 내용의 메시지도 객체가 다르면 따로 색인합니다.
+    요약(system) 메시지는 항상 프롬프트에 들어가므로 색인하지 않습니다.
+
+    사용 예시:
+        index = ContextIndex()
+        index.add(message)
+        for score, message in index.search("파이썬 리스트", limit=3):
+            print(score, message.content)
+    """
+
+    __slots__ = ("_docs", "_postings", "_total_length")
+
+    def __init__(self):
+        self._docs = {}             # {id(메시지): (메시지, 단어별 출현 횟수, 단어 수)}
+        self._postings = {}         # {단어: {id(메시지): 출현 횟수}}
+        self._total_length = 0
+
+    def __len__(self):
+        return len(self._docs)
+
+    def add(self, message):
+        """
+        메시지를 색인에 추가합니다.
+
+        Args:
+            message: chat_session.Message
+        """
+        if message.role == "system" or id(message) in self._docs:
+            return
+
+        counts = Counter(tokenize(message.content))
+        length = sum(counts.values())
+        self._docs[id(message)] = (message, counts, length)
+        self._total_length += length
+        for term, count in counts.items():
+            self._postings.setdefault(term, {})[id(message)] = count
+
+    def remove(self, message):
+        """
+        메시지를 색인에서 삭제합니다. 색인에 없는 메시지면 아무것도 하지 않습니다.
+
+        Args:
+            message: chat_session.Message
+        """
+        entry = self._docs.pop(id(message), None)
+        if entry is None:
+            return
+
+        _, counts, length = entry
+        self._total_length -= length
+        for term in counts:
+            postings = self._postings[term]
+            del postings[id(message)]
+            if not postings:
+                del self._postings[term]
+
+    def clear(self):
+        """색인을 모두 비웁니다."""
+        self._docs.clear()
+        self._postings.clear()
+        self._total_length = 0
+
+    def search(self, query, limit=None):
+        """
+        검색어와 관련 있는 메시지를 BM25 점수가 높은 순서로 찾습니다.
+
+        Args:
+            query: 검색어 (보통 사용자의 마지막 질문)
+            limit: 최대 결과 수 (None이면 검색어 단어가 하나라도 있는 메시지 전부)
+
+        Returns:
+            list: [(점수, 메시지), ...] (점수 내림차순)
+        """
+        count = len(self._docs)
+        if not count:
+            return []
+
+        average_length = self._total_length / count or 1.0
+        scores = {}
+        for term, query_count in Counter(tokenize(query)).items():
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, frequency in postings.items():
+                length = self._docs[doc_id][2]
+                norm = RETRIEVAL_BM25_K1 * (1 - RETRIEVAL_BM25_B + RETRIEVAL_BM25_B * length / average_length)
+                score = idf * frequency * (RETRIEVAL_BM25_K1 + 1) / (frequency + norm)
+                scores[doc_id] = scores.get(doc_id, 0.0) + score * query_count
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        if limit is not None:
+            ranked = ranked[:limit]
+        return [(score, self._docs[doc_id][0]) for doc_id, score in ranked]
+
+
+def _turn_span(messages, index):
+    """
+    메시지가 속한 질문-응답 쌍의 범위를 반환합니다.
+
+    Returns:
+        tuple: (시작 위치, 끝 위치) (끝 위치 포함)
+    """
+    role = messages[index].role
+    first = last = index
+    if role == "assistant" and index > 0 and messages[index - 1].role == "user":
+        first = index - 1
+    elif role == "user" and index + 1 < len(messages) and messages[index + 1].role == "assistant":
+        last = index + 1
+    return first, last
+
+
+def build_context(session, recent=RETRIEVAL_RECENT_MESSAGES, top_k=RETRIEVAL_TOP_K,
+                  budget=RETRIEVAL_TOKEN_BUDGET):
+    """
+    API 요청에 보낼 메시지 목록을 최근 메시지와 관련 이전 대화로 만듭니다.
+    이전 대화가 budget 안에 모두 들어가면 히스토리를 그대로 보냅니다.
+
+    Args:
+        session: 대화 세션 (index에 ContextIndex가 연결되어 있어야 함)
+        recent: 항상 보낼 최근 메시지 수 (AI 응답으로 시작하면 그 질문까지 포함)
+        top_k: 함께 보낼 관련 이전 대화(질문-응답) 최대 수
+        budget: 관련 이전 대화에 쓸 최대 추정 토큰 수
+
+    Returns:
+        tuple: (메시지 목록, 추정 토큰 수)
+            (히스토리를 그대로 보내면 session.payload()를 복사 없이 반환)
+
+    사용 예시:
+        messages, tokens = build_context(session)
+    """
+    messages = session.payload()
+    if session.index is None or len(messages) <= recent:
+        return messages, session.history_tokens
+
+    history = list(messages)
+
+    # 최근 메시지: 질문-응답 경계에서 시작
+    start = max(0, len(history) - recent)
+    while start > 0 and history[start].role == "assistant":
+        start -= 1
+
+    # 앞쪽 요약 메시지는 항상 포함
+    pinned = 0
+    while pinned < start and history[pinned].role == "system":
+        pinned += 1
+
+    older = history[pinned:start]
+    if sum(message.tokens for message in older) <= budget:
+        return messages, session.history_tokens
+
+    # 마지막 질문과 관련 있는 이전 대화를 점수 순서로 예산 안에서 고름
+    query = next((m.content for m in reversed(history) if m.role == "user"), "")
+    positions = {id(message): i for i, message in enumerate(older)}
+    selected = set()
+    used = turns = 0
+    for _, message in session.index.search(query):
+        position = positions.get(id(message))
+        if position is None:
+            continue    # 최근 메시지에 이미 포함
+
+        first, last = _turn_span(older, position)
+        span = [i for i in range(first, last + 1) if i not in selected]
+        cost = sum(older[i].tokens for i in span)
+        if not span or used + cost > budget:
+            continue
+
+        selected.update(span)
+        used += cost
+        turns += 1
+        if turns >= top_k:
+            break
+
+    head, tail = history[:pinned], history[start:]
+    payload = head + [older[i] for i in sorted(selected)] + tail
+    tokens = sum(m.tokens for m in head) + used + sum(m.tokens for m in tail)
+
+    with _lock:
+        _stats["requests"] += 1
+        _stats["window_tokens"] += session.history_tokens
+        _stats["sent_tokens"] += tokens
+        _stats["retrieved_turns"] += turns
+    return payload, tokens
+
+
+def get_context_stats():
+    """
+    관련 대화 검색 통계를 반환합니다.
+
+    Returns:
+        dict: requests, window_tokens, sent_tokens, retrieved_turns와
+            saved_ratio (히스토리 전체 대비 줄어든 토큰 비율)
+
+    사용 예시:
+        stats = get_context_stats()
+        print(f"프롬프트 {stats['saved_ratio']:.0%} 절약")
+    """
+    with _lock:
+        stats = dict(_stats)
+    window = stats["window_tokens"]
+    stats["saved_ratio"] = 1 - stats["sent_tokens"] / window if window else 0.0
+    return stats
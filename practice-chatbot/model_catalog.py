@@ -0,0 +1,298 @@
+"""
+모델 카탈로그 모듈
+
+API 키를 검증할 때 호출하는 OpenRouter /models 응답(모델 카탈로그)을
+모델 ID별로 정리하여 디스크에 저장하고, config.MODELS에 실제 한도와 가격을 채웁니다.
+
+- context_length: 컨텍스트 길이 (히스토리 토큰 예산과 auto 모델 선택에 사용)
+- max_output: 제공자가 허용하는 최대 출력 토큰 수 (max_tokens가 이보다 크면 줄임)
+- prompt_price, completion_price: 토큰당 가격 (USD)
+
+카탈로그는 크기가 크므로 매번 다시 받지 않습니다.
+저장된 카탈로그가 MODEL_CATALOG_TTL보다 최근이면 검증 요청에 If-None-Match(ETag)를 붙여,
+바뀌지 않았으면 서버가 본문 없이 304로 응답합니다.
+TTL이 지나면 ETag 없이 전체를 다시 받습니다.
+
+사용 예시:
+    import model_catalog
+
+    model_catalog.load_catalog()                  # 저장된 카탈로그를 MODELS에 반영
+    headers.update(model_catalog.request_headers())
+    response = session.get(f"{API_BASE_URL}/models", headers=headers)
+    model_catalog.update_from_response(response)  # 200이면 저장, 304면 유효 시간만 갱신
+"""
+
+import json
+import os
+import threading
+import time
+
+from config import (
+    API_BASE_URL,
+    MODELS,
+    MODEL_CATALOG_ENABLED,
+    MODEL_CATALOG_PATH,
+    MODEL_CATALOG_TTL
+)
+
+
+# 디스크 캐시 파일 형식 버전 (형식이 바뀌면 예전 파일은 무시)
+CATALOG_VERSION = 1
+
+# 카탈로그를 반영하기 전의 설정 값: {모델 이름: (max_tokens, context_length)}
+# (카탈로그가 바뀌어 다시 반영할 때 원래 설정 기준으로 계산)
+_configured = {
+    name: (info.get("max_tokens"), info.get("context_length"))
+    for name, info in MODELS.items()
+}
+
+_catalog = None     # {"etag", "fetched_at", "models": {모델 ID: 한도/가격}}
+_loaded = False
+_stats = {
+    "downloads": 0,       # 전체 카탈로그를 받은 횟수
+    "not_modified": 0     # 304로 다시 받지 않은 횟수
+}
+_lock = threading.Lock()
+
+
+def parse_catalog(data):
+    """
+    /models 응답 본문을 모델 ID별 한도/가격 딕셔너리로 변환합니다.
+
+    Args:
+        data: /models 응답 JSON ({"data": [모델 정보, ...]})
+
+    Returns:
+        dict: {모델 ID: {context_length, max_output, prompt_price, completion_price}}
+    """
+    models = {}
+    for item in data.get("data") or []:
+        model_id = item.get("id")
+        if not model_id:
+            continue
+
+        top_provider = item.get("top_provider") or {}
+        pricing = item.get("pricing") or {}
+        models[model_id] = {
+            "context_length": _to_int(item.get("context_length")),
+            "max_output": _to_int(top_provider.get("max_completion_tokens")),
+            "prompt_price": _to_float(pricing.get("prompt")),
+            "completion_price": _to_float(pricing.get("completion"))
+        }
+    return models
+
+
+def _to_int(value):
+    """양의 정수로 변환합니다. 변환할 수 없으면 None."""
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        return None
+    return value if value > 0 else None
+
+
+def _to_float(value):
+    """0 이상의 실수로 변환합니다. (가격은 문자열로 옴) 변환할 수 없으면 None."""
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return value if value >= 0 else None
+
+
+def apply_catalog(models=None):
+    """
+    카탈로그의 한도와 가격을 MODELS 항목에 채웁니다.
+    카탈로그에 없는 모델은 설정 값을 그대로 사용합니다.
+
+    Args:
+        models: 카탈로그 (기본값: 현재 불러온 카탈로그)
+
+    Returns:
+        int: 갱신한 MODELS 항목 수
+    """
+    if models is None:
+        with _lock:
+            models = _catalog["models"] if _catalog else {}
+
+    updated = 0
+    for name, info in MODELS.items():
+        entry = models.get(info.get("id"))
+        if entry is None:
+            continue
+
+        max_tokens, context_length = _configured.get(name, (info.get("max_tokens"), None))
+        if entry["context_length"]:
+            info["context_length"] = entry["context_length"]
+        elif context_length:
+            info["context_length"] = context_length
+
+        info["max_output"] = entry["max_output"]
+        if max_tokens and entry["max_output"]:
+            info["max_tokens"] = min(max_tokens, entry["max_output"])
+
+        info["prompt_price"] = entry["prompt_price"]
+        info["completion_price"] = entry["completion_price"]
+        updated += 1
+
+    return updated
+
+
+def load_catalog(path=MODEL_CATALOG_PATH):
+    """
+    디스크에 저장된 카탈로그를 불러와 MODELS에 반영합니다.
+    처음 한 번만 읽으며, 파일이 없거나 다른 API 주소의 카탈로그면 무시합니다.
+
+    Args:
+        path: 카탈로그 파일 경로
+
+    Returns:
+        bool: 저장된 카탈로그를 반영했으면 True
+    """
+    global _catalog, _loaded
+
+    with _lock:
+        if _loaded:
+            return _catalog is not None
+        _loaded = True
+
+        if not MODEL_CATALOG_ENABLED:
+            return False
+
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+
+        if data.get("version") != CATALOG_VERSION or data.get("base_url") != API_BASE_URL:
+            return False
+        _catalog = data
+
+    apply_catalog()
+    return True
+
+
+def request_headers():
+    """
+    /models 요청에 붙일 조건부 요청 헤더를 반환합니다.
+
+    Returns:
+        dict: 저장된 카탈로그가 유효 시간 안이면 {"If-None-Match": ETag}, 아니면 {}
+    """
+    load_catalog()
+    with _lock:
+        if not _catalog or not _catalog.get("etag"):
+            return {}
+        if time.time() - _catalog["fetched_at"] >= MODEL_CATALOG_TTL:
+            return {}
+        return {"If-None-Match": _catalog["etag"]}
+
+
+def update_from_response(response, path=MODEL_CATALOG_PATH):
+    """
+    /models 응답으로 카탈로그를 갱신합니다.
+    200이면 새 카탈로그를 저장하고 MODELS에 반영하며, 304면 유효 시간만 갱신합니다.
+    그 밖의 응답(401 등)이나 잘못된 본문은 무시합니다.
+
+    Args:
+        response: /models 응답 (requests.Response)
+        path: 카탈로그 파일 경로
+
+    Returns:
+        bool: 카탈로그를 새로 받았거나 유효 시간을 갱신했으면 True
+    """
+    global _catalog
+
+    if response.status_code == 304:
+        with _lock:
+            if _catalog is None:
+                return False
+            _catalog["fetched_at"] = time.time()
+            _stats["not_modified"] += 1
+            snapshot = dict(_catalog)
+        _save(snapshot, path)
+        return True
+
+    if response.status_code != 200:
+        return False
+
+    try:
+        models = parse_catalog(response.json())
+    except (ValueError, AttributeError):
+        return False
+
+    snapshot = {
+        "version": CATALOG_VERSION,
+        "base_url": API_BASE_URL,
+        "etag": response.headers.get("ETag"),
+        "fetched_at": time.time(),
+        "models": models
+    }
+    with _lock:
+        _catalog = snapshot
+        _stats["downloads"] += 1
+
+    apply_catalog(models)
+    _save(snapshot, path)
+    return True
+
+
+def _save(catalog, path):
+    """
+    카탈로그를 디스크에 저장합니다. (임시 파일에 쓴 뒤 교체)
+    저장에 실패해도 메모리의 카탈로그로 계속 동작합니다.
+    """
+    if not MODEL_CATALOG_ENABLED:
+        return
+
+    try:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(catalog, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(temp_path, path)
+    except OSError:
+        pass
+
+
+def estimate_cost(model_id, prompt_tokens, completion_tokens):
+    """
+    토큰 수로 예상 비용(USD)을 계산합니다.
+
+    Args:
+        model_id: OpenRouter 모델 ID
+        prompt_tokens: 입력 토큰 수
+        completion_tokens: 출력 토큰 수
+
+    Returns:
+        float 또는 None: 예상 비용, 가격 정보가 없으면 None
+
+    사용 예시:
+        cost = estimate_cost("openai/gpt-4o-mini", 1200, 300)
+        print(f"${cost:.4f}")
+    """
+    with _lock:
+        entry = _catalog["models"].get(model_id) if _catalog else None
+
+    if entry is None or entry["prompt_price"] is None or entry["completion_price"] is None:
+        return None
+    return prompt_tokens * entry["prompt_price"] + completion_tokens * entry["completion_price"]
+
+
+def get_catalog_stats():
+    """
+    카탈로그 상태를 반환합니다.
+
+    Returns:
+        dict: {models (카탈로그의 모델 수), age_s (받은 뒤 지난 시간, 없으면 None),
+               downloads, not_modified}
+    """
+    with _lock:
+        stats = dict(_stats)
+        stats["models"] = len(_catalog["models"]) if _catalog else 0
+        stats["age_s"] = time.time() - _catalog["fetched_at"] if _catalog else None
+    return stats
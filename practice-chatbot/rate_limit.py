@@ -0,0 +1,162 @@
+"""
+요청 속도 제한 모듈
+
+토큰 버킷(token bucket) 방식으로 초당 요청 수를 제한합니다.
+버킷에는 초당 rate개씩 토큰이 채워지고(최대 capacity개), 요청마다 토큰을 하나 씁니다.
+토큰이 없으면 채워질 때까지 기다립니다.
+
+동기 코드(acquire)와 asyncio 코드(acquire_async) 모두에서 사용할 수 있고,
+여러 스레드가 하나의 버킷을 함께 써도 안전합니다.
+
+사용 예시:
+    from rate_limit import TokenBucket
+
+    bucket = TokenBucket(rate=5)   # 초당 5회
+    bucket.acquire()               # 필요하면 기다렸다가 통과
+    await bucket.acquire_async()   # asyncio 버전
+"""
+
+import threading
+import time
+
+from config import MODEL_RATE_LIMITS
+
+
+class TokenBucket:
+    """
+    스레드 안전한 토큰 버킷.
+
+    reserve()는 토큰을 미리 예약하고 기다려야 할 시간을 돌려주므로,
+    동시에 여러 요청이 와도 먼저 온 순서대로 공평하게 간격이 벌어집니다.
+    """
+
+    def __init__(self, rate, capacity=None):
+        """
+        Args:
+            rate: 초당 채워지는 토큰 수 (초당 허용 요청 수)
+            capacity: 버킷 크기, 순간적으로 몰아서 보낼 수 있는 요청 수
+                (기본값: max(1, rate))
+        """
+        if rate <= 0:
+            raise ValueError("rate는 0보다 커야 합니다.")
+
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        elapsed = now - self._updated
+        self._updated = now
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+
+    def reserve(self, tokens=1, max_wait=None):
+        """
+        토큰을 예약하고 기다려야 할 시간을 반환합니다.
+
+        Args:
+            tokens: 사용할 토큰 수
+            max_wait: 최대 대기 시간 (초). 이보다 오래 기다려야 하면 예약하지 않음
+
+        Returns:
+            float 또는 None: 기다려야 할 시간 (초), max_wait을 넘으면 None
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+
+            wait = 0.0
+            if self._tokens < tokens:
+                wait = (tokens - self._tokens) / self.rate
+
+            if max_wait is not None and wait > max_wait:
+                return None
+
+            self._tokens -= tokens
+            return wait
+
+    def acquire(self, tokens=1, max_wait=None, cancel=None):
+        """
+        토큰을 얻을 때까지 기다립니다. (동기 버전)
+
+        Args:
+            tokens: 사용할 토큰 수
+            max_wait: 최대 대기 시간 (초)
+            cancel: 취소 토큰 (wait(timeout)과 cancelled가 있는 객체, 예: chatbot.CancelToken)
+                기다리는 도중 취소되면 바로 돌아오며 예약한 토큰은 되돌려 놓음
+
+        Returns:
+            bool: 토큰을 얻었으면 True, max_wait 안에 얻을 수 없거나 취소되었으면 False
+        """
+        wait = self.reserve(tokens, max_wait)
+        if wait is None:
+            return False
+        if cancel is not None:
+            if cancel.cancelled or cancel.wait(wait):
+                self._release(tokens)
+                return False
+        elif wait > 0:
+            time.sleep(wait)
+        return True
+
+    def _release(self, tokens):
+        """예약했지만 쓰지 않은 토큰을 되돌려 놓습니다."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self.capacity, self._tokens + tokens)
+
+    async def acquire_async(self, tokens=1, max_wait=None):
+        """
+        토큰을 얻을 때까지 기다립니다. (asyncio 버전)
+
+        Args:
+            tokens: 사용할 토큰 수
+            max_wait: 최대 대기 시간 (초)
+
+        Returns:
+            bool: 토큰을 얻었으면 True, max_wait 안에 얻을 수 없으면 False
+        """
+        import asyncio
+
+        wait = self.reserve(tokens, max_wait)
+        if wait is None:
+            return False
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return True
+
+
+# ============================================================
+# 모델별 속도 제한
+# ============================================================
+
+_model_limiters = {}
+_model_limiters_lock = threading.Lock()
+
+
+def get_model_limiter(model_name):
+    """
+    모델별로 공유하는 속도 제한 버킷을 반환합니다.
+    config.MODEL_RATE_LIMITS에 설정이 없는 모델은 제한하지 않습니다.
+
+    Args:
+        model_name: 모델 이름 (예: "gpt")
+
+    Returns:
+        TokenBucket 또는 None: 제한이 없으면 None
+
+    사용 예시:
+        limiter = get_model_limiter("gpt")
+        if limiter:
+            limiter.acquire()
+    """
+    rate = MODEL_RATE_LIMITS.get(model_name)
+    if not rate:
+        return None
+
+    with _model_limiters_lock:
+        limiter = _model_limiters.get(model_name)
+        if limiter is None:
+            limiter = TokenBucket(rate)
+            _model_limiters[model_name] = limiter
+        return limiter
@@ -0,0 +1,323 @@
+"""
+응답 캐시 모듈
+
+같은 모델, 같은 max_tokens, 같은 대화 내용으로 보낸 요청의 응답을 저장해 두었다가
+다시 요청하면 API를 호출하지 않고 바로 돌려줍니다.
+회귀 테스트용 프롬프트, 데모, 자주 묻는 질문처럼 같은 요청이 반복될 때 유용합니다.
+
+- 메모리: 크기가 제한된 LRU 캐시 (가장 오래 안 쓴 항목부터 삭제)
+- 디스크: SQLite 파일 (프로그램을 다시 시작해도 유지)
+- 유효 시간(TTL)과 최대 항목 수를 넘으면 오래된 항목부터 삭제
+
+기본적으로 꺼져 있으며, config.RESPONSE_CACHE_ENABLED = True 로 켜거나
+enable_response_cache()를 호출하여 사용합니다.
+
+사용 예시:
+    from response_cache import enable_response_cache
+
+    cache = enable_response_cache()
+    success, response = send_message(client, session, "안녕!")
+    print(cache.stats())
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from config import (
+    RESPONSE_CACHE_ENABLED,
+    RESPONSE_CACHE_PATH,
+    RESPONSE_CACHE_TTL,
+    RESPONSE_CACHE_MEMORY_SIZE,
+    RESPONSE_CACHE_MAX_ENTRIES
+)
+
+
+def make_cache_key(model_id, max_tokens, messages):
+    """
+    요청 내용으로 캐시 키를 만듭니다.
+    같은 모델 ID, max_tokens, 메시지 리스트면 항상 같은 키가 나옵니다.
+
+    Args:
+        model_id: OpenRouter 모델 ID
+        max_tokens: 최대 출력 토큰 수
+        messages: API에 보낼 메시지 리스트
+
+    Returns:
+        str: SHA-256 해시 문자열
+
+    사용 예시:
+        key = make_cache_key("openai/gpt-4o-mini", 4096, session["messages"])
+    """
+    payload = json.dumps(
+        [model_id, max_tokens, [[m["role"], m["content"]] for m in messages]],
+        ensure_ascii=False,
+        separators=(",", ":")
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    메모리 LRU + SQLite 2단계 응답 캐시.
+
+    여러 스레드(Streamlit 세션 등)에서 동시에 사용해도 안전합니다.
+    디스크 오류가 발생하면 메모리 캐시만으로 계속 동작합니다.
+
+    사용 예시:
+        cache = ResponseCache("responses.sqlite3", ttl=3600)
+        cache.put(key, "응답")
+        cache.get(key)  # "응답"
+    """
+
+    def __init__(self, path=RESPONSE_CACHE_PATH, ttl=RESPONSE_CACHE_TTL,
+                 memory_size=RESPONSE_CACHE_MEMORY_SIZE,
+                 max_entries=RESPONSE_CACHE_MAX_ENTRIES):
+        """
+        Args:
+            path: SQLite 파일 경로 (None이면 메모리 캐시만 사용)
+            ttl: 항목 유효 시간 (초)
+            memory_size: 메모리 LRU에 보관할 최대 항목 수
+            max_entries: 디스크에 보관할 최대 항목 수
+        """
+        self.ttl = ttl
+        self.memory_size = memory_size
+        self.max_entries = max_entries
+
+        # {키: (만료 시각, 응답)}
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+
+        self._db = None
+        if path is not None:
+            self._db = self._open_db(path)
+
+    def _open_db(self, path):
+        """SQLite 파일을 열고 테이블을 준비합니다. 실패하면 None."""
+        try:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+            db = sqlite3.connect(path, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY,"
+                " response TEXT NOT NULL,"
+                " expires_at REAL NOT NULL,"
+                " last_access REAL NOT NULL)"
+            )
+            db.execute(
+                "CREATE INDEX IF NOT EXISTS idx_responses_last_access"
+                " ON responses(last_access)"
+            )
+            db.commit()
+            return db
+        except (OSError, sqlite3.Error):
+            return None
+
+    def get(self, key):
+        """
+        캐시에서 응답을 찾습니다.
+
+        Args:
+            key: make_cache_key로 만든 캐시 키
+
+        Returns:
+            str 또는 None: 저장된 응답, 없거나 만료되면 None
+        """
+        now = time.time()
+
+        with self._lock:
+            # 1단계: 메모리
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires_at, response = entry
+                if now < expires_at:
+                    self._memory.move_to_end(key)
+                    self._counters["memory_hits"] += 1
+                    return response
+                del self._memory[key]
+
+            # 2단계: 디스크
+            if self._db is not None:
+                try:
+                    row = self._db.execute(
+                        "SELECT response, expires_at FROM responses WHERE key = ?",
+                        (key,)
+                    ).fetchone()
+
+                    if row is not None and now < row[1]:
+                        self._db.execute(
+                            "UPDATE responses SET last_access = ? WHERE key = ?",
+                            (now, key)
+                        )
+                        self._db.commit()
+                        self._remember(key, row[1], row[0])
+                        self._counters["disk_hits"] += 1
+                        return row[0]
+
+                    if row is not None:
+                        # 만료된 항목 삭제
+                        self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                        self._db.commit()
+                except sqlite3.Error:
+                    pass
+
+            self._counters["misses"] += 1
+            return None
+
+    def put(self, key, response):
+        """
+        응답을 캐시에 저장합니다.
+
+        Args:
+            key: make_cache_key로 만든 캐시 키
+            response: 저장할 응답 문자열
+        """
+        now = time.time()
+        expires_at = now + self.ttl
+
+        with self._lock:
+            self._remember(key, expires_at, response)
+
+            if self._db is None:
+                return
+
+            try:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses"
+                    " (key, response, expires_at, last_access) VALUES (?, ?, ?, ?)",
+                    (key, response, expires_at, now)
+                )
+                self._evict_disk(now)
+                self._db.commit()
+            except sqlite3.Error:
+                pass
+
+    def _remember(self, key, expires_at, response):
+        """메모리 LRU에 저장하고 크기를 넘으면 가장 오래 안 쓴 항목을 삭제합니다."""
+        self._memory[key] = (expires_at, response)
+        self._memory.move_to_end(key)
+
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+            self._counters["evictions"] += 1
+
+    def _evict_disk(self, now):
+        """디스크에서 만료된 항목과 최대 개수를 넘는 오래된 항목을 삭제합니다."""
+        cursor = self._db.execute("DELETE FROM responses WHERE expires_at <= ?", (now,))
+        self._counters["evictions"] += cursor.rowcount
+
+        count = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        if count > self.max_entries:
+            cursor = self._db.execute(
+                "DELETE FROM responses WHERE key IN ("
+                " SELECT key FROM responses ORDER BY last_access LIMIT ?)",
+                (count - self.max_entries,)
+            )
+            self._counters["evictions"] += cursor.rowcount
+
+    def clear(self):
+        """캐시의 모든 항목을 삭제합니다."""
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                try:
+                    self._db.execute("DELETE FROM responses")
+                    self._db.commit()
+                except sqlite3.Error:
+                    pass
+
+    def stats(self):
+        """
+        캐시 적중/실패 통계를 반환합니다.
+
+        Returns:
+            dict: hits, memory_hits, disk_hits, misses, evictions, hit_rate, memory_entries
+        """
+        with self._lock:
+            stats = dict(self._counters)
+            stats["memory_entries"] = len(self._memory)
+
+        stats["hits"] = stats["memory_hits"] + stats["disk_hits"]
+        total = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / total if total else 0.0
+        return stats
+
+    def close(self):
+        """SQLite 연결을 닫습니다."""
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+# ============================================================
+# 기본 캐시
+# ============================================================
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def enable_response_cache(path=RESPONSE_CACHE_PATH, **options):
+    """
+    send_message가 사용할 기본 응답 캐시를 켭니다.
+
+    Args:
+        path: SQLite 파일 경로 (None이면 메모리 캐시만 사용)
+        **options: ResponseCache의 나머지 설정 (ttl, memory_size, max_entries)
+
+    Returns:
+        ResponseCache: 기본 캐시 객체
+
+    사용 예시:
+        cache = enable_response_cache(ttl=600)
+    """
+    global _default_cache
+
+    with _default_cache_lock:
+        if _default_cache is not None:
+            _default_cache.close()
+        _default_cache = ResponseCache(path, **options)
+        return _default_cache
+
+
+def disable_response_cache():
+    """
+    기본 응답 캐시를 끕니다. (디스크에 저장된 내용은 유지)
+
+    사용 예시:
+        disable_response_cache()
+    """
+    global _default_cache
+
+    with _default_cache_lock:
+        if _default_cache is not None:
+            _default_cache.close()
+        _default_cache = None
+
+
+def get_response_cache():
+    """
+    기본 응답 캐시를 반환합니다.
+    config.RESPONSE_CACHE_ENABLED가 True면 처음 호출할 때 만들어집니다.
+
+    Returns:
+        ResponseCache 또는 None: 캐시가 꺼져 있으면 None
+    """
+    global _default_cache
+
+    if _default_cache is None and RESPONSE_CACHE_ENABLED:
+        with _default_cache_lock:
+            if _default_cache is None:
+                _default_cache = ResponseCache()
+
+    return _default_cache
@@ -0,0 +1,171 @@
+"""
+재시도 정책 모듈
+
+API 호출이 일시적인 오류(429, 5xx, 네트워크 끊김, 타임아웃)로 실패했을 때
+다시 시도할지, 얼마나 기다렸다가 시도할지를 결정합니다.
+동기/비동기 send_message가 함께 사용합니다.
+
+- 지수 백오프 + 지터(jitter): 1회차 최대 RETRY_BASE_DELAY초, 이후 2배씩 (최대 RETRY_MAX_DELAY초)
+  범위 안에서 무작위로 기다려, 여러 요청이 동시에 다시 몰리지 않게 합니다.
+- 서버가 Retry-After 헤더를 보내면 그 시간을 따릅니다.
+- 전체 마감 시간(REQUEST_DEADLINE)을 넘길 것 같으면 더 기다리지 않고 포기합니다.
+
+사용 예시:
+    import retry
+
+    deadline = retry.start_deadline()
+    attempt = 0
+    while True:
+        try:
+            ...API 호출...
+            break
+        except Exception as e:
+            delay = retry.next_delay(attempt, e, deadline)
+            if delay is None:
+                raise
+            time.sleep(delay)
+            attempt += 1
+"""
+
+import random
+import time
+
+from config import (
+    RETRY_MAX_ATTEMPTS,
+    RETRY_BASE_DELAY,
+    RETRY_MAX_DELAY,
+    REQUEST_DEADLINE
+)
+
+
+def start_deadline(seconds=None):
+    """
+    지금부터 전체 마감 시각을 계산합니다.
+
+    Args:
+        seconds: 마감까지의 시간 (기본값: REQUEST_DEADLINE)
+
+    Returns:
+        float: time.monotonic() 기준 마감 시각
+    """
+    return time.monotonic() + (REQUEST_DEADLINE if seconds is None else seconds)
+
+
+def remaining(deadline):
+    """
+    마감까지 남은 시간(초)을 반환합니다. 지났으면 0.
+
+    Args:
+        deadline: start_deadline()이 반환한 마감 시각
+
+    Returns:
+        float: 남은 시간 (초)
+    """
+    return max(0.0, deadline - time.monotonic())
+
+
+def is_retryable(error):
+    """
+    다시 시도하면 성공할 수 있는 오류인지 확인합니다.
+
+    Args:
+        error: API 호출 중 발생한 예외
+
+    Returns:
+        bool: 429, 5xx, 연결 오류, 타임아웃이면 True
+    """
+    import openai
+
+    # APITimeoutError도 APIConnectionError의 하위 클래스
+    if isinstance(error, (openai.APIConnectionError, openai.RateLimitError)):
+        return True
+
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code >= 500
+
+    return False
+
+
+def retry_after_seconds(error):
+    """
+    오류 응답의 Retry-After 헤더에서 기다릴 시간을 읽습니다.
+    초 단위 숫자와 HTTP 날짜 형식, retry-after-ms 헤더를 지원합니다.
+
+    Args:
+        error: API 호출 중 발생한 예외
+
+    Returns:
+        float 또는 None: 기다릴 시간 (초), 헤더가 없거나 해석할 수 없으면 None
+    """
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return max(0.0, float(value) / 1000)
+        except ValueError:
+            pass
+
+    value = headers.get("retry-after")
+    if not value:
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    # HTTP 날짜 형식 (드물게 쓰이므로 필요할 때만 email.utils를 불러옴)
+    from email.utils import parsedate_to_datetime
+
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt):
+    """
+    지수 백오프 + 전체 지터(full jitter) 대기 시간을 계산합니다.
+
+    Args:
+        attempt: 실패한 시도 번호 (0부터 시작)
+
+    Returns:
+        float: 기다릴 시간 (초)
+    """
+    ceiling = min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * (2 ** attempt))
+    return random.uniform(0, ceiling)
+
+
+def next_delay(attempt, error, deadline):
+    """
+    실패한 요청을 다시 시도하기 전에 기다릴 시간을 결정합니다.
+
+    Args:
+        attempt: 실패한 시도 번호 (0부터 시작)
+        error: 발생한 예외
+        deadline: start_deadline()이 반환한 마감 시각
+
+    Returns:
+        float 또는 None: 기다릴 시간 (초), 포기해야 하면 None
+            (재시도할 수 없는 오류, 최대 시도 횟수 도달, 마감 시간 초과)
+    """
+    if attempt + 1 >= RETRY_MAX_ATTEMPTS or not is_retryable(error):
+        return None
+
+    retry_after = retry_after_seconds(error)
+    if retry_after is not None:
+        # 서버가 알려준 시간을 따르되, 동시에 몰리지 않도록 약간의 지터 추가
+        delay = retry_after + random.uniform(0, RETRY_BASE_DELAY)
+    else:
+        delay = backoff_delay(attempt)
+
+    # 기다린 뒤 다시 요청할 시간조차 남지 않으면 포기
+    if delay >= remaining(deadline):
+        return None
+
+    return delay
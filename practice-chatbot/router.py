@@ -0,0 +1,162 @@
+"""
+모델 자동 선택(라우터) 모듈
+
+MODELS의 "auto" 항목을 선택한 세션은 요청마다 이 모듈이 실제 모델을 고릅니다.
+telemetry에 기록되는 요청 결과로 모델별 지연 시간과 에러율의
+지수 가중 이동 평균(EWMA)을 유지하고, 점수가 가장 좋은 모델을 선택합니다.
+
+- 점수 = 첫 토큰 지연(EWMA) x (1 + ROUTER_ERROR_PENALTY x 에러율(EWMA)), 낮을수록 좋음
+- 기록이 ROUTER_MIN_SAMPLES개보다 적은 모델은 먼저 사용해 봅니다.
+- ROUTER_EXPLORATION_RATE 비율로 무작위 모델을 골라, 느려졌던 모델이
+  회복되었는지 계속 확인합니다.
+- 현재 히스토리가 토큰 예산에 들어가지 않는 모델은 고르지 않습니다.
+
+사용 예시:
+    import router
+
+    model_name = router.choose_model(session.history_tokens)
+    print(router.get_router_stats())
+"""
+
+import random
+import threading
+
+import telemetry
+from config import (
+    MODELS,
+    ROUTER_EWMA_ALPHA,
+    ROUTER_EXPLORATION_RATE,
+    ROUTER_MIN_SAMPLES,
+    ROUTER_ERROR_PENALTY,
+    get_history_token_budget
+)
+
+
+# 모델 성능이 아니라 사용자가 중단한 경우이므로 에러율에 넣지 않음
+_IGNORED_ERRORS = {"KeyboardInterrupt", "CancelledError"}
+
+# 모델별 상태: {모델 이름: {"latency_ms", "error_rate", "samples", "routed"}}
+_state = {}
+_lock = threading.Lock()
+
+
+def _model_names():
+    """자동 선택 대상인 실제 모델 이름 목록."""
+    return [name for name, info in MODELS.items() if not info.get("router")]
+
+
+def _entry(name):
+    """모델 상태를 반환합니다. 없으면 만듭니다. (_lock 안에서 호출)"""
+    if name not in _state:
+        _state[name] = {"latency_ms": None, "error_rate": 0.0, "samples": 0, "routed": 0}
+    return _state[name]
+
+
+def observe(record):
+    """
+    요청 기록 하나를 모델별 EWMA에 반영합니다.
+    telemetry 싱크로 등록되어 모든 API 요청마다 자동으로 호출됩니다.
+
+    Args:
+        record: telemetry 기록 딕셔너리 (model, ttft_ms, error 등)
+    """
+    if record.get("error") in _IGNORED_ERRORS:
+        return
+
+    name = next((n for n in _model_names() if MODELS[n]["id"] == record.get("model")), None)
+    if name is None:
+        return
+
+    failed = record.get("error") is not None
+    latency = record.get("ttft_ms")
+
+    with _lock:
+        entry = _entry(name)
+        entry["samples"] += 1
+        entry["error_rate"] += ROUTER_EWMA_ALPHA * ((1.0 if failed else 0.0) - entry["error_rate"])
+
+        if not failed and latency is not None:
+            if entry["latency_ms"] is None:
+                entry["latency_ms"] = latency
+            else:
+                entry["latency_ms"] += ROUTER_EWMA_ALPHA * (latency - entry["latency_ms"])
+
+
+def _score(entry):
+    """낮을수록 좋은 모델 점수. (_lock 안에서 호출)"""
+    # 성공한 적 없이 실패만 한 모델은 가장 나쁜 점수
+    if entry["latency_ms"] is None:
+        return float("inf")
+    return entry["latency_ms"] * (1 + ROUTER_ERROR_PENALTY * entry["error_rate"])
+
+
+def choose_model(history_tokens=0, exclude=()):
+    """
+    현재 히스토리로 요청할 모델을 고릅니다.
+
+    Args:
+        history_tokens: 보낼 히스토리의 추정 토큰 수
+        exclude: 고르지 않을 모델 이름 목록
+
+    Returns:
+        str: 선택한 모델 이름 (예: "gpt")
+
+    사용 예시:
+        model_name = choose_model(session.history_tokens)
+        model_info = MODELS[model_name]
+    """
+    names = [name for name in _model_names() if name not in exclude] or _model_names()
+
+    # 히스토리가 토큰 예산에 들어가는 모델만 후보 (없으면 예산이 가장 큰 모델)
+    candidates = [name for name in names if get_history_token_budget(name) >= history_tokens]
+    if not candidates:
+        candidates = [max(names, key=get_history_token_budget)]
+
+    with _lock:
+        entries = {name: _entry(name) for name in candidates}
+
+        # 기록이 부족한 모델을 먼저 사용해 봄
+        untried = [name for name in candidates if entries[name]["samples"] < ROUTER_MIN_SAMPLES]
+        if untried:
+            choice = min(untried, key=lambda name: entries[name]["samples"] + entries[name]["routed"])
+        elif random.random() < ROUTER_EXPLORATION_RATE:
+            choice = random.choice(candidates)
+        else:
+            choice = min(candidates, key=lambda name: _score(entries[name]))
+
+        entries[choice]["routed"] += 1
+
+    return choice
+
+
+def get_router_stats():
+    """
+    모델별 자동 선택 상태를 반환합니다.
+
+    Returns:
+        dict: {모델 이름: {latency_ms, error_rate, samples, routed, score}}
+
+    사용 예시:
+        for name, stats in router.get_router_stats().items():
+            print(name, stats["routed"], stats["latency_ms"])
+    """
+    with _lock:
+        return {
+            name: dict(entry, score=_score(entry))
+            for name, entry in _state.items()
+        }
+
+
+def reset_router():
+    """
+    모든 모델 상태를 지웁니다.
+
+    사용 예시:
+        router.reset_router()
+    """
+    with _lock:
+        _state.clear()
+
+
+# 모든 API 요청 결과를 자동으로 반영
+telemetry.add_sink(observe)
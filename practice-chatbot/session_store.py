@@ -0,0 +1,345 @@
+"""
+세션 저장소 모듈
+
+대화 세션을 디스크에 저장하여 프로그램을 다시 시작하거나
+Streamlit 연결이 끊겨도 이어서 대화할 수 있게 합니다.
+
+세션마다 세 개의 파일을 사용합니다.
+- <세션ID>.jsonl : 메시지를 한 줄씩 덧붙이기만 하는 로그 (수정/삭제 없음)
+- <세션ID>.idx   : 살아있는 메시지의 로그 내 위치(8바이트 오프셋) 목록
+- <세션ID>.json  : 모델 이름, 초기화 이후 첫 메시지 번호 등 메타 정보
+
+쓰기는 바로 OS에 전달하고, 디스크 동기화(fsync)는 일정 시간마다 모아서 합니다.
+세션을 다시 열 때는 인덱스 끝부분만 읽어 현재 대화 창(최근 메시지)만
+mmap으로 불러오므로 로그가 아무리 길어도 빠르게 열립니다.
+
+사용 예시:
+    from session_store import get_session_store
+    from chatbot import create_session
+
+    store = get_session_store()
+    session = create_session("gpt", session_id="my-chat", store=store)
+"""
+
+import atexit
+import json
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+from collections import OrderedDict
+
+from config import (
+    MAX_HISTORY_LENGTH,
+    SESSION_STORE_DIR,
+    SESSION_STORE_FSYNC_INTERVAL,
+    SESSION_STORE_MAX_OPEN_FILES
+)
+
+
+# 인덱스 항목 하나: 로그 파일 내 오프셋 (little-endian unsigned 64bit)
+_OFFSET = struct.Struct("<Q")
+
+# 세션 ID로 사용할 수 있는 문자 (파일 이름으로 안전한 문자만)
+_SESSION_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+class _SessionFiles:
+    """세션 하나의 로그/인덱스 파일 핸들."""
+
+    __slots__ = ("log", "index")
+
+    def __init__(self, log_path, index_path):
+        self.log = open(log_path, "ab")
+        # 인덱스는 롤백 시 끝을 잘라내야 하므로 읽기/쓰기 모드로 엶
+        if not os.path.exists(index_path):
+            open(index_path, "wb").close()
+        self.index = open(index_path, "r+b")
+
+    def fsync(self):
+        self.log.flush()
+        self.index.flush()
+        os.fsync(self.log.fileno())
+        os.fsync(self.index.fileno())
+
+    def close(self):
+        self.log.close()
+        self.index.close()
+
+
+class SessionStore:
+    """
+    덧붙이기 전용 로그 기반 세션 저장소.
+
+    여러 스레드에서 동시에 사용해도 안전합니다.
+    열어둔 파일 핸들 수는 max_open_files로 제한됩니다.
+
+    사용 예시:
+        store = SessionStore(".cache/sessions")
+        store.append("my-chat", "user", "안녕!", 7)
+        model, messages = store.load("my-chat")
+    """
+
+    def __init__(self, directory=SESSION_STORE_DIR,
+                 fsync_interval=SESSION_STORE_FSYNC_INTERVAL,
+                 max_open_files=SESSION_STORE_MAX_OPEN_FILES):
+        """
+        Args:
+            directory: 세션 파일을 저장할 폴더
+            fsync_interval: 디스크 동기화 주기 (초)
+            max_open_files: 동시에 열어둘 세션 파일 수
+        """
+        self.directory = directory
+        self.fsync_interval = fsync_interval
+        self.max_open_files = max_open_files
+
+        os.makedirs(directory, exist_ok=True)
+
+        self._files = OrderedDict()   # {세션ID: _SessionFiles} (LRU 순서)
+        self._dirty = set()           # 아직 fsync하지 않은 세션ID
+        self._lock = threading.RLock()
+        self._closed = threading.Event()
+
+        # 주기적으로 모아서 fsync하는 백그라운드 스레드
+        self._flusher = threading.Thread(target=self._flush_loop, daemon=True)
+        self._flusher.start()
+
+    # ------------------------------------------------------------
+    # 파일 관리
+    # ------------------------------------------------------------
+
+    def _path(self, session_id, suffix):
+        if not _SESSION_ID_PATTERN.match(session_id):
+            raise ValueError(f"사용할 수 없는 세션 ID입니다: {session_id!r}")
+        return os.path.join(self.directory, session_id + suffix)
+
+    def _open(self, session_id):
+        """세션 파일 핸들을 가져옵니다. 너무 많이 열려 있으면 오래된 것부터 닫습니다."""
+        files = self._files.get(session_id)
+        if files is not None:
+            self._files.move_to_end(session_id)
+            return files
+
+        files = _SessionFiles(
+            self._path(session_id, ".jsonl"),
+            self._path(session_id, ".idx")
+        )
+        self._files[session_id] = files
+
+        while len(self._files) > self.max_open_files:
+            old_id, old_files = self._files.popitem(last=False)
+            if old_id in self._dirty:
+                old_files.fsync()
+                self._dirty.discard(old_id)
+            old_files.close()
+
+        return files
+
+    def _read_meta(self, session_id):
+        try:
+            with open(self._path(session_id, ".json"), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"model": None, "start": 0}
+
+    def _write_meta(self, session_id, meta):
+        """메타 파일을 임시 파일에 쓴 뒤 교체하여 중간에 깨지지 않게 저장합니다."""
+        path = self._path(session_id, ".json")
+        temp_path = path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+
+    @staticmethod
+    def _index_count(files):
+        files.index.seek(0, os.SEEK_END)
+        return files.index.tell() // _OFFSET.size
+
+    # ------------------------------------------------------------
+    # 쓰기
+    # ------------------------------------------------------------
+
+    def append(self, session_id, role, content, tokens):
+        """
+        메시지를 로그 끝에 덧붙이고 인덱스에 위치를 기록합니다.
+
+        Args:
+            session_id: 세션 ID
+            role: 메시지 역할
+            content: 메시지 내용
+            tokens: 메시지의 추정 토큰 수
+        """
+        line = json.dumps(
+            {"r": role, "c": content, "t": tokens},
+            ensure_ascii=False,
+            separators=(",", ":")
+        ).encode("utf-8") + b"\n"
+
+        with self._lock:
+            files = self._open(session_id)
+
+            offset = files.log.tell()
+            files.log.write(line)
+            files.log.flush()
+
+            files.index.seek(0, os.SEEK_END)
+            files.index.write(_OFFSET.pack(offset))
+            files.index.flush()
+
+            self._dirty.add(session_id)
+
+    def pop(self, session_id):
+        """
+        마지막 메시지를 살아있는 메시지 목록에서 제외합니다. (롤백용)
+        로그는 그대로 두고 인덱스의 마지막 항목만 잘라냅니다.
+
+        Args:
+            session_id: 세션 ID
+        """
+        with self._lock:
+            files = self._open(session_id)
+            count = self._index_count(files)
+            if count > self._read_meta(session_id).get("start", 0):
+                files.index.truncate((count - 1) * _OFFSET.size)
+                self._dirty.add(session_id)
+
+    def clear(self, session_id):
+        """
+        세션의 대화를 초기화합니다.
+        기존 로그는 남겨두고, 이후 메시지부터 대화 창에 포함되도록 표시합니다.
+
+        Args:
+            session_id: 세션 ID
+        """
+        with self._lock:
+            files = self._open(session_id)
+            meta = self._read_meta(session_id)
+            meta["start"] = self._index_count(files)
+            self._write_meta(session_id, meta)
+
+    def set_model(self, session_id, model):
+        """
+        세션의 모델 이름을 저장합니다.
+
+        Args:
+            session_id: 세션 ID
+            model: 모델 이름
+        """
+        with self._lock:
+            meta = self._read_meta(session_id)
+            if meta.get("model") != model:
+                meta["model"] = model
+                self._write_meta(session_id, meta)
+
+    # ------------------------------------------------------------
+    # 읽기
+    # ------------------------------------------------------------
+
+    def exists(self, session_id):
+        """
+        저장된 세션이 있는지 확인합니다.
+
+        Args:
+            session_id: 세션 ID
+
+        Returns:
+            bool: 존재 여부
+        """
+        return os.path.exists(self._path(session_id, ".json"))
+
+    def load(self, session_id, limit=MAX_HISTORY_LENGTH):
+        """
+        저장된 세션의 모델과 최근 메시지를 불러옵니다.
+        인덱스 끝에서 limit개의 위치만 읽고, 로그는 mmap으로 필요한 줄만 읽습니다.
+
+        Args:
+            session_id: 세션 ID
+            limit: 불러올 최대 메시지 수
+
+        Returns:
+            tuple: (모델 이름 또는 None, [(role, content, tokens), ...])
+        """
+        with self._lock:
+            meta = self._read_meta(session_id)
+            files = self._open(session_id)
+            files.log.flush()
+
+            count = self._index_count(files)
+            first = max(meta.get("start", 0), count - limit)
+            if first >= count:
+                return meta.get("model"), []
+
+            files.index.seek(first * _OFFSET.size)
+            data = files.index.read((count - first) * _OFFSET.size)
+            offsets = [item[0] for item in _OFFSET.iter_unpack(data)]
+
+            messages = []
+            with open(self._path(session_id, ".jsonl"), "rb") as log:
+                with mmap.mmap(log.fileno(), 0, access=mmap.ACCESS_READ) as view:
+                    for offset in offsets:
+                        end = view.find(b"\n", offset)
+                        record = json.loads(view[offset:end])
+                        messages.append((record["r"], record["c"], record["t"]))
+
+            return meta.get("model"), messages
+
+    # ------------------------------------------------------------
+    # 동기화 및 종료
+    # ------------------------------------------------------------
+
+    def flush(self):
+        """아직 디스크에 동기화하지 않은 세션 파일을 fsync합니다."""
+        with self._lock:
+            for session_id in list(self._dirty):
+                files = self._files.get(session_id)
+                if files is not None:
+                    files.fsync()
+            self._dirty.clear()
+
+    def _flush_loop(self):
+        while not self._closed.wait(self.fsync_interval):
+            self.flush()
+
+    def close(self):
+        """남은 내용을 동기화하고 모든 파일을 닫습니다."""
+        if self._closed.is_set():
+            return
+        self._closed.set()
+
+        with self._lock:
+            self.flush()
+            for files in self._files.values():
+                files.close()
+            self._files.clear()
+
+
+# ============================================================
+# 기본 저장소
+# ============================================================
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_session_store():
+    """
+    프로세스 전체에서 공유하는 기본 세션 저장소를 반환합니다.
+    프로그램 종료 시 자동으로 동기화 후 닫힙니다.
+
+    Returns:
+        SessionStore: 기본 세션 저장소
+
+    사용 예시:
+        store = get_session_store()
+    """
+    global _default_store
+
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = SessionStore()
+            atexit.register(_default_store.close)
+        return _default_store
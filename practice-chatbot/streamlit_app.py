@@ -1,34 +1,102 @@
 import streamlit as st
 import base64
 import os
+import threading
+import time
+import uuid
+from itertools import islice
 
 from config import (
     get_api_key,
     MODELS,
     DEFAULT_MODEL,
-    ERROR_MESSAGES
+    ERROR_MESSAGES,
+    SESSION_STORE_ENABLED,
+    CHAT_PAGE_SIZE,
+    CHAT_RENDER_INTERVAL
 )
 from chatbot import (
+    CancelToken,
     create_client,
+    start_warm_up,
     validate_api_key,
     create_session,
     send_message,
+    switch_model,
     clear_session,
+    search_history,
     get_current_model_name
 )
+from session_store import get_session_store
+from turn_archive import make_snippet
+import coalesce
+import context_builder
+import model_catalog
+import telemetry
 
 
 # ============================================================
 # 유틸리티 함수
 # ============================================================
 
+# Streamlit은 입력이 있을 때마다 스크립트 전체를 다시 실행하므로,
+# 파일은 st.cache_data로 한 번만 읽고 수정 시각이 바뀌었을 때만 다시 읽습니다.
+
+def _file_version(path):
+    """파일 수정 시각을 반환합니다. 파일이 없으면 None. (캐시 키로 사용)"""
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+@st.cache_data(show_spinner=False)
+def _read_file(path, version):
+    """파일 내용을 bytes로 읽습니다. version이 같으면 캐시된 값을 반환합니다."""
+    if version is None:
+        return None
+    with open(path, "rb") as f:
+        return f.read()
+
+
+@st.cache_data(show_spinner=False)
+def _encode_base64(path, version):
+    """base64 인코딩 결과를 캐시합니다."""
+    data = _read_file(path, version)
+    return base64.b64encode(data).decode() if data is not None else None
+
+
 def get_base64_img(path):
     """이미지 파일을 base64로 인코딩합니다."""
-    if os.path.exists(path):
-        with open(path, "rb") as f:
-            data = f.read()
-        return base64.b64encode(data).decode()
-    return None
+    return _encode_base64(path, _file_version(path))
+
+
+def get_avatar(model):
+    """
+    모델 아이콘 이미지를 반환합니다.
+
+    Args:
+        model: 모델 이름
+
+    Returns:
+        bytes 또는 None: 이미지 데이터 (파일이 없으면 None, 기본 아바타 사용)
+    """
+    path = f"assets/{model}.png"
+    return _read_file(path, _file_version(path))
+
+
+def load_css(path):
+    """
+    CSS 파일을 <style> 태그 문자열로 반환합니다.
+
+    Args:
+        path: CSS 파일 경로
+
+    Returns:
+        str: 페이지에 넣을 <style> 태그 (파일이 없으면 빈 문자열)
+    """
+    data = _read_file(path, _file_version(path))
+    return f"<style>{data.decode('utf-8')}</style>" if data is not None else ""
 
 
 # ============================================================
@@ -42,24 +110,50 @@ st.set_page_config(
 )
 
 # CSS 로드
-with open("style.css", "r", encoding="utf-8") as f:
-    st.markdown(f"<style>{f.read()}</style>", unsafe_allow_html=True)
+st.markdown(load_css("style.css"), unsafe_allow_html=True)
 
 
 # ============================================================
 # 세션 상태 초기화
 # ============================================================
 
+def load_chat_session():
+    """
+    대화 세션을 만듭니다.
+    세션 저장소가 켜져 있으면 URL의 sid 값으로 저장된 대화를 불러오므로,
+    새로고침하거나 다시 접속해도 대화가 이어집니다.
+    """
+    if not SESSION_STORE_ENABLED:
+        # 브라우저 세션이 끝나도 close_session()을 부를 곳이 없으므로
+        # 임시 보관 파일이 쌓이지 않게 저장하지 않는 세션은 보관하지 않음
+        return create_session(DEFAULT_MODEL, archive=False)
+
+    session_id = st.query_params.get("sid")
+    if not session_id:
+        session_id = uuid.uuid4().hex
+        st.query_params["sid"] = session_id
+
+    try:
+        return create_session(session_id=session_id, store=get_session_store())
+    except ValueError:
+        # 잘못된 sid 값이면 새 세션으로 시작
+        session_id = uuid.uuid4().hex
+        st.query_params["sid"] = session_id
+        return create_session(session_id=session_id, store=get_session_store())
+
+
 def init_session_state():
     """Streamlit 세션 상태를 초기화합니다."""
     if "client" not in st.session_state:
         st.session_state.client = None
     if "chat_session" not in st.session_state:
-        st.session_state.chat_session = create_session(DEFAULT_MODEL)
+        st.session_state.chat_session = load_chat_session()
     if "api_key_valid" not in st.session_state:
         st.session_state.api_key_valid = False
     if "error_message" not in st.session_state:
         st.session_state.error_message = None
+    if "visible_messages" not in st.session_state:
+        st.session_state.visible_messages = CHAT_PAGE_SIZE
 
 init_session_state()
 
@@ -69,7 +163,11 @@ init_session_state()
 # ============================================================
 
 def setup_api_client():
-    """API 키를 검증하고 클라이언트를 생성합니다."""
+    """
+    API 키를 검증하고 클라이언트를 생성합니다.
+    검증하는 동안 백그라운드에서 API 서버 연결을 미리 열어 두어,
+    화면을 그리고 사용자가 입력하는 사이에 첫 메시지를 보낼 준비를 마칩니다.
+    """
     if st.session_state.api_key_valid and st.session_state.client:
         return True
 
@@ -80,12 +178,15 @@ def setup_api_client():
         except Exception:
             pass
 
+    if api_key:
+        start_warm_up()
     is_valid, error = validate_api_key(api_key)
     if not is_valid:
         st.session_state.api_key_valid = False
         st.session_state.error_message = error
         return False
 
+    # 같은 키를 쓰는 모든 브라우저 세션이 하나의 클라이언트(연결 풀)를 공유
     st.session_state.client = create_client(api_key)
     st.session_state.api_key_valid = True
     st.session_state.error_message = None
@@ -129,7 +230,8 @@ def render_sidebar():
 
         selected_model = model_options[selected_index]
         if selected_model != st.session_state.chat_session["model"]:
-            st.session_state.chat_session["model"] = selected_model
+            # 새 모델의 토큰 예산에 맞게 히스토리도 함께 정리
+            switch_model(st.session_state.chat_session, selected_model)
             st.rerun()
 
         # 모델 설명
@@ -150,23 +252,196 @@ def render_sidebar():
         # 대화 초기화
         if st.button("New Conversation", use_container_width=True):
             clear_session(st.session_state.chat_session)
+            st.session_state.visible_messages = CHAT_PAGE_SIZE
             st.rerun()
 
+        render_search_panel()
+
         st.divider()
 
+
+def render_search_panel():
+    """현재 대화와 지난 대화(보관소)를 검색하는 입력창과 결과를 사이드바에 표시합니다."""
+    query = st.text_input("Search history", placeholder="Search past messages...")
+    if not query.strip():
+        return
+
+    started = time.perf_counter()
+    hits = search_history(st.session_state.chat_session, query)
+    elapsed = time.perf_counter() - started
+
+    st.caption(f"{len(hits)} result(s) · {elapsed * 1000:.1f} ms")
+    for hit in hits:
+        speaker = "You" if hit["role"] == "user" else "AI"
+        when = "current" if hit["archived_at"] is None else time.strftime(
+            "%m-%d %H:%M", time.localtime(hit["archived_at"])
+        )
+        st.markdown(f"**{speaker}** · {when}  \n{make_snippet(hit['content'], query)}")
+
+
+def render_sidebar_status():
+    """
+    사이드바 아래쪽의 상태와 통계를 렌더링합니다.
+    응답을 받은 뒤 다시 실행(st.rerun)하지 않아도 최신 값이 보이도록
+    채팅 영역을 그린 다음에 호출합니다.
+    """
+    with st.sidebar:
         # 상태 표시
         if st.session_state.api_key_valid:
             st.markdown('<div class="model-chip" style="background: #28a745;">System Online</div>', unsafe_allow_html=True)
         else:
             st.markdown('<div class="model-chip" style="background: #dc3545;">System Offline</div>', unsafe_allow_html=True)
 
-        st.caption(f"Messages: {len(st.session_state.chat_session['messages'])}")
+        chat_session = st.session_state.chat_session
+        st.caption(f"Messages: {len(chat_session['messages'])} · Tokens: ~{chat_session['history_tokens']:,}")
+
+        render_stats_panel()
+
+
+def render_stats_panel():
+    """모델별 최근 응답 속도 통계를 사이드바에 표시합니다."""
+    stats = telemetry.get_stats()
+
+    with st.expander("Performance"):
+        if not stats:
+            st.caption("No requests yet.")
+            return
+
+        names = {info["id"]: info["name"] for info in MODELS.values()}
+        rows = []
+        for model_id, model_stats in stats.items():
+            rows.append({
+                "Model": names.get(model_id, model_id),
+                "Requests": model_stats["requests"],
+                "Errors": f"{model_stats['error_rate']:.0%}",
+                "TTFT p50": _format_ms(model_stats["ttft_ms"]["p50"]),
+                "TTFT p95": _format_ms(model_stats["ttft_ms"]["p95"]),
+                "Total p50": _format_ms(model_stats["total_ms"]["p50"]),
+                "Total p95": _format_ms(model_stats["total_ms"]["p95"]),
+                "Total p99": _format_ms(model_stats["total_ms"]["p99"]),
+                "Tok/s": f"{model_stats['tokens_per_s']:.1f}" if model_stats["tokens_per_s"] else "-",
+                "Cached": f"{model_stats['cache_hit_ratio']:.0%}",
+                "Cost": _format_cost(model_catalog.estimate_cost(
+                    model_id, model_stats["prompt_tokens"], model_stats["completion_tokens"]
+                ))
+            })
+        st.dataframe(rows, hide_index=True, use_container_width=True)
+
+        coalesced = coalesce.get_coalesce_stats()
+        if coalesced["coalesced"]:
+            st.caption(f"Coalesced: {coalesced['coalesced']} of {coalesced['calls']} requests"
+                       f" ({coalesced['coalesce_ratio']:.0%})")
+
+        context = context_builder.get_context_stats()
+        if context["requests"]:
+            st.caption(f"Retrieval: {context['sent_tokens']:,} of {context['window_tokens']:,} prompt tokens sent"
+                       f" ({context['saved_ratio']:.0%} saved)")
+
+
+def _format_ms(value):
+    """밀리초 값을 표시용 문자열로 변환합니다."""
+    return f"{value:,.0f} ms" if value is not None else "-"
+
+
+def _format_cost(value):
+    """예상 비용(USD)을 표시용 문자열로 변환합니다."""
+    return f"${value:,.4f}" if value is not None else "-"
 
 
 # ============================================================
 # 메인 채팅 UI
 # ============================================================
 
+def get_visible_messages(messages, limit):
+    """
+    화면에 표시할 최근 메시지들을 반환합니다.
+
+    Args:
+        messages: 전체 메시지 (deque 또는 list)
+        limit: 표시할 최대 메시지 수
+
+    Returns:
+        tuple: (숨겨진 이전 메시지 수, 표시할 메시지 리스트)
+    """
+    hidden = max(0, len(messages) - limit)
+    return hidden, list(islice(messages, hidden, None))
+
+
+def show_earlier_messages():
+    """"Show earlier" 버튼 콜백: 이전 메시지를 한 페이지 더 표시합니다."""
+    st.session_state.visible_messages += CHAT_PAGE_SIZE
+
+
+def stop_generation():
+    """"Stop" 버튼 콜백: 취소한 응답 대신 안내 문구를 표시합니다."""
+    st.session_state.notice = ERROR_MESSAGES["cancelled"]
+
+
+def stream_reply(placeholder, user_input):
+    """
+    응답을 작업 스레드에서 받아 placeholder에 표시합니다.
+
+    화면은 CHAT_RENDER_INTERVAL마다 갱신하며, Streamlit은 화면을 갱신할 때
+    "Stop" 버튼이나 새 입력이 있으면 이번 실행을 중단(RerunException)합니다.
+    그러면 CancelToken으로 응답을 받던 연결을 끊고, send_message가 사용자 메시지를
+    롤백할 때까지 기다린 뒤 다음 실행으로 넘어갑니다.
+
+    Args:
+        placeholder: 응답을 표시할 st.empty()
+        user_input: 사용자가 입력한 메시지
+
+    Returns:
+        tuple: (성공 여부, 응답 또는 에러 메시지)
+    """
+    # 작업 스레드에서는 st.session_state를 사용할 수 없으므로 미리 꺼내 둠
+    client = st.session_state.client
+    chat_session = st.session_state.chat_session
+    cancel = CancelToken()
+    streamed = []
+    outcome = {}
+    done = threading.Event()
+
+    def run():
+        try:
+            outcome["result"] = send_message(
+                client, chat_session, user_input, on_delta=streamed.append, cancel=cancel
+            )
+        except Exception as e:
+            outcome["error"] = e
+        finally:
+            done.set()
+
+    threading.Thread(target=run, daemon=True).start()
+    try:
+        # 첫 토큰이 오기 전까지는 안내 문구, 이후에는 받은 만큼 표시
+        while not done.wait(CHAT_RENDER_INTERVAL):
+            if streamed:
+                placeholder.markdown("".join(streamed) + "▌")
+            else:
+                placeholder.caption("Processing...")
+    except BaseException:
+        cancel.cancel()
+        done.wait()
+        raise
+
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome["result"]
+
+
+def render_message(role, content, avatar=None):
+    """
+    메시지 하나를 렌더링합니다.
+
+    Args:
+        role: "user" 또는 "assistant"
+        content: 메시지 내용 (마크다운)
+        avatar: 아바타 이미지 (None이면 기본 아바타)
+    """
+    with st.chat_message(role, avatar=avatar):
+        st.markdown(content)
+
+
 def render_chat():
     """메인 채팅 UI를 렌더링합니다."""
     # API 키 오류 시
@@ -177,45 +452,55 @@ def render_chat():
                 <p style="color: white;">{st.session_state.error_message or ERROR_MESSAGES["no_api_key"]}</p>
             </div>
         """, unsafe_allow_html=True)
-        st.stop()
+        return
 
     # 채팅 영역
     chat_container = st.container()
+    avatar = get_avatar(st.session_state.chat_session["model"])
 
     with chat_container:
-        for message in st.session_state.chat_session["messages"]:
+        # 최근 메시지만 표시하여, 대화가 길어져도 다시 실행하는 비용이 늘지 않게 함
+        hidden, messages = get_visible_messages(
+            st.session_state.chat_session["messages"],
+            st.session_state.visible_messages
+        )
+        if hidden:
+            st.button(
+                f"Show earlier ({hidden})",
+                on_click=show_earlier_messages,
+                use_container_width=True
+            )
+
+        for message in messages:
             role = message["role"]
-            content = message["content"]
-            
-            # 아바타 설정
-            avatar = None
-            if role == "assistant":
-                avatar = f"assets/{st.session_state.chat_session['model']}.png"
-            
-            with st.chat_message(role, avatar=avatar):
-                st.markdown(content)
+            render_message(role, message["content"], avatar if role == "assistant" else None)
+
+    # 직전 실행에서 응답 생성을 중지했으면 안내
+    if notice := st.session_state.pop("notice", None):
+        st.toast(notice)
 
     # 사용자 입력
     if user_input := st.chat_input("Message Nexus AI..."):
         # 사용자 메시지 표시
-        with st.chat_message("user"):
-            st.markdown(user_input)
+        render_message("user", user_input)
 
         # AI 응답 생성
-        with st.chat_message("assistant", avatar=f"assets/{st.session_state.chat_session['model']}.png"):
-            with st.spinner("Processing..."):
-                success, response = send_message(
-                    st.session_state.client,
-                    st.session_state.chat_session,
-                    user_input
-                )
+        # (응답을 받은 뒤 st.rerun()으로 전체를 다시 그리지 않고, 여기 그린 내용을 그대로 둠)
+        with st.chat_message("assistant", avatar=avatar):
+            placeholder = st.empty()
+            placeholder.caption("Processing...")
+
+            # 응답 생성 중에만 보이는 중지 버튼
+            stop = st.empty()
+            stop.button("Stop", on_click=stop_generation, key="stop_generation")
+
+            success, response = stream_reply(placeholder, user_input)
+            stop.empty()
 
             if success:
-                st.markdown(response)
+                placeholder.markdown(response)
             else:
-                st.error(response)
-
-        st.rerun()
+                placeholder.error(response)
 
 
 # ============================================================
@@ -227,6 +512,7 @@ def main():
     setup_api_client()
     render_sidebar()
     render_chat()
+    render_sidebar_status()
 
 if __name__ == "__main__":
     main()
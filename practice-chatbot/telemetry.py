@@ -0,0 +1,338 @@
+"""
+요청 성능 측정(텔레메트리) 모듈
+
+API 호출마다 지연 시간과 토큰 사용량을 기록하고, 모델별 최근 통계를 제공합니다.
+느린 원인이 우리 코드인지, 네트워크인지, 모델인지 구분하는 데 사용합니다.
+
+기록 항목:
+- connect_ms: 요청 시작부터 응답 헤더를 받을 때까지 (스트리밍 요청만)
+- ttft_ms: 요청 시작부터 첫 토큰을 받을 때까지 (Time To First Token)
+- total_ms: 요청 시작부터 응답 완료까지
+- prompt_tokens / completion_tokens / tokens_per_s
+- cached_tokens: 입력 토큰 중 제공자 쪽 프롬프트 캐시에서 읽은 토큰 수
+- model, error (실패 시 예외 클래스 이름)
+
+기록은 등록된 싱크(sink)에도 전달되므로 파일이나 외부 시스템으로 내보낼 수 있습니다.
+
+사용 예시:
+    import telemetry
+
+    telemetry.add_sink(telemetry.JsonlSink("requests.jsonl"))
+    ...
+    print(telemetry.get_stats())
+"""
+
+import json
+import threading
+import time
+from collections import deque
+
+from config import TELEMETRY_WINDOW
+
+
+# 모델별 최근 기록: {모델 ID: deque[기록 딕셔너리]}
+_records = {}
+# 최근 경쟁 요청 결과: deque[(주 모델 ID, 보조 요청 여부, 이긴 모델 ID 또는 None)]
+_races = deque(maxlen=TELEMETRY_WINDOW)
+_sinks = []
+_lock = threading.Lock()
+
+
+class RequestTimer:
+    """
+    API 요청 하나의 시간을 재는 타이머.
+    start_request()로 만들고, 요청이 끝나면 finish()를 호출합니다.
+
+    사용 예시:
+        timer = telemetry.start_request("openai/gpt-4o-mini")
+        stream = client.chat.completions.create(...)
+        timer.mark_connected()
+        ...첫 조각 도착 시 timer.mark_first_token()
+        timer.finish(usage=usage)
+    """
+
+    __slots__ = ("model", "started", "connected", "first_token", "extra", "record")
+
+    def __init__(self, model):
+        self.model = model
+        self.started = time.perf_counter()
+        self.connected = None
+        self.first_token = None
+        self.extra = {}
+        self.record = None
+
+    def mark_connected(self):
+        """응답 헤더를 받은 시점을 기록합니다."""
+        if self.connected is None:
+            self.connected = time.perf_counter()
+
+    def mark_first_token(self):
+        """첫 토큰을 받은 시점을 기록합니다."""
+        if self.first_token is None:
+            self.first_token = time.perf_counter()
+
+    def finish(self, usage=None, error=None):
+        """
+        요청을 마치고 기록을 저장합니다.
+        여러 번 호출해도 처음 한 번만 기록됩니다.
+
+        Args:
+            usage: API 응답의 usage 객체 (없으면 None)
+            error: 실패한 경우 발생한 예외
+
+        Returns:
+            dict: 저장한 기록
+        """
+        if self.record is not None:
+            return self.record
+
+        ended = time.perf_counter()
+        total_ms = (ended - self.started) * 1000
+
+        def elapsed_ms(point):
+            return (point - self.started) * 1000 if point is not None else None
+
+        # 스트리밍이 아니면 전체 응답이 도착한 시점이 첫 토큰 시점
+        ttft_ms = elapsed_ms(self.first_token)
+        if ttft_ms is None and error is None:
+            ttft_ms = total_ms
+
+        prompt_tokens = getattr(usage, "prompt_tokens", None)
+        completion_tokens = getattr(usage, "completion_tokens", None)
+        cached_tokens = getattr(getattr(usage, "prompt_tokens_details", None), "cached_tokens", None)
+
+        # 생성 속도: 첫 토큰 이후 구간 기준 (구간이 없으면 전체 시간 기준)
+        tokens_per_s = None
+        if completion_tokens:
+            generation_s = (total_ms - (ttft_ms or 0)) / 1000
+            if generation_s <= 0:
+                generation_s = total_ms / 1000
+            if generation_s > 0:
+                tokens_per_s = completion_tokens / generation_s
+
+        record = {
+            "timestamp": time.time(),
+            "model": self.model,
+            "connect_ms": elapsed_ms(self.connected),
+            "ttft_ms": ttft_ms,
+            "total_ms": total_ms,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "cached_tokens": cached_tokens,
+            "tokens_per_s": tokens_per_s,
+            "error": type(error).__name__ if error is not None else None
+        }
+        record.update(self.extra)
+
+        self.record = record
+        _store(record)
+        return record
+
+
+def start_request(model):
+    """
+    API 요청 측정을 시작합니다.
+
+    Args:
+        model: OpenRouter 모델 ID
+
+    Returns:
+        RequestTimer: 요청 타이머
+    """
+    return RequestTimer(model)
+
+
+def _store(record):
+    """기록을 모델별 최근 기록에 추가하고 싱크에 전달합니다."""
+    with _lock:
+        if record["model"] not in _records:
+            _records[record["model"]] = deque(maxlen=TELEMETRY_WINDOW)
+        _records[record["model"]].append(record)
+        sinks = list(_sinks)
+
+    # 싱크 오류가 채팅을 방해하지 않도록 무시
+    for sink in sinks:
+        try:
+            sink(record)
+        except Exception:
+            pass
+
+
+# ============================================================
+# 통계
+# ============================================================
+
+def _percentile(sorted_values, ratio):
+    """정렬된 값 목록의 백분위수 (최근접 순위 방식)."""
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(ratio * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def _summarize(values):
+    values = sorted(v for v in values if v is not None)
+    return {
+        "p50": _percentile(values, 0.50),
+        "p95": _percentile(values, 0.95),
+        "p99": _percentile(values, 0.99)
+    }
+
+
+def get_stats():
+    """
+    모델별 최근 요청 통계를 반환합니다. (최근 TELEMETRY_WINDOW개 기준)
+
+    Returns:
+        dict: {모델 ID: {
+            requests, errors, error_rate,
+            ttft_ms: {p50, p95, p99}, total_ms: {p50, p95, p99},
+            tokens_per_s, prompt_tokens, completion_tokens,
+            cached_tokens, cache_hit_ratio (입력 토큰 중 캐시에서 읽은 비율)
+        }}
+
+    사용 예시:
+        for model, stats in telemetry.get_stats().items():
+            print(model, stats["total_ms"]["p95"])
+    """
+    with _lock:
+        snapshot = {model: list(records) for model, records in _records.items()}
+
+    stats = {}
+    for model, records in snapshot.items():
+        ok = [r for r in records if r["error"] is None]
+        speeds = [r["tokens_per_s"] for r in ok if r["tokens_per_s"] is not None]
+        prompt_tokens = sum(r["prompt_tokens"] or 0 for r in ok)
+        cached_tokens = sum(r["cached_tokens"] or 0 for r in ok)
+
+        stats[model] = {
+            "requests": len(records),
+            "errors": len(records) - len(ok),
+            "error_rate": (len(records) - len(ok)) / len(records),
+            "ttft_ms": _summarize(r["ttft_ms"] for r in ok),
+            "total_ms": _summarize(r["total_ms"] for r in ok),
+            "tokens_per_s": sum(speeds) / len(speeds) if speeds else None,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": sum(r["completion_tokens"] or 0 for r in ok),
+            "cached_tokens": cached_tokens,
+            "cache_hit_ratio": cached_tokens / prompt_tokens if prompt_tokens else 0.0
+        }
+
+    return stats
+
+
+def reset_stats():
+    """
+    모든 기록을 지웁니다.
+
+    사용 예시:
+        telemetry.reset_stats()
+    """
+    with _lock:
+        _records.clear()
+        _races.clear()
+
+
+# ============================================================
+# 경쟁(race) 요청 통계
+# ============================================================
+
+def record_race(primary, hedged, winner):
+    """
+    경쟁 요청(send_message_race) 하나의 결과를 기록합니다.
+
+    Args:
+        primary: 주 모델 ID
+        hedged: 보조(hedge) 요청을 보냈는지 여부
+        winner: 응답이 채택된 모델 ID (모두 실패하면 None)
+    """
+    with _lock:
+        _races.append((primary, hedged, winner))
+
+
+def get_race_stats():
+    """
+    최근 경쟁 요청 통계를 반환합니다. (최근 TELEMETRY_WINDOW개 기준)
+
+    Returns:
+        dict: {
+            races: 경쟁 요청 수,
+            hedged / hedge_rate: 보조 요청을 보낸 수와 비율,
+            hedge_wins / hedge_win_rate: 보조 요청을 보낸 경우 중 보조 모델이 이긴 수와 비율,
+            failures: 모든 모델이 실패한 수,
+            wins: {모델 ID: 이긴 횟수}
+        }
+
+    사용 예시:
+        stats = telemetry.get_race_stats()
+        print(f"보조 요청 비율: {stats['hedge_rate']:.0%}")
+    """
+    with _lock:
+        races = list(_races)
+
+    hedged = [race for race in races if race[1]]
+    hedge_wins = sum(1 for primary, _, winner in hedged if winner is not None and winner != primary)
+
+    wins = {}
+    for _, _, winner in races:
+        if winner is not None:
+            wins[winner] = wins.get(winner, 0) + 1
+
+    return {
+        "races": len(races),
+        "hedged": len(hedged),
+        "hedge_rate": len(hedged) / len(races) if races else 0.0,
+        "hedge_wins": hedge_wins,
+        "hedge_win_rate": hedge_wins / len(hedged) if hedged else 0.0,
+        "failures": sum(1 for race in races if race[2] is None),
+        "wins": wins
+    }
+
+
+# ============================================================
+# 싱크 (기록 내보내기)
+# ============================================================
+
+def add_sink(sink):
+    """
+    요청이 기록될 때마다 호출될 싱크를 등록합니다.
+
+    Args:
+        sink: 기록 딕셔너리 하나를 받는 함수
+
+    사용 예시:
+        telemetry.add_sink(lambda record: print(record["total_ms"]))
+    """
+    with _lock:
+        _sinks.append(sink)
+
+
+def remove_sink(sink):
+    """
+    등록한 싱크를 제거합니다.
+
+    Args:
+        sink: add_sink로 등록했던 함수
+    """
+    with _lock:
+        if sink in _sinks:
+            _sinks.remove(sink)
+
+
+class JsonlSink:
+    """
+    기록을 JSON Lines 파일에 한 줄씩 덧붙이는 싱크.
+
+    사용 예시:
+        telemetry.add_sink(telemetry.JsonlSink("requests.jsonl"))
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def __call__(self, record):
+        line = json.dumps(record, ensure_ascii=False)
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
@@ -0,0 +1,434 @@
+"""
+지난 대화 보관(archive) 모듈
+
+히스토리가 최대 메시지 수(MAX_HISTORY_LENGTH)나 토큰 예산을 넘어 밀려난 메시지
+(히스토리 요약으로 대체된 원래 메시지 포함)를 버리지 않고 세션별 SQLite 파일에 보관하며,
+한국어도 찾을 수 있도록 글자 2-gram 역색인으로 검색합니다.
+
+- 본문: ARCHIVE_BLOCK_MESSAGES개씩 묶어 zlib로 압축한 블록으로 저장
+  (블록이 다 차기 전까지는 압축하지 않은 채로 보관)
+- 색인: 단어마다 글자 2-gram(소문자, 단어 끝은 "\\0"을 붙여 한 글자 검색도 가능)
+  → 블록 번호. 블록을 만들 때마다 추가로 갱신
+  (메시지 단위보다 색인이 훨씬 작고, 결과 확인은 어차피 블록을 풀어서 함)
+- 검색: 아직 블록으로 묶지 않은 메시지를 먼저 확인한 뒤, 검색어의 2-gram을 모두 포함하는
+  블록을 색인으로 찾아 최근 블록부터 풀어 실제로 검색어를 포함하는 메시지를 찾음
+
+보관 내용은 메모리에 두지 않고 필요할 때 디스크에서 읽습니다.
+저장하는 세션(session_id)은 ARCHIVE_DIR에, 저장하지 않는 세션은 임시 폴더에 보관하며
+임시 폴더는 프로그램 종료 시 삭제됩니다.
+
+사용 예시:
+    from turn_archive import TurnArchive
+
+    archive = TurnArchive.for_session("my-chat")
+    archive.add(message)          # 히스토리에서 밀려난 Message
+    archive.flush()               # 디스크에 기록 (chatbot이 히스토리 정리 후 호출)
+    for hit in archive.search("파이썬 리스트"):
+        print(hit["role"], hit["content"])
+"""
+
+import atexit
+import json
+import os
+import re
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+import weakref
+import zlib
+
+from config import (
+    ARCHIVE_BLOCK_MESSAGES,
+    ARCHIVE_DIR,
+    ARCHIVE_SEARCH_LIMIT
+)
+
+
+# 단어 구분 (공백)
+_WORD_SPLIT = re.compile(r"\s+")
+
+# 단어 끝 표시: 한 글자 검색어도 "그 글자로 시작하는 2-gram"으로 찾을 수 있게 함
+_WORD_END = "\0"
+
+# 열려 있는 보관소 (종료 시 남은 메시지를 기록)
+_archives = weakref.WeakSet()
+_temp_dir = None
+_temp_dir_lock = threading.Lock()
+
+
+def _words(text):
+    """텍스트를 소문자 단어 목록으로 나눕니다."""
+    return [word for word in _WORD_SPLIT.split(text.lower()) if word]
+
+
+def make_grams(text):
+    """
+    색인에 넣을 글자 2-gram 집합을 만듭니다.
+    단어 경계를 넘는 2-gram은 만들지 않습니다.
+
+    Args:
+        text: 메시지 내용
+
+    Returns:
+        set: 2-gram 문자열 집합
+
+    사용 예시:
+        make_grams("파이썬 리스트")  # {"파이", "이썬", "썬\\0", "리스", "스트", "트\\0"}
+    """
+    grams = set()
+    for word in _words(text):
+        word += _WORD_END
+        for i in range(len(word) - 1):
+            grams.add(word[i:i + 2])
+    return grams
+
+
+def make_snippet(content, query, width=60):
+    """
+    검색 결과에 표시할, 검색어 주변의 짧은 발췌를 만듭니다.
+
+    Args:
+        content: 메시지 내용
+        query: 검색어
+        width: 발췌 길이 (글자)
+
+    Returns:
+        str: 한 줄 발췌 (앞뒤가 잘렸으면 "...")
+    """
+    text = " ".join(content.split())
+    words = _words(query)
+    position = text.lower().find(words[0]) if words else -1
+    start = max(0, position - width // 3) if position > 0 else 0
+    end = start + width
+
+    snippet = text[start:end]
+    if start > 0:
+        snippet = "..." + snippet
+    if end < len(text):
+        snippet += "..."
+    return snippet
+
+
+def _temp_directory():
+    """저장하지 않는 세션의 보관 파일을 둘 임시 폴더 (프로그램 종료 시 삭제)."""
+    global _temp_dir
+
+    with _temp_dir_lock:
+        if _temp_dir is None:
+            import tempfile
+
+            _temp_dir = tempfile.mkdtemp(prefix="chatbot-archive-")
+        return _temp_dir
+
+
+class TurnArchive:
+    """
+    세션 하나의 지난 대화 보관소.
+
+    메모리에는 아직 기록하지 않은 메시지 목록만 두며,
+    SQLite 연결도 기록/검색할 때만 열어 세션이 많아도 파일 핸들이 쌓이지 않습니다.
+    여러 스레드에서 동시에 사용해도 안전합니다.
+
+    사용 예시:
+        archive = TurnArchive(".cache/archive/my-chat.sqlite3")
+        archive.add(message)
+        archive.flush()
+        hits = archive.search("날씨")
+    """
+
+    __slots__ = ("path", "temporary", "_pending", "_lock", "_file_lock", "_ready", "__weakref__")
+
+    def __init__(self, path, temporary=False):
+        """
+        Args:
+            path: SQLite 파일 경로
+            temporary: True면 close() 때 파일을 삭제
+        """
+        self.path = path
+        self.temporary = temporary
+        self._pending = []      # 아직 기록하지 않은 (role, content)
+        self._lock = threading.Lock()           # _pending 보호 (add가 디스크 기록을 기다리지 않도록 따로 둠)
+        self._file_lock = threading.Lock()      # 파일 읽기/쓰기 보호
+        self._ready = False     # 테이블을 만들었는지 여부
+        _archives.add(self)
+
+    @classmethod
+    def for_session(cls, session_id=None, directory=ARCHIVE_DIR):
+        """
+        세션의 보관소를 만듭니다. 파일은 처음 기록할 때 만들어집니다.
+
+        Args:
+            session_id: 세션 ID (None이면 임시 보관소)
+            directory: 저장하는 세션의 보관 파일 폴더
+
+        Returns:
+            TurnArchive: 보관소
+        """
+        if session_id is None:
+            return cls(os.path.join(_temp_directory(), f"{uuid.uuid4().hex}.sqlite3"), temporary=True)
+        return cls(os.path.join(directory, f"{session_id}.sqlite3"))
+
+    # ------------------------------------------------------------
+    # 파일 관리
+    # ------------------------------------------------------------
+
+    def _connect(self):
+        """SQLite 연결을 엽니다. 처음이면 폴더와 테이블을 만듭니다. (파일 잠금 안에서 호출)"""
+        if not self._ready:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+        db = sqlite3.connect(self.path)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        if not self._ready:
+            db.executescript(
+                "CREATE TABLE IF NOT EXISTS messages ("
+                " id INTEGER PRIMARY KEY,"
+                " role TEXT NOT NULL,"
+                " archived_at REAL NOT NULL,"
+                " block INTEGER,"            # 압축 블록 번호 (블록으로 묶기 전에는 NULL)
+                " content TEXT);"            # 블록으로 묶기 전의 본문 (묶은 뒤에는 NULL)
+                "CREATE INDEX IF NOT EXISTS idx_messages_block ON messages(block);"
+                "CREATE TABLE IF NOT EXISTS blocks ("
+                " id INTEGER PRIMARY KEY,"
+                " raw_size INTEGER NOT NULL,"
+                " data BLOB NOT NULL);"     # zlib 압축한 [[메시지 번호, 본문], ...]
+                "CREATE TABLE IF NOT EXISTS postings ("
+                " gram TEXT NOT NULL,"
+                " block INTEGER NOT NULL,"
+                " PRIMARY KEY (gram, block)) WITHOUT ROWID;"
+            )
+            self._ready = True
+        return db
+
+    def _exists(self):
+        return self._ready or os.path.exists(self.path)
+
+    # ------------------------------------------------------------
+    # 쓰기
+    # ------------------------------------------------------------
+
+    def add(self, message):
+        """
+        히스토리에서 밀려난 메시지를 보관 목록에 넣습니다. 디스크 기록은 flush()에서 합니다.
+        히스토리 요약(system) 메시지는 원래 메시지가 이미 보관되어 있으므로 넣지 않습니다.
+
+        Args:
+            message: chat_session.Message
+        """
+        if message.role == "system":
+            return
+        with self._lock:
+            self._pending.append((message.role, message.content))
+
+    def has_pending(self):
+        """아직 기록하지 않은 메시지가 있는지 확인합니다."""
+        return bool(self._pending)
+
+    def flush(self):
+        """
+        보관 목록의 메시지를 한 번의 트랜잭션으로 기록합니다.
+        압축하지 않은 메시지가 ARCHIVE_BLOCK_MESSAGES개 이상 쌓이면 블록으로 묶어 압축하고
+        색인을 갱신합니다.
+
+        Returns:
+            int: 기록한 메시지 수
+        """
+        with self._file_lock:
+            with self._lock:
+                if not self._pending:
+                    return 0
+                pending, self._pending = self._pending, []
+
+            now = time.time()
+            db = self._connect()
+            try:
+                with db:
+                    db.executemany(
+                        "INSERT INTO messages (role, archived_at, content) VALUES (?, ?, ?)",
+                        ((role, now, content) for role, content in pending)
+                    )
+                    self._pack_blocks(db)
+            finally:
+                db.close()
+            return len(pending)
+
+    def _pack_blocks(self, db):
+        """압축하지 않은 메시지를 ARCHIVE_BLOCK_MESSAGES개씩 블록으로 묶고 색인에 추가합니다."""
+        rows = db.execute(
+            "SELECT id, content FROM messages WHERE block IS NULL ORDER BY id"
+        ).fetchall()
+
+        for start in range(0, len(rows) - ARCHIVE_BLOCK_MESSAGES + 1, ARCHIVE_BLOCK_MESSAGES):
+            chunk = rows[start:start + ARCHIVE_BLOCK_MESSAGES]
+            raw = json.dumps(chunk, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            block_id = db.execute(
+                "INSERT INTO blocks (raw_size, data) VALUES (?, ?)",
+                (len(raw), zlib.compress(raw, 6))
+            ).lastrowid
+            db.executemany(
+                "UPDATE messages SET block = ?, content = NULL WHERE id = ?",
+                ((block_id, message_id) for message_id, _ in chunk)
+            )
+            grams = set()
+            for _, content in chunk:
+                grams |= make_grams(content)
+            db.executemany(
+                "INSERT INTO postings (gram, block) VALUES (?, ?)",
+                ((gram, block_id) for gram in grams)
+            )
+
+    def close(self):
+        """남은 메시지를 기록합니다. 임시 보관소는 파일을 삭제합니다."""
+        if self.temporary:
+            with self._file_lock:
+                with self._lock:
+                    self._pending = []
+                self._ready = False
+                for suffix in ("", "-wal", "-shm"):
+                    try:
+                        os.remove(self.path + suffix)
+                    except OSError:
+                        pass
+            return
+        self.flush()
+
+    # ------------------------------------------------------------
+    # 검색
+    # ------------------------------------------------------------
+
+    def search(self, query, limit=ARCHIVE_SEARCH_LIMIT):
+        """
+        보관한 메시지에서 검색어를 모두 포함하는 메시지를 최근 것부터 찾습니다.
+        (대소문자 무시, 공백으로 나눈 검색어는 모두 포함해야 함)
+
+        Args:
+            query: 검색어
+            limit: 최대 결과 수
+
+        Returns:
+            list: [{"id", "role", "content", "archived_at"}, ...] (최근 메시지부터)
+
+        사용 예시:
+            for hit in archive.search("파이썬 리스트", limit=5):
+                print(hit["content"])
+        """
+        words = _words(query)
+        if not words or limit <= 0:
+            return []
+
+        self.flush()
+        with self._file_lock:
+            if not self._exists():
+                return []
+
+            db = self._connect()
+            try:
+                return self._search(db, words, limit)
+            finally:
+                db.close()
+
+    def _search(self, db, words, limit):
+        """블록으로 묶지 않은 메시지를 확인한 뒤, 색인으로 후보 블록을 찾아 확인합니다. (파일 잠금 안에서 호출)"""
+        hits = []
+
+        def collect(rows):
+            # 2-gram이 모두 있어도 검색어가 그대로 들어있지 않을 수 있으므로 본문으로 확인
+            for message_id, role, archived_at, content in rows:
+                lowered = content.lower()
+                if all(word in lowered for word in words):
+                    hits.append({
+                        "id": message_id,
+                        "role": role,
+                        "content": content,
+                        "archived_at": archived_at
+                    })
+                    if len(hits) >= limit:
+                        return True
+            return False
+
+        if collect(db.execute(
+            "SELECT id, role, archived_at, content FROM messages WHERE block IS NULL ORDER BY id DESC"
+        )):
+            return hits
+
+        # 두 글자 이상인 검색어: 모든 2-gram을 포함하는 블록
+        # 한 글자 검색어: 그 글자로 시작하는 2-gram이 있는 블록
+        grams = sorted({word[i:i + 2] for word in words if len(word) > 1 for i in range(len(word) - 1)})
+        queries, params = [], []
+        if grams:
+            queries.append(
+                f"SELECT block FROM postings WHERE gram IN ({','.join('?' * len(grams))})"
+                " GROUP BY block HAVING COUNT(*) = ?"
+            )
+            params.extend(grams)
+            params.append(len(grams))
+        for word in words:
+            if len(word) == 1:
+                queries.append("SELECT block FROM postings WHERE gram >= ? AND gram < ?")
+                params.extend((word, word + "\U0010ffff"))
+
+        candidates = db.execute(" INTERSECT ".join(queries) + " ORDER BY 1 DESC", params).fetchall()
+        for (block_id,) in candidates:
+            data = db.execute("SELECT data FROM blocks WHERE id = ?", (block_id,)).fetchone()[0]
+            contents = dict(json.loads(zlib.decompress(data)))
+            rows = db.execute(
+                "SELECT id, role, archived_at FROM messages WHERE block = ? ORDER BY id DESC",
+                (block_id,)
+            )
+            if collect((message_id, role, archived_at, contents[message_id])
+                       for message_id, role, archived_at in rows):
+                break
+
+        return hits
+
+    # ------------------------------------------------------------
+    # 통계
+    # ------------------------------------------------------------
+
+    def stats(self):
+        """
+        보관소 통계를 반환합니다.
+
+        Returns:
+            dict: {messages, blocks, raw_bytes (압축 전 블록 크기), compressed_bytes,
+                   file_bytes (SQLite 파일 크기)}
+        """
+        stats = {"messages": 0, "blocks": 0, "raw_bytes": 0, "compressed_bytes": 0, "file_bytes": 0}
+
+        self.flush()
+        with self._file_lock:
+            if not self._exists():
+                return stats
+
+            db = self._connect()
+            try:
+                stats["messages"] = db.execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+                blocks, raw, compressed = db.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(raw_size), 0), COALESCE(SUM(LENGTH(data)), 0) FROM blocks"
+                ).fetchone()
+            finally:
+                db.close()
+
+        stats.update(blocks=blocks, raw_bytes=raw, compressed_bytes=compressed)
+        stats["file_bytes"] = os.path.getsize(self.path)
+        return stats
+
+
+def _close_all():
+    """종료 시 남은 메시지를 기록하고 임시 보관 폴더를 삭제합니다."""
+    for archive in list(_archives):
+        try:
+            archive.close()
+        except (OSError, sqlite3.Error):
+            pass
+
+    if _temp_dir is not None:
+        shutil.rmtree(_temp_dir, ignore_errors=True)
+
+
+atexit.register(_close_all)